@@ -0,0 +1,97 @@
+"""Compare the recall, latency and size of the vector storages on clustered random embeddings.
+
+Usage: python benchmarks/bench_vdb.py [--sizes 5000 20000] [--dim 768] [--queries 32] [--top-k 10] [--hnsw]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any, List, Tuple
+
+import numpy as np
+
+from cortex_ingestion._storage._vdb_hnswlib import HNSWVectorStorage, HNSWVectorStorageConfig
+from cortex_ingestion._storage._vdb_numpy import NumpyVectorStorage, NumpyVectorStorageConfig
+
+
+def make_embeddings(size: int, dim: int, num_queries: int, rng: np.random.Generator) -> Tuple[Any, Any]:
+    # Real embeddings are far from uniform, they gather around topics
+    centers = rng.normal(size=(max(size // 100, 1), dim)).astype(np.float32)
+    embeddings = centers[rng.integers(0, len(centers), size)] + 0.5 * rng.normal(size=(size, dim)).astype(np.float32)
+    queries = centers[rng.integers(0, len(centers), num_queries)] + 0.5 * rng.normal(size=(num_queries, dim))
+    return embeddings, queries.astype(np.float32)
+
+
+def saved_size(storage: Any) -> int:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_name = os.path.join(temp_dir, "index")
+        if isinstance(storage, HNSWVectorStorage):
+            storage._index.save_index(file_name)
+        else:
+            np.save(file_name, storage._vectors[: storage.size])
+            file_name += ".npy"
+        size = os.path.getsize(file_name)
+    if isinstance(storage, NumpyVectorStorage) and storage._scales is not None:
+        size += storage._scales[: storage.size].nbytes
+    if isinstance(storage, NumpyVectorStorage) and storage._rerank is not None:
+        size += storage._rerank[: storage.size].nbytes
+    return size
+
+
+async def bench(size: int, dim: int, num_queries: int, top_k: int, hnsw: bool, rng: np.random.Generator) -> None:
+    embeddings, queries = make_embeddings(size, dim, num_queries, rng)
+
+    storages: List[Tuple[str, Any]] = [
+        (dtype, NumpyVectorStorage(config=NumpyVectorStorageConfig(dtype=dtype), embedding_dim=dim))
+        for dtype in ("float32", "float16", "int8")
+    ]
+    # Without reranking its candidates with the float16 copy of the embeddings
+    int8_config = NumpyVectorStorageConfig(dtype="int8", rerank_factor=0)
+    storages.append(("int8-r0", NumpyVectorStorage(config=int8_config, embedding_dim=dim)))
+    if hnsw:
+        storages.append(("hnsw", HNSWVectorStorage(config=HNSWVectorStorageConfig(), embedding_dim=dim)))
+
+    expected = None
+    for name, storage in storages:
+        await storage.insert_start()
+        start = time.perf_counter()
+        await storage.upsert(range(size), embeddings)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ids, _ = await storage.get_knn(queries, top_k)
+        batch_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for query in queries[:8]:
+            await storage.get_knn(query[None], top_k)
+        query_time = (time.perf_counter() - start) / 8
+
+        ids = np.asarray(ids)
+        if expected is None:
+            expected = ids
+        recall = np.mean([len(np.intersect1d(i, e)) / top_k for i, e in zip(ids, expected)])
+        print(
+            f"{size:>8} x {dim} | {name:>7} | build {build_time * 1e3:9.1f} ms | "
+            f"{num_queries} queries {batch_time * 1e3:7.1f} ms | 1 query {query_time * 1e3:6.2f} ms | "
+            f"saved {saved_size(storage) / 2**20:7.1f} MiB | recall@{top_k} {recall:.3f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5_000, 20_000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=32)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--hnsw", action="store_true", help="Also build a HNSW index, which is slow at large sizes")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        asyncio.run(bench(size, args.dim, args.queries, args.top_k, args.hnsw, rng))
+
+
+if __name__ == "__main__":
+    main()
@@ -32,6 +32,7 @@ from cortex_ingestion._storage import (
 )
 from cortex_ingestion._storage._namespace import Workspace
 from cortex_ingestion._types import TChunk, TEmbedding, TEntity, THash, TId, TIndex, TRelation
+from cortex_ingestion.cloud_services import BaseObjectStore, get_default_object_store
 
 from ._graphrag import BaseGraphRAG, QueryParam
 
@@ -73,6 +74,8 @@ class CortexIngestion(BaseGraphRAG[TEmbedding, THash, TChunk, TEntity, TRelation
         chunk_storage: DefaultIndexedKeyValueStorage[THash, TChunk] = field(
             default_factory=lambda: DefaultIndexedKeyValueStorage(None)
         )
+        # Shared by all the instances of the process, so that its disk cache is indexed and bounded once
+        object_store: BaseObjectStore = field(default_factory=get_default_object_store)
 
         entity_ranking_policy: RankingPolicy_WithThreshold = field(
             default_factory=lambda: RankingPolicy_WithThreshold(RankingPolicy_WithThreshold.Config(threshold=0.005))
@@ -106,7 +109,7 @@ class CortexIngestion(BaseGraphRAG[TEmbedding, THash, TChunk, TEntity, TRelation
             graph_upsert=self.config.information_extraction_upsert_policy
         )
         self.state_manager = self.config.state_manager_cls(
-            workspace=Workspace.new(self.working_dir, keep_n=self.n_checkpoints),
+            workspace=Workspace.new(self.working_dir, keep_n=self.n_checkpoints, store=self.config.object_store),
             embedding_service=self.embedding_service,
             graph_storage=self.config.graph_storage,
             entity_storage=self.config.entity_storage,
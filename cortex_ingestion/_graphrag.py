@@ -1,7 +1,8 @@
 """This module implements a Graph-based Retrieval-Augmented Generation (GraphRAG) system."""
 
+import asyncio
 from dataclasses import dataclass, field
-from typing import Any, Dict, Generic, List, Optional, Tuple, Union
+from typing import Any, AsyncIterator, Dict, Generic, List, Optional, Tuple, Union
 
 from cortex_ingestion._llm import BaseLLMService, format_and_send_prompt
 from cortex_ingestion._llm._base import BaseEmbeddingService
@@ -168,26 +169,112 @@ class BaseGraphRAG(Generic[GTEmbedding, GTHash, GTChunk, GTNode, GTEdge, GTId]):
         Returns:
             TQueryResponse: The result of the query (response + context).
         """
-        if query is None or len(query) == 0:
-            return TQueryResponse[GTNode, GTEdge, GTHash, GTChunk](
-                response=PROMPTS["fail_response"], context=TContext([], [], [])
-            )
+        response = (await self.async_query_batch([query], params))[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def async_query_batch(
+        self, queries: List[Optional[str]], params: Optional[QueryParam] = None
+    ) -> List[Union[TQueryResponse[GTNode, GTEdge, GTHash, GTChunk], Exception]]:
+        """Query the graph with several inputs at once.
+
+        The contexts of all the queries are retrieved together, so the graph is scored once for the whole batch.
+
+        Args:
+            queries (list[str]): The query strings to search for in the graph.
+            params (QueryParam, optional): Additional parameters for the queries. Defaults to None.
+
+        Returns:
+            list[TQueryResponse | Exception]: The result of each query (response + context), in the same order. A
+                query which failed holds its exception instead, the other queries are still answered.
+        """
+        responses: Dict[int, Union[TQueryResponse[GTNode, GTEdge, GTHash, GTChunk], Exception]] = {}
+        async for i, response in self.async_query_stream(queries, params):
+            responses[i] = response
+        return [responses[i] for i in range(len(queries))]
+
+    async def async_query_stream(
+        self, queries: List[Optional[str]], params: Optional[QueryParam] = None
+    ) -> AsyncIterator[Tuple[int, Union[TQueryResponse[GTNode, GTEdge, GTHash, GTChunk], Exception]]]:
+        """Query the graph with several inputs at once, yielding each answer as soon as it is ready.
+
+        The entities of all the queries are extracted concurrently and their contexts retrieved together, so the graph
+        is scored once for the whole batch. The answers are then generated concurrently and yielded in the order they
+        complete, along with the index of their query. A query which failed yields its exception instead.
+        """
         if params is None:
             params = QueryParam()
 
-        # Extract entities from query
-        extracted_entities = await self.information_extraction_service.extract_entities_from_query(
-            llm=self.llm_service, query=query, prompt_kwargs={}
+        fail_response = TQueryResponse[GTNode, GTEdge, GTHash, GTChunk](
+            response=PROMPTS["fail_response"], context=TContext([], [], [])
         )
+        valid_queries: List[Tuple[int, str]] = []
+        for i, query in enumerate(queries):
+            if query is None or len(query) == 0:
+                yield i, fail_response
+            else:
+                valid_queries.append((i, query))
 
-        # Retrieve relevant state
-        context = await self.state_manager.get_context(query=query, entities=extracted_entities)
-        if context is None:
-            return TQueryResponse[GTNode, GTEdge, GTHash, GTChunk](
-                response=PROMPTS["fail_response"], context=TContext([], [], [])
+        # Extract entities from the queries
+        extracted_entities = await asyncio.gather(
+            *[
+                self.information_extraction_service.extract_entities_from_query(
+                    llm=self.llm_service, query=query, prompt_kwargs={}
+                )
+                for _, query in valid_queries
+            ],
+            return_exceptions=True,
+        )
+        extracted_queries: List[Tuple[int, str, Dict[str, List[str]]]] = []
+        for (i, query), entities in zip(valid_queries, extracted_entities):
+            if isinstance(entities, Exception):
+                logger.error(f"Error extracting entities from query '{query}': {entities}")
+                yield i, entities
+            elif isinstance(entities, BaseException):
+                raise entities
+            else:
+                extracted_queries.append((i, query, entities))
+
+        # Retrieve relevant state, shared by the whole batch
+        try:
+            contexts = await self.state_manager.get_context_batch(
+                queries=[query for _, query, _ in extracted_queries],
+                entities=[entities for _, _, entities in extracted_queries],
             )
+        except Exception as e:
+            logger.error(f"Error retrieving the context of the queries: {e}")
+            for i, _, _ in extracted_queries:
+                yield i, e
+            return
+
+        async def _answer(
+            i: int, query: str, context: TContext[GTNode, GTEdge, GTHash, GTChunk]
+        ) -> Tuple[int, Union[TQueryResponse[GTNode, GTEdge, GTHash, GTChunk], Exception]]:
+            try:
+                return i, await self._answer_query(query, context, params)
+            except Exception as e:
+                logger.error(f"Error answering query '{query}': {e}")
+                return i, e
 
         # Ask LLM
+        tasks: List[asyncio.Task[Any]] = []
+        for (i, query, _), context in zip(extracted_queries, contexts):
+            if context is None:
+                yield i, fail_response
+            else:
+                tasks.append(asyncio.create_task(_answer(i, query, context)))
+        try:
+            for answer in asyncio.as_completed(tasks):
+                yield await answer
+        finally:
+            # The consumer may stop early, the answers left are not needed anymore
+            for task in tasks:
+                task.cancel()
+
+    async def _answer_query(
+        self, query: str, context: TContext[GTNode, GTEdge, GTHash, GTChunk], params: QueryParam
+    ) -> TQueryResponse[GTNode, GTEdge, GTHash, GTChunk]:
         context_str = context.truncate(
             max_chars={
                 "entities": params.entities_max_tokens * TOKEN_TO_CHAR_RATIO,
@@ -3,11 +3,23 @@ __all__ = [
     "BaseEmbeddingService",
     "DefaultEmbeddingService",
     "DefaultLLMService",
+    "EmbeddingBatcher",
+    "EmbeddingCache",
+    "LLMResponseCache",
+    "ObjectStoreResponseCacheBackend",
+    "SQLiteResponseCacheBackend",
     "format_and_send_prompt",
     "GeminiEmbeddingService",
     "GeminiLLMService",
 ]
 
 from cortex_ingestion._llm._base import BaseEmbeddingService, BaseLLMService, format_and_send_prompt
+from cortex_ingestion._llm._batching import EmbeddingBatcher
+from cortex_ingestion._llm._cache import (
+    EmbeddingCache,
+    LLMResponseCache,
+    ObjectStoreResponseCacheBackend,
+    SQLiteResponseCacheBackend,
+)
 from cortex_ingestion._llm._default import DefaultEmbeddingService, DefaultLLMService
 from cortex_ingestion._llm._llm_gemini import GeminiEmbeddingService, GeminiLLMService
@@ -9,6 +9,8 @@ from pydantic import BaseModel
 from cortex_ingestion._models import BaseModelAlias
 from cortex_ingestion._prompt import PROMPTS
 
+from cortex_ingestion._llm._cache import EmbeddingCache, LLMResponseCache, embedding_cache
+
 T_model = TypeVar("T_model", bound=Union[BaseModel, BaseModelAlias])
 
 
@@ -50,6 +52,8 @@ class BaseLLMService:
     model: Optional[str] = field(default=None)
     base_url: Optional[str] = field(default=None)
     api_key: Optional[str] = field(default=None)
+    # Structured responses are reused from the cache for identical requests, None disables it
+    cache: Optional[LLMResponseCache] = field(default=None)
     llm_async_client: Any = field(init=False, default=None)
 
     async def send_message(
@@ -86,6 +90,10 @@ class BaseEmbeddingService:
     base_url: Optional[str] = field(default=None)
     api_key: Optional[str] = field(default=None)
 
+    # Embeddings already computed are taken from the cache instead of being requested again, None disables it.
+    # The process-wide cache is shared by all the services, whatever their model
+    cache: Optional[EmbeddingCache] = field(default_factory=lambda: embedding_cache)
+
     embedding_async_client: Any = field(init=False, default=None)
 
     async def encode(
@@ -93,11 +101,33 @@ class BaseEmbeddingService:
     ) -> np.ndarray[Any, np.dtype[np.float32]]:
         """Get the embedding representation of the input text.
 
+        Only the texts missing from the cache are sent to `_encode`, each of them once.
+
         Args:
             texts (str): The input text to embed.
             model (str): The name of the model to use.
 
         Returns:
-            list[float]: The embedding vector as a list of floats.
+            np.ndarray: The embedding vectors, one row per text.
         """
+        if self.cache is None:
+            return await self._encode(texts, model)
+
+        cache_model = model or self.model or ""
+        embeddings = await self.cache.get_many(cache_model, texts)
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        if missing:
+            new_embeddings = await self._encode(missing, model)
+            await self.cache.put_many(cache_model, missing, new_embeddings)
+            embedded = dict(zip(missing, new_embeddings))
+            embeddings = [e if e is not None else embedded[text] for text, e in zip(texts, embeddings)]
+
+        if len(embeddings) == 0:
+            return np.zeros((0, self.embedding_dim), dtype=np.float32)
+        return np.array(embeddings, dtype=np.float32)
+
+    async def _encode(
+        self, texts: list[str], model: Optional[str] = None
+    ) -> np.ndarray[Any, np.dtype[np.float32]]:
+        """Request the embeddings of the given texts from the model, bypassing the cache."""
         raise NotImplementedError
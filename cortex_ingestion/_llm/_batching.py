@@ -0,0 +1,206 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Sequence, Set, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from cortex_ingestion._utils import logger
+
+
+@dataclass
+class _PendingText:
+    text: str = field()
+    future: "asyncio.Future[npt.NDArray[np.float32]]" = field()
+    enqueued_at: float = field()
+
+
+@dataclass
+class _LoopState:
+    """Queues of one event loop, asyncio primitives cannot be shared across loops."""
+
+    loop: asyncio.AbstractEventLoop = field()
+    capacity: asyncio.Semaphore = field()
+    batch_slots: asyncio.Semaphore = field()
+    pending: Dict[Hashable, List[_PendingText]] = field(default_factory=dict)
+    # Future of each (key, text) queued or sent and not answered yet, shared by the calls submitting the same text
+    in_flight: Dict[Tuple[Hashable, str], "asyncio.Future[npt.NDArray[np.float32]]"] = field(default_factory=dict)
+    full: Dict[Hashable, asyncio.Event] = field(default_factory=dict)
+    flushers: Dict[Hashable, "asyncio.Task[None]"] = field(default_factory=dict)
+    # The loop only keeps weak references to the tasks
+    senders: Set["asyncio.Task[None]"] = field(default_factory=set)
+
+
+@dataclass
+class EmbeddingBatcher:
+    """Merge the texts of concurrent encode calls into shared embedding requests.
+
+    Texts submitted under the same key (the model) are queued, and sent together once `max_batch_size` of them are
+    waiting or `max_wait_time` seconds after the first of them was queued, whichever comes first. Each caller then
+    gets back the rows of its own texts. A text already waiting for its embedding under the same key is not queued
+    again, the calls submitting it share its result. At most `max_pending` texts can wait for their embeddings: further
+    submissions wait for room, so that a burst of calls cannot queue an unbounded amount of work. At most
+    `max_concurrent_batches` requests are sent at once, per event loop: each loop submitting texts gets its own
+    queues, so that one batcher can be shared by the whole process.
+    """
+
+    request_fn: Callable[[Hashable, List[str]], Awaitable[npt.NDArray[np.float32]]] = field()
+    max_batch_size: int = field(default=32)
+    max_wait_time: float = field(default=0.005)
+    max_pending: int = field(default=4096)
+    max_concurrent_batches: int = field(default=16)
+    # Number of recent batches kept to compute the latency percentiles
+    history_size: int = field(default=1024)
+    # One state per event loop using the batcher, dropped once the loop is closed
+    _states: Dict[asyncio.AbstractEventLoop, _LoopState] = field(init=False, default_factory=dict)
+    _states_lock: threading.Lock = field(init=False, default_factory=threading.Lock)
+    submitted_calls: int = field(init=False, default=0)
+    submitted_texts: int = field(init=False, default=0)
+    coalesced_texts: int = field(init=False, default=0)
+    sent_batches: int = field(init=False, default=0)
+    failed_batches: int = field(init=False, default=0)
+    # (queue wait of the oldest text, request latency, batch size) of the recent batches
+    _history: Deque[Tuple[float, float, int]] = field(init=False)
+
+    def __post_init__(self):
+        self._history = deque(maxlen=self.history_size)
+
+    async def submit(self, key: Hashable, texts: Sequence[str]) -> npt.NDArray[np.float32]:
+        """Return the embeddings of the texts, requested along with the texts submitted concurrently."""
+        state = self._get_state()
+        self.submitted_calls += 1
+        self.submitted_texts += len(texts)
+
+        futures: List[asyncio.Future[npt.NDArray[np.float32]]] = []
+        for text in texts:
+            future = state.in_flight.get((key, text), None)
+            if future is None:
+                # Texts are queued one by one as room frees up, so calls larger than the queue still go through
+                await state.capacity.acquire()
+                future = self._enqueue(state, key, text)
+            else:
+                self.coalesced_texts += 1
+            futures.append(future)
+
+        if len(futures) == 0:
+            return np.zeros((0, 0), dtype=np.float32)
+        # The futures may be shared, cancelling this call must not cancel them for the others
+        return np.stack(await asyncio.gather(*[asyncio.shield(f) for f in futures]))
+
+    def get_stats(self) -> Dict[str, Any]:
+        history = np.array(self._history, dtype=np.float64).reshape(-1, 3)
+        waits, latencies, sizes = history[:, 0], history[:, 1], history[:, 2]
+
+        def percentile(values: npt.NDArray[np.float64], q: float) -> float:
+            return float(np.percentile(values, q)) if len(values) else 0.0
+
+        return {
+            "submitted_calls": self.submitted_calls,
+            "submitted_texts": self.submitted_texts,
+            "coalesced_texts": self.coalesced_texts,
+            "sent_batches": self.sent_batches,
+            "failed_batches": self.failed_batches,
+            "pending_texts": sum(len(p) for state in list(self._states.values()) for p in state.pending.values()),
+            "mean_batch_size": float(sizes.mean()) if len(sizes) else 0.0,
+            "queue_wait_p50": percentile(waits, 50),
+            "queue_wait_p95": percentile(waits, 95),
+            "batch_latency_p50": percentile(latencies, 50),
+            "batch_latency_p95": percentile(latencies, 95),
+            "batch_latency_max": float(latencies.max()) if len(latencies) else 0.0,
+        }
+
+    def _enqueue(self, state: _LoopState, key: Hashable, text: str) -> "asyncio.Future[npt.NDArray[np.float32]]":
+        """Queue a text once room was acquired for it, unless another call queued it in the meantime."""
+        future = state.in_flight.get((key, text), None)
+        if future is not None:
+            state.capacity.release()
+            self.coalesced_texts += 1
+            return future
+
+        future = state.loop.create_future()
+        state.in_flight[(key, text)] = future
+        pending = state.pending.setdefault(key, [])
+        pending.append(_PendingText(text=text, future=future, enqueued_at=time.perf_counter()))
+
+        if len(pending) >= self.max_batch_size:
+            state.full.setdefault(key, asyncio.Event()).set()
+        if key not in state.flushers:
+            state.flushers[key] = state.loop.create_task(self._flush(state, key))
+        return future
+
+    def _get_state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        with self._states_lock:
+            state = self._states.get(loop, None)
+            if state is None:
+                for closed in [other for other in self._states if other.is_closed()]:
+                    del self._states[closed]
+                state = self._states[loop] = _LoopState(
+                    loop=loop,
+                    capacity=asyncio.Semaphore(self.max_pending),
+                    batch_slots=asyncio.Semaphore(self.max_concurrent_batches),
+                )
+        return state
+
+    async def _flush(self, state: _LoopState, key: Hashable) -> None:
+        full = state.full.setdefault(key, asyncio.Event())
+        pending = state.pending[key]
+        try:
+            while pending:
+                if len(pending) < self.max_batch_size:
+                    try:
+                        await asyncio.wait_for(full.wait(), self.max_wait_time)
+                    except asyncio.TimeoutError:
+                        pass
+
+                batch = pending[: self.max_batch_size]
+                del pending[: self.max_batch_size]
+                if len(pending) < self.max_batch_size:
+                    full.clear()
+
+                await state.batch_slots.acquire()
+                sender = state.loop.create_task(self._send(state, key, batch))
+                state.senders.add(sender)
+                sender.add_done_callback(state.senders.discard)
+        finally:
+            del state.flushers[key]
+
+    async def _send(self, state: _LoopState, key: Hashable, batch: List[_PendingText]) -> None:
+        start = time.perf_counter()
+        try:
+            embeddings = await self.request_fn(key, [p.text for p in batch])
+            if len(embeddings) != len(batch):
+                raise ValueError(f"Expected {len(batch)} embeddings, received {len(embeddings)}.")
+        except BaseException as e:
+            # Every caller of the batch fails with the request, none of them is left waiting
+            self.failed_batches += 1
+            for p in batch:
+                if p.future.done():
+                    continue
+                if isinstance(e, asyncio.CancelledError):
+                    p.future.cancel()
+                else:
+                    p.future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            logger.error(f"Embedding batch of {len(batch)} texts failed: {e}")
+            return
+        finally:
+            state.batch_slots.release()
+            for p in batch:
+                state.capacity.release()
+                # Texts submitted from now on are requested again
+                del state.in_flight[(key, p.text)]
+
+        for p, embedding in zip(batch, embeddings):
+            if not p.future.done():
+                p.future.set_result(embedding)
+
+        end = time.perf_counter()
+        self.sent_batches += 1
+        self._history.append((start - batch[0].enqueued_at, end - start, len(batch)))
+        logger.debug(f"Sent embedding batch of {len(batch)} texts in {(end - start) * 1e3:.1f} ms.")
+
@@ -0,0 +1,309 @@
+import asyncio
+import functools
+import json
+import os
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type, TypeVar
+
+import numpy as np
+import numpy.typing as npt
+import xxhash
+from pydantic import BaseModel, ValidationError
+
+from cortex_ingestion._exceptions import InvalidStorageError
+from cortex_ingestion._utils import logger, run_in_io_executor
+from cortex_ingestion.cloud_services import BaseObjectStore
+
+T_response = TypeVar("T_response", bound=BaseModel)
+
+
+@dataclass
+class EmbeddingCache:
+    """Content-addressed cache of the embeddings computed by an embedding service.
+
+    Embeddings are keyed by the xxhash of the model and the embedded text. Recently used embeddings are kept in an
+    in-memory LRU tier bounded by `max_bytes`. When a `store` is given, every embedding is also written below
+    `prefix` in it, as raw float32 bytes, so that other processes and later runs can reuse it: memory misses are
+    looked up there before being reported as misses.
+
+    The embedding services share the process-wide `embedding_cache` by default, so the texts repeated across
+    requests are embedded once. Its store tier is opt-in: it costs a round trip to the store for every memory miss
+    and every new embedding, which for a remote store takes longer than requesting a whole batch of embeddings.
+    To enable it, give the service a cache with a store, e.g. `EmbeddingCache(store=get_default_object_store())`.
+    """
+
+    max_bytes: int = field(default=256 * 1024**2)
+    store: Optional[BaseObjectStore] = field(default=None)
+    prefix: str = field(default="embedding_cache")
+    _entries: "OrderedDict[str, npt.NDArray[np.float32]]" = field(init=False, default_factory=OrderedDict)
+    _nbytes: int = field(init=False, default=0)
+    _lock: threading.Lock = field(init=False, default_factory=threading.Lock)
+    memory_hits: int = field(init=False, default=0)
+    store_hits: int = field(init=False, default=0)
+    misses: int = field(init=False, default=0)
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of the looked up embeddings found in either tier."""
+        lookups = self.memory_hits + self.store_hits + self.misses
+        return (self.memory_hits + self.store_hits) / lookups if lookups else 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "memory_hits": self.memory_hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "nbytes": self._nbytes,
+        }
+
+    @staticmethod
+    def get_key(model: str, text: str) -> str:
+        # The separator keeps ("a", "bc") and ("ab", "c") apart
+        return xxhash.xxh3_128_hexdigest(f"{model}\0{text}".encode())
+
+    async def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[npt.NDArray[np.float32]]]:
+        """Return the cached embedding of each text, or None if it is not cached."""
+        keys = [self.get_key(model, text) for text in texts]
+        embeddings: List[Optional[npt.NDArray[np.float32]]] = []
+        with self._lock:
+            for key in keys:
+                embedding = self._entries.get(key, None)
+                if embedding is not None:
+                    self._entries.move_to_end(key)
+                embeddings.append(embedding)
+            self.memory_hits += sum(e is not None for e in embeddings)
+
+        missing = [i for i, e in enumerate(embeddings) if e is None]
+        if missing and self.store is not None:
+            loaded = await asyncio.gather(*[run_in_io_executor(self._read, keys[i]) for i in missing])
+            with self._lock:
+                for i, embedding in zip(missing, loaded):
+                    if embedding is not None:
+                        embeddings[i] = embedding
+                        self._put(keys[i], embedding)
+                        self.store_hits += 1
+
+        with self._lock:
+            self.misses += sum(e is None for e in embeddings)
+        return embeddings
+
+    async def put_many(self, model: str, texts: Sequence[str], embeddings: npt.NDArray[Any]) -> None:
+        keys = [self.get_key(model, text) for text in texts]
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            for key, embedding in zip(keys, embeddings):
+                # Copied so that the cached rows do not keep the whole batch alive
+                self._put(key, embedding.copy())
+
+        if self.store is not None:
+            await asyncio.gather(
+                *[run_in_io_executor(self._write, key, embedding) for key, embedding in zip(keys, embeddings)]
+            )
+
+    def clear(self) -> None:
+        """Drop the in-memory tier, the embeddings written to the store are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def _put(self, key: str, embedding: npt.NDArray[np.float32]) -> None:
+        if key in self._entries:
+            self._nbytes -= self._entries.pop(key).nbytes
+        self._entries[key] = embedding
+        self._nbytes += embedding.nbytes
+
+        while self._nbytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._nbytes -= evicted.nbytes
+
+    def _path(self, key: str) -> str:
+        # Spread the embeddings across directories, some file systems slow down with very large ones
+        return os.path.join(self.prefix, key[:2], key)
+
+    def _read(self, key: str) -> Optional[npt.NDArray[np.float32]]:
+        assert self.store is not None, "Reading embeddings requires a store."
+        try:
+            return np.frombuffer(self.store.read_bytes(self._path(key)), dtype=np.float32)
+        except InvalidStorageError:
+            return None
+
+    def _write(self, key: str, embedding: npt.NDArray[np.float32]) -> None:
+        assert self.store is not None, "Writing embeddings requires a store."
+        try:
+            self.store.write_bytes(self._path(key), embedding.tobytes())
+        except InvalidStorageError as e:
+            # The cache only saves requests, failing to fill it must not fail the encoding
+            logger.warning(f"Failed to write embedding to the cache: {e}")
+
+
+embedding_cache = EmbeddingCache(max_bytes=int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", 256 * 1024**2)))
+
+
+@dataclass
+class BaseResponseCacheBackend:
+    """Storage of the cached LLM responses, as raw bytes along with the time they were cached."""
+
+    def get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        raise NotImplementedError
+
+    def set(self, key: str, created_at: float, value: bytes) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+
+@dataclass
+class SQLiteResponseCacheBackend(BaseResponseCacheBackend):
+    """Keep the responses in a local SQLite database, shared by the processes of the machine."""
+
+    path: str = field(default="llm_cache.sqlite")
+    _connection: Optional[sqlite3.Connection] = field(init=False, default=None)
+    _lock: threading.Lock = field(init=False, default_factory=threading.Lock)
+
+    def get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        with self._lock:
+            row = self._connect().execute("SELECT created_at, value FROM responses WHERE key = ?", (key,)).fetchone()
+        return (row[0], bytes(row[1])) if row is not None else None
+
+    def set(self, key: str, created_at: float, value: bytes) -> None:
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, created_at, value) VALUES (?, ?, ?)", (key, created_at, value)
+            )
+            connection.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            connection.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections are used from the I/O threads, the lock serializes them
+        if self._connection is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, created_at REAL, value BLOB)"
+            )
+            self._connection.commit()
+        return self._connection
+
+
+@dataclass
+class ObjectStoreResponseCacheBackend(BaseResponseCacheBackend):
+    """Keep the responses in an object store, one object per response, shared by every process using the store."""
+
+    store: BaseObjectStore = field()
+    prefix: str = field(default="llm_cache")
+
+    def get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        try:
+            data = self.store.read_bytes(self._path(key))
+        except InvalidStorageError:
+            return None
+        (created_at,) = struct.unpack("<d", data[:8])
+        return created_at, data[8:]
+
+    def set(self, key: str, created_at: float, value: bytes) -> None:
+        self.store.write_bytes(self._path(key), struct.pack("<d", created_at) + value)
+
+    def delete(self, key: str) -> None:
+        self.store.delete(self._path(key))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.prefix, key[:2], key)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_schema(response_model: Type[BaseModel]) -> str:
+    return json.dumps(response_model.model_json_schema(), sort_keys=True)
+
+
+@dataclass
+class LLMResponseCache:
+    """Cache of the structured responses of an LLM service.
+
+    Responses are keyed by a hash of the model, the messages, the JSON schema of the response model and the other
+    arguments of the request, so that a change to any of them (including to a prompt or to a response model) misses
+    the cache. Responses older than `ttl` seconds are ignored. Failing to read or write the backend only loses the
+    cached response, the request is then sent as if the cache was missing.
+    """
+
+    # Bumped when the cached values change format
+    VERSION = 1
+
+    backend: BaseResponseCacheBackend = field(default_factory=SQLiteResponseCacheBackend)
+    ttl: Optional[float] = field(default=None)
+    hits: int = field(init=False, default=0)
+    misses: int = field(init=False, default=0)
+    expired: int = field(init=False, default=0)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "expired": self.expired, "hit_rate": self.hit_rate}
+
+    @classmethod
+    def get_key(
+        cls,
+        model: str,
+        messages: List[Dict[str, str]],
+        response_model: Optional[Type[BaseModel]],
+        kwargs: Dict[str, Any],
+    ) -> str:
+        """Return the hash identifying the request, also used to coalesce identical requests."""
+        request = {
+            "version": cls.VERSION,
+            "model": model,
+            "messages": messages,
+            "schema": _get_schema(response_model) if response_model is not None else None,
+            "kwargs": kwargs,
+        }
+        return xxhash.xxh3_128_hexdigest(json.dumps(request, sort_keys=True, default=repr).encode())
+
+    async def get(self, key: str, response_model: Type[T_response]) -> Optional[T_response]:
+        try:
+            entry = await run_in_io_executor(self.backend.get, key)
+        except Exception as e:
+            logger.warning(f"Failed to read LLM response from the cache: {e}")
+            entry = None
+
+        if entry is not None and self.ttl is not None and time.time() - entry[0] > self.ttl:
+            self.expired += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+
+        try:
+            response = response_model.model_validate_json(entry[1])
+        except ValidationError as e:
+            logger.warning(f"Invalid cached LLM response, ignoring it: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return response
+
+    async def put(self, key: str, response: BaseModel) -> None:
+        try:
+            await run_in_io_executor(self.backend.set, key, time.time(), response.model_dump_json().encode())
+        except Exception as e:
+            logger.warning(f"Failed to write LLM response to the cache: {e}")
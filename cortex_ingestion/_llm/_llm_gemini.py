@@ -1,9 +1,11 @@
 """LLM Services module."""
 import os
 import asyncio
+import threading
 from dataclasses import dataclass, field
+from functools import partial
 from itertools import chain
-from typing import Any, List, Optional, Tuple, Type, cast
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Type, cast
 
 import instructor
 import numpy as np
@@ -21,18 +23,31 @@ from dotenv import load_dotenv
 from cortex_ingestion._exceptions import LLMServiceNoResponseError
 from cortex_ingestion._types import BaseModelAlias
 from cortex_ingestion._utils import logger
-from cortex_ingestion._utils import throttle_async_func_call
+from cortex_ingestion._utils import SingleFlight, throttle_async_func_call
 
 from cortex_ingestion._llm._base import BaseEmbeddingService, BaseLLMService, T_model
+from cortex_ingestion._llm._batching import EmbeddingBatcher
+from cortex_ingestion._llm._cache import LLMResponseCache
 
 load_dotenv()  # Load environment variables from .env
 
+# Shared by the services of the process, so that identical requests of concurrent queries are coalesced. Embeddings
+# are only read, the coalesced embedding requests can share the same response
+_llm_single_flight = SingleFlight()
+_embedding_single_flight = SingleFlight(copy_results=False)
+
+# Embedding batchers shared by the services of the process, by batching settings
+_shared_batchers: Dict[Tuple[int, float, int], EmbeddingBatcher] = {}
+_shared_batchers_lock = threading.Lock()
+
 @dataclass
 class GeminiLLMService(BaseLLMService):
     """LLM Service for Gemini using OpenAI-compatible endpoint."""
 
     model: Optional[str] = field(default="gemini-2.0-flash")
     mode: instructor.Mode = field(default=instructor.Mode.JSON)
+    # Counts the requests sent and the ones which joined an identical request in flight, shared by the process
+    single_flight: SingleFlight = field(init=False, default_factory=lambda: _llm_single_flight)
 
     def __post_init__(self):
         self.llm_async_client = instructor.from_openai(
@@ -82,14 +97,16 @@ class GeminiLLMService(BaseLLMService):
 
         messages.append({"role": "user", "content": prompt})
 
-        llm_response: T_model = await self.llm_async_client.chat.completions.create(
-            model=model,
-            messages=messages,  # type: ignore
-            response_model=response_model.Model
-            if response_model and issubclass(response_model, BaseModelAlias)
-            else response_model,
-            **kwargs,
-            max_retries=AsyncRetrying(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10)),
+        pydantic_model = (
+            response_model.Model if response_model and issubclass(response_model, BaseModelAlias) else response_model
+        )
+        structured = pydantic_model is not None and issubclass(pydantic_model, BaseModel)
+        request_key = LLMResponseCache.get_key(model, messages, pydantic_model if structured else None, kwargs)
+        cache_key = request_key if structured else None
+
+        # Identical concurrent requests share the response of the first one, from any service of the process
+        llm_response: T_model = await self.single_flight.run(
+            (self.mode, request_key), lambda: self._create_completion(model, messages, pydantic_model, cache_key, kwargs)
         )
 
         if not llm_response:
@@ -109,6 +126,32 @@ class GeminiLLMService(BaseLLMService):
 
         return llm_response, messages
 
+    async def _create_completion(
+        self,
+        model: str,
+        messages: list[dict[str, str]],
+        response_model: Optional[Type[Any]],
+        cache_key: Optional[str],
+        kwargs: dict[str, Any],
+    ) -> Any:
+        # Only structured responses are cached, they can be validated back when read
+        if self.cache is not None and cache_key is not None:
+            cached_response = await self.cache.get(cache_key, response_model)  # type: ignore
+            if cached_response is not None:
+                logger.debug("Using cached LLM response.")
+                return cached_response
+
+        llm_response = await self.llm_async_client.chat.completions.create(
+            model=model,
+            messages=messages,  # type: ignore
+            response_model=response_model,
+            **kwargs,
+            max_retries=AsyncRetrying(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10)),
+        )
+        if self.cache is not None and cache_key is not None and llm_response:
+            await self.cache.put(cache_key, llm_response)
+        return llm_response
+
 
 @dataclass
 class GeminiEmbeddingService(BaseEmbeddingService):
@@ -117,15 +160,24 @@ class GeminiEmbeddingService(BaseEmbeddingService):
     embedding_dim: int = field(default=768)  # Gemini's embedding dimension
     max_elements_per_request: int = field(default=32)
     model: Optional[str] = field(default="text-embedding-004")
+    # Concurrent encode calls are merged into shared requests within this window (in seconds), 0 disables it
+    batch_window: float = field(default=0.005)
+    # Texts waiting for their embeddings before further encode calls wait for room
+    max_pending_elements: int = field(default=4096)
+    batcher: Optional[EmbeddingBatcher] = field(init=False, default=None)
+    # Identical requests sent without the batcher, which coalesces the texts itself, shared by the process
+    single_flight: SingleFlight = field(init=False, default_factory=lambda: _embedding_single_flight)
 
     def __post_init__(self):
         self.embedding_async_client = AsyncOpenAI(
             api_key=os.getenv('GEMINI_API_KEY_BETA'),
             base_url=os.getenv('GEMINI_BASE_URL'),
         )
+        if self.batch_window > 0:
+            self.batcher = self._get_shared_batcher()
         logger.debug("Initialized Gemini embedding service")
 
-    async def encode(self, texts: list[str], model: Optional[str] = None) -> np.ndarray[Any, np.dtype[np.float32]]:
+    async def _encode(self, texts: list[str], model: Optional[str] = None) -> np.ndarray[Any, np.dtype[np.float32]]:
         """Get the embedding representation of the input text.
 
         Args:
@@ -138,18 +190,51 @@ class GeminiEmbeddingService(BaseEmbeddingService):
         logger.debug(f"Getting embedding for texts: {texts}")
         model = model or self.model or "text-embedding-004"
 
+        if self.batcher is not None:
+            embeddings = await self.batcher.submit(model, texts)
+            logger.debug(f"Received embedding response: {len(embeddings)} embeddings")
+            return embeddings
+
         batched_texts = [
             texts[i * self.max_elements_per_request : (i + 1) * self.max_elements_per_request]
             for i in range((len(texts) + self.max_elements_per_request - 1) // self.max_elements_per_request)
         ]
-        response = await asyncio.gather(*[self._embedding_request(b, model) for b in batched_texts])
+        response = await asyncio.gather(
+            *[
+                self.single_flight.run((model, tuple(b)), partial(self._embedding_request, b, model))
+                for b in batched_texts
+            ]
+        )
 
         data = chain(*[r.data for r in response])
-        embeddings = np.array([dp.embedding for dp in data])
+        embeddings = np.array([dp.embedding for dp in data], dtype=np.float32)
         logger.debug(f"Received embedding response: {len(embeddings)} embeddings")
 
         return embeddings
 
+    def _get_shared_batcher(self) -> EmbeddingBatcher:
+        """Return the batcher of the process for the batching settings of the service, created on first use.
+
+        A service is created for every request, sharing the batcher merges the texts of concurrent requests, queued
+        by model. The requests are sent by the service which created the batcher, the clients of all the services
+        being configured alike.
+        """
+        settings = (self.max_elements_per_request, self.batch_window, self.max_pending_elements)
+        with _shared_batchers_lock:
+            batcher = _shared_batchers.get(settings, None)
+            if batcher is None:
+                batcher = _shared_batchers[settings] = EmbeddingBatcher(
+                    self._embedding_batch,
+                    max_batch_size=self.max_elements_per_request,
+                    max_wait_time=self.batch_window,
+                    max_pending=self.max_pending_elements,
+                )
+        return batcher
+
+    async def _embedding_batch(self, model: Hashable, texts: List[str]) -> np.ndarray[Any, np.dtype[np.float32]]:
+        response = await self._embedding_request(texts, cast(str, model))
+        return np.array([dp.embedding for dp in response.data], dtype=np.float32)
+
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10),
@@ -46,16 +46,16 @@ class DefaultNodeUpsertPolicy(BaseNodeUpsertPolicy[GTNode, GTId]):
     async def __call__(
         self, llm: BaseLLMService, target: BaseGraphStorage[GTNode, GTEdge, GTId], source_nodes: Iterable[GTNode]
     ) -> Tuple[BaseGraphStorage[GTNode, GTEdge, GTId], Iterable[Tuple[TIndex, GTNode]]]:
-        upserted: Dict[TIndex, GTNode] = {}
+        # Nodes with the same name are upserted once, with the attributes of the last one
+        nodes_by_name: Dict[GTId, GTNode] = {}
         for node in source_nodes:
-            _, index = await target.get_node(node)
-            if index is not None:
-                await target.upsert_node(node=node, node_index=index)
-            else:
-                index = await target.upsert_node(node=node, node_index=None)
-            upserted[index] = node
+            nodes_by_name[node.name] = node  # type: ignore
+        nodes = list(nodes_by_name.values())
+
+        indices = [(await target.get_node(node))[1] for node in nodes]
+        indices = await target.upsert_nodes(nodes=nodes, indices=indices)
 
-        return target, upserted.items()
+        return target, list(zip(indices, nodes))
 
 
 @dataclass
@@ -111,9 +111,7 @@ class NodeUpsertPolicy_SummarizeDescription(BaseNodeUpsertPolicy[TEntity, TId]):
     async def __call__(
         self, llm: BaseLLMService, target: BaseGraphStorage[TEntity, GTEdge, TId], source_nodes: Iterable[TEntity]
     ) -> Tuple[BaseGraphStorage[TEntity, GTEdge, TId], Iterable[Tuple[TIndex, TEntity]]]:
-        upserted: List[Tuple[TIndex, TEntity]] = []
-
-        async def _upsert_node(node_id: TId, nodes: List[TEntity]) -> Optional[Tuple[TIndex, TEntity]]:
+        async def _merge_node(node_id: TId, nodes: List[TEntity]) -> Tuple[Optional[TIndex], TEntity]:
             existing_node, index = await target.get_node(node_id)
             if existing_node:
                 nodes.append(existing_node)
@@ -136,22 +134,25 @@ class NodeUpsertPolicy_SummarizeDescription(BaseNodeUpsertPolicy[TEntity, TId]):
             # Resolve types (pick most frequent)
             node_type = Counter((node.type for node in nodes)).most_common(1)[0][0]
 
-            node = TEntity(name=node_id, description=node_description, type=node_type)
-            index = await target.upsert_node(node=node, node_index=index)
-
-            upserted.append((index, node))
+            return index, TEntity(name=node_id, description=node_description, type=node_type)
 
         # Group nodes by name
         grouped_nodes: Dict[TId, List[TEntity]] = defaultdict(lambda: [])
         for node in source_nodes:
             grouped_nodes[node.name].append(node)
 
+        merged_nodes: List[Tuple[Optional[TIndex], TEntity]]
         if self.config.is_async:
-            node_upsert_tasks = (_upsert_node(node_id, nodes) for node_id, nodes in grouped_nodes.items())
-            await asyncio.gather(*node_upsert_tasks)
+            node_merge_tasks = (_merge_node(node_id, nodes) for node_id, nodes in grouped_nodes.items())
+            merged_nodes = await asyncio.gather(*node_merge_tasks)
         else:
-            for node_id, nodes in grouped_nodes.items():
-                await _upsert_node(node_id, nodes)
+            merged_nodes = [await _merge_node(node_id, nodes) for node_id, nodes in grouped_nodes.items()]
+
+        # Upsert all the merged nodes at once
+        indices = await target.upsert_nodes(
+            nodes=(node for _, node in merged_nodes), indices=(index for index, _ in merged_nodes)
+        )
+        upserted: List[Tuple[TIndex, TEntity]] = list(zip(indices, (node for _, node in merged_nodes)))
 
         return target, upserted
 
@@ -212,11 +213,8 @@ class EdgeUpsertPolicy_UpsertValidAndMergeSimilarByLLM(BaseEdgeUpsertPolicy[TRel
         llm: BaseLLMService,
         target: BaseGraphStorage[GTNode, TRelation, TId],
         edges: List[TRelation],
-        source_entity: TId,
-        target_entity: TId,
+        existing_edges: List[Tuple[TRelation, TIndex]],
     ) -> Tuple[List[Tuple[TIndex, TRelation]], List[TRelation], List[TIndex]]:
-        existing_edges = list(await target.get_edges(source_entity, target_entity))
-
         # Check if we need to run edges maintenance
         if (len(existing_edges) + len(edges)) > self.config.edge_merge_threshold:
             upserted_eges, new_edges, to_delete_edges = await self._merge_similar_edges(
@@ -320,19 +318,21 @@ class EdgeUpsertPolicy_UpsertValidAndMergeSimilarByLLM(BaseEdgeUpsertPolicy[TRel
         to_delete_edges: List[List[TIndex]] = []
         for edge in source_edges:
             grouped_edges[(edge.source, edge.target)].append(edge)
+        # The existing edges of all the pairs are fetched in a single lookup
+        existing_edges = await target.get_edges_many(grouped_edges.keys())
 
         if self.config.is_async:
             edge_upsert_tasks = (
-                self._upsert_edge(llm, target, edges, source_entity, target_entity)
-                for (source_entity, target_entity), edges in grouped_edges.items()
+                self._upsert_edge(llm, target, edges, existing)
+                for edges, existing in zip(grouped_edges.values(), existing_edges)
             )
             tasks = await asyncio.gather(*edge_upsert_tasks)
             if len(tasks):
                 upserted_edges, new_edges, to_delete_edges = zip(*tasks)
         else:
             tasks = [
-                await self._upsert_edge(llm, target, edges, source_entity, target_entity)
-                for (source_entity, target_entity), edges in grouped_edges.items()
+                await self._upsert_edge(llm, target, edges, existing)
+                for edges, existing in zip(grouped_edges.values(), existing_edges)
             ]
             if len(tasks):
                 upserted_edges, new_edges, to_delete_edges = zip(*tasks)
@@ -132,6 +132,12 @@ class BaseStateManagerService(Generic[GTNode, GTEdge, GTHash, GTChunk, GTId, GTE
         """Retrieve relevant state from the storage."""
         raise NotImplementedError
 
+    async def get_context_batch(
+        self, queries: List[str], entities: List[Dict[str, List[str]]]
+    ) -> List[Optional[TContext[GTNode, GTEdge, GTHash, GTChunk]]]:
+        """Retrieve relevant state from the storage for each of the given queries."""
+        return [await self.get_context(query=q, entities=e) for q, e in zip(queries, entities)]
+
     async def get_num_entities(self) -> int:
         """Get the number of entities in the storage."""
         raise NotImplementedError
@@ -8,6 +8,7 @@ import numpy.typing as npt
 from scipy.sparse import csr_matrix, vstack
 from tqdm import tqdm
 
+from cortex_ingestion._exceptions import InvalidStorageError
 from cortex_ingestion._llm import BaseLLMService
 from cortex_ingestion._storage._base import (
     BaseBlobStorage,
@@ -15,6 +16,7 @@ from cortex_ingestion._storage._base import (
     BaseStorage,
 )
 from cortex_ingestion._storage._blob_pickle import PickleBlobStorage
+from cortex_ingestion._storage._cache import WorkspaceCache, workspace_cache
 from cortex_ingestion._storage._namespace import Workspace
 from cortex_ingestion._types import (
     TChunk,
@@ -37,6 +39,7 @@ class DefaultStateManagerService(BaseStateManagerService[TEntity, TRelation, THa
     blob_storage_cls: Type[BaseBlobStorage[csr_matrix]] = field(default=PickleBlobStorage)
     insert_similarity_score_threshold: float = field(default=0.9)
     query_similarity_score_threshold: Optional[float] = field(default=0.7)
+    workspace_cache: Optional[WorkspaceCache] = field(default_factory=lambda: workspace_cache)
 
     def __post_init__(self):
         assert self.workspace is not None, "Workspace must be provided."
@@ -153,20 +156,11 @@ class DefaultStateManagerService(BaseStateManagerService[TEntity, TRelation, THa
         # STEP: insert identity edges
         progress_bar.set_description("Building... [identity edges]")
 
-        async def _insert_identiy_edges(
-            source_index: TIndex, target_indices: npt.NDArray[np.int32]
-        ) -> Iterable[Tuple[TIndex, TIndex]]:
-            return [
-                (source_index, idx)
-                for idx in target_indices
-                if idx != 0 and not await self.graph_storage.are_neighbours(source_index, idx)
-            ]
-
-        new_edge_indices = list(
-            chain(
-                *await asyncio.gather(*[_insert_identiy_edges(i, indices) for i, indices in enumerate(similar_indices)])
-            )
-        )
+        # Candidate pairs are checked against the existing edges in a single lookup
+        sources, targets = np.nonzero(similar_indices.reshape(len(similar_indices), -1))
+        candidate_edges = list(zip(sources.tolist(), similar_indices[sources, targets].tolist()))
+        are_neighbours = await self.graph_storage.are_neighbours_many(candidate_edges)
+        new_edge_indices = [edge for edge, connected in zip(candidate_edges, are_neighbours) if not connected]
         new_edges_attrs: Dict[str, Any] = {
             "description": ["is"] * len(new_edge_indices),
             "chunks": [[]] * len(new_edge_indices),
@@ -185,45 +179,75 @@ class DefaultStateManagerService(BaseStateManagerService[TEntity, TRelation, THa
     async def get_context(
         self, query: str, entities: Dict[str, List[str]]
     ) -> Optional[TContext[TEntity, TRelation, THash, TChunk]]:
-        if self.entity_storage.size == 0:
-            return None
+        return (await self.get_context_batch(queries=[query], entities=[entities]))[0]
+
+    async def get_context_batch(
+        self, queries: List[str], entities: List[Dict[str, List[str]]]
+    ) -> List[Optional[TContext[TEntity, TRelation, THash, TChunk]]]:
+        contexts: List[Optional[TContext[TEntity, TRelation, THash, TChunk]]] = [None] * len(queries)
+        if self.entity_storage.size == 0 or len(queries) == 0:
+            return contexts
 
         try:
-            query_embeddings = await self.embedding_service.encode(
-                [f"{n}" for n in entities["named"]] + [f"[NONE] {n}" for n in entities["generic"]] + [query]
-            )
-            entity_scores: List[csr_matrix] = []
-            # Similarity-search over entities
-            if len(entities["named"]) > 0:
-                vdb_entity_scores_by_named_entity = await self._score_entities_by_vectordb(
-                    query_embeddings=query_embeddings[: len(entities["named"])],
-                    top_k=1,
-                    threshold=self.query_similarity_score_threshold,
+            # Encode the entities and queries of the whole batch at once
+            texts_per_query = [
+                [f"{n}" for n in e["named"]] + [f"[NONE] {n}" for n in e["generic"]] + [query]
+                for query, e in zip(queries, entities)
+            ]
+            all_query_embeddings = await self.embedding_service.encode(list(chain.from_iterable(texts_per_query)))
+
+            seeded_queries: List[int] = []
+            vdb_entity_scores_by_query: List[csr_matrix] = []
+            offset = 0
+            for i, (texts, e) in enumerate(zip(texts_per_query, entities)):
+                query_embeddings = all_query_embeddings[offset : offset + len(texts)]
+                offset += len(texts)
+
+                entity_scores: List[csr_matrix] = []
+                # Similarity-search over entities
+                if len(e["named"]) > 0:
+                    vdb_entity_scores_by_named_entity = await self._score_entities_by_vectordb(
+                        query_embeddings=query_embeddings[: len(e["named"])],
+                        top_k=1,
+                        threshold=self.query_similarity_score_threshold,
+                    )
+                    entity_scores.append(vdb_entity_scores_by_named_entity)
+
+                vdb_entity_scores_by_generic_entity_and_query = await self._score_entities_by_vectordb(
+                    query_embeddings=query_embeddings[len(e["named"]) :], top_k=20, threshold=0.5
                 )
-                entity_scores.append(vdb_entity_scores_by_named_entity)
-
-            vdb_entity_scores_by_generic_entity_and_query = await self._score_entities_by_vectordb(
-                query_embeddings=query_embeddings[len(entities["named"]) :], top_k=20, threshold=0.5
-            )
-            entity_scores.append(vdb_entity_scores_by_generic_entity_and_query)
+                entity_scores.append(vdb_entity_scores_by_generic_entity_and_query)
 
-            vdb_entity_scores = vstack(entity_scores).max(axis=0)
+                vdb_entity_scores = vstack(entity_scores).max(axis=0)
 
-            if isinstance(vdb_entity_scores, int) or vdb_entity_scores.nnz == 0:
-                return None
+                if isinstance(vdb_entity_scores, int) or vdb_entity_scores.nnz == 0:
+                    continue
+                seeded_queries.append(i)
+                vdb_entity_scores_by_query.append(csr_matrix(vdb_entity_scores))
         except Exception as e:
             logger.error(f"Error during information extraction and scoring for query entities {entities}.\n{e}")
             raise e
 
-        # Score entities
+        if len(seeded_queries) == 0:
+            return contexts
+
+        # Score entities, the personalized scores of all the queries are computed together
+        vdb_entity_scores = vstack(vdb_entity_scores_by_query, format="csr")
         try:
-            graph_entity_scores = self.entity_ranking_policy(
-                await self._score_entities_by_graph(entity_scores=vdb_entity_scores)
-            )
+            graph_entity_scores_by_query = await self._score_entities_by_graph(entity_scores=vdb_entity_scores)
         except Exception as e:
             logger.error(f"Error during graph scoring for entities. Non-zero elements: {vdb_entity_scores.nnz}.\n{e}")
             raise e
 
+        for row, i in enumerate(seeded_queries):
+            contexts[i] = await self._get_context_from_scores(
+                self.entity_ranking_policy(graph_entity_scores_by_query[row])
+            )
+        return contexts
+
+    async def _get_context_from_scores(
+        self, graph_entity_scores: csr_matrix
+    ) -> TContext[TEntity, TRelation, THash, TChunk]:
         try:
             # All score vectors should be row vectors
             indices, scores = extract_sorted_scores(graph_entity_scores)
@@ -290,7 +314,7 @@ class DefaultStateManagerService(BaseStateManagerService[TEntity, TRelation, THa
 
     async def _score_entities_by_graph(self, entity_scores: Optional[csr_matrix]) -> csr_matrix:
         graph_weighted_scores = await self.graph_storage.score_nodes(entity_scores)
-        node_scores = csr_matrix(graph_weighted_scores)  # (1, #entities)
+        node_scores = csr_matrix(graph_weighted_scores)  # (#queries, #entities)
         return node_scores
 
     async def _score_relationships_by_entities(self, entity_scores: csr_matrix) -> csr_matrix:
@@ -322,17 +346,51 @@ class DefaultStateManagerService(BaseStateManagerService[TEntity, TRelation, THa
             self._entities_to_relationships,
         ]
 
+        workspace = cast(Workspace, self.workspace)
+
+        # Read the manifest of the checkpoint once: storages resolve their resources from it
+        signature = await workspace.async_get_load_signature()
+        self._check_manifest(workspace)
+
+        # Reuse the storages already loaded by this process if the checkpoint did not change
+        if signature is not None and self.workspace_cache is not None:
+            generation, nbytes = signature
+            states = self.workspace_cache.get(workspace.uri, generation)
+            if states is not None:
+                logger.debug(f"Loading workspace '{workspace.uri}' from the workspace cache.")
+                await asyncio.gather(
+                    *[storage_inst.query_restore(states[self._cache_key(storage_inst)]) for storage_inst in storages]
+                )
+                for storage_inst in storages:
+                    storage_inst.set_in_progress(True)
+                return
+
         def _fn():
             tasks: List[Awaitable[Any]] = []
             for storage_inst in storages:
                 tasks.append(storage_inst.query_start())
             return asyncio.gather(*tasks)
 
-        await cast(Workspace, self.workspace).with_checkpoints(_fn)
+        load_checkpoint = workspace.current_load_checkpoint
+        await workspace.with_checkpoints(_fn)
 
         for storage_inst in storages:
             storage_inst.set_in_progress(True)
 
+        # Only cache the storages if no rollback happened, otherwise they do not match the signature
+        if (
+            signature is not None
+            and self.workspace_cache is not None
+            and workspace.current_load_checkpoint == load_checkpoint
+        ):
+            generation, nbytes = signature
+            self.workspace_cache.put(
+                workspace.uri,
+                generation,
+                {self._cache_key(storage_inst): storage_inst.get_state() for storage_inst in storages},
+                nbytes,
+            )
+
     async def query_done(self):
         tasks: List[Awaitable[Any]] = []
         storages: List[BaseStorage] = [
@@ -358,31 +416,27 @@ class DefaultStateManagerService(BaseStateManagerService[TEntity, TRelation, THa
             self._entities_to_relationships,
         ]
 
+        workspace = cast(Workspace, self.workspace)
+        await workspace.async_refresh_manifest()
+        self._check_manifest(workspace)
+
         def _fn():
             tasks: List[Awaitable[Any]] = []
             for storage_inst in storages:
                 tasks.append(storage_inst.insert_start())
             return asyncio.gather(*tasks)
 
-        await cast(Workspace, self.workspace).with_checkpoints(_fn)
+        await workspace.with_checkpoints(_fn)
 
         for storage_inst in storages:
             storage_inst.set_in_progress(True)
 
     async def insert_done(self):
-        await self._entities_to_relationships.set(await self.graph_storage.get_entities_to_relationships_map())
-
-        raw_relationships_to_chunks = await self.graph_storage.get_relationships_attrs(key="chunks")
-        # Map Chunk IDs to indices
-        raw_relationships_to_chunks = [
-            [i for i in await self.chunk_storage.get_index(chunk_ids) if i is not None]
-            for chunk_ids in raw_relationships_to_chunks
-        ]
-        await self._relationships_to_chunks.set(
-            csr_from_indices_list(
-                raw_relationships_to_chunks, shape=(len(raw_relationships_to_chunks), await self.chunk_storage.size())
-            )
-        )
+        # The maps are derived from the graph and the chunks, they only need to be updated if these changed
+        if self.graph_storage.dirty or self.chunk_storage.dirty:
+            # Compacting renumbers the edges, so it must happen before the maps are updated
+            await self.graph_storage.compact_edges()
+            await self._update_maps()
 
         tasks: List[Awaitable[Any]] = []
         storages: List[BaseStorage] = [
@@ -399,6 +453,90 @@ class DefaultStateManagerService(BaseStateManagerService[TEntity, TRelation, THa
         for storage_inst in storages:
             storage_inst.set_in_progress(False)
 
+        # The manifest is written last, so that it only references fully saved resources
+        workspace = cast(Workspace, self.workspace)
+        await workspace.async_save_manifest(embedding_dim=self.embedding_service.embedding_dim)
+
+        if self.workspace_cache is not None:
+            self.workspace_cache.invalidate(workspace.uri)
+
+    async def _update_maps(self) -> None:
+        """Update the entity->relationship and relationship->chunk maps with the edges changed by the insert."""
+        num_nodes = await self.graph_storage.node_count()
+        num_edges = await self.graph_storage.edge_count()
+        num_chunks = await self.chunk_storage.size()
+
+        edge_origins = await self.graph_storage.get_edge_origins()
+        e2r = await self._entities_to_relationships.get()
+        r2c = await self._relationships_to_chunks.get()
+        if (
+            edge_origins is None
+            or e2r is None
+            or r2c is None
+            or e2r.shape[1] != r2c.shape[0]
+            or e2r.shape[0] > num_nodes
+            or r2c.shape[1] > num_chunks
+            or (edge_origins >= e2r.shape[1]).any()
+        ):
+            # The changes are unknown or the saved maps do not match the graph: rebuild them from scratch
+            e2r = await self.graph_storage.get_entities_to_relationships_map()
+            r2c = await self._get_relationships_to_chunks_map(range(num_edges), num_edges, num_chunks)
+        else:
+            changed_edges = np.flatnonzero(edge_origins < 0)
+            kept_edges = np.flatnonzero(edge_origins >= 0)
+
+            # Move the unchanged edges from their index at the start of the insert to their current index
+            move = csr_matrix(
+                (np.ones(len(kept_edges), dtype=e2r.dtype), (edge_origins[kept_edges], kept_edges)),
+                shape=(e2r.shape[1], num_edges),
+            )
+            e2r = e2r.dot(move)
+            e2r.resize((num_nodes, num_edges))
+            r2c = move.T.dot(r2c).tocsr()
+            r2c.resize((num_edges, num_chunks))
+
+            if len(changed_edges):
+                e2r = e2r + await self.graph_storage.get_entities_to_relationships_map(changed_edges)
+                r2c = r2c + await self._get_relationships_to_chunks_map(changed_edges, num_edges, num_chunks)
+
+        await self._entities_to_relationships.set(e2r)
+        await self._relationships_to_chunks.set(r2c)
+
+    async def _get_relationships_to_chunks_map(
+        self, edge_indices: Iterable[TIndex], num_edges: int, num_chunks: int
+    ) -> csr_matrix:
+        edge_indices = np.fromiter(edge_indices, dtype=np.int64)
+        if num_edges == 0:
+            return csr_matrix((0, num_chunks))
+
+        raw_relationships_to_chunks = await self.graph_storage.get_relationships_attrs(
+            key="chunks", edge_indices=edge_indices
+        )
+        # Map Chunk IDs to indices
+        raw_relationships_to_chunks = [
+            [i for i in await self.chunk_storage.get_index(chunk_ids) if i is not None]
+            for chunk_ids in raw_relationships_to_chunks
+        ]
+        rows = csr_from_indices_list(raw_relationships_to_chunks, shape=(len(edge_indices), num_chunks)).tocoo()
+        return csr_matrix((rows.data, (edge_indices[rows.row], rows.col)), shape=(num_edges, num_chunks))
+
+    def _check_manifest(self, workspace: Workspace) -> None:
+        manifest = workspace.get_manifest()
+        if (
+            manifest is not None
+            and manifest.embedding_dim is not None
+            and manifest.embedding_dim != self.embedding_service.embedding_dim
+        ):
+            raise InvalidStorageError(
+                f"Workspace '{workspace.uri}' was built with embeddings of dimension {manifest.embedding_dim}, "
+                f"but the embedding service produces embeddings of dimension {self.embedding_service.embedding_dim}."
+            )
+
+    @staticmethod
+    def _cache_key(storage_inst: BaseStorage) -> str:
+        assert storage_inst.namespace is not None, "Cached storages require a namespace."
+        return cast(str, storage_inst.namespace.namespace)
+
     async def save_graphml(self, output_path: str) -> None:
         await self.graph_storage.save_graphml(output_path)
         logger.info(f"Graph saved to '{output_path}'.")
@@ -15,6 +15,8 @@ from typing import (
     final,
 )
 
+import numpy as np
+import numpy.typing as npt
 from scipy.sparse import csr_matrix  # type: ignore
 
 from cortex_ingestion._types import GTBlob, GTEdge, GTEmbedding, GTId, GTKey, GTNode, GTValue, TIndex, TScore
@@ -29,10 +31,20 @@ class BaseStorage:
     namespace: Optional[Namespace] = field(default=None)
     _mode: Optional[Literal["insert", "query"]] = field(init=False, default=None)
     _in_progress: Optional[bool] = field(init=False, default=None)
+    _dirty: bool = field(init=False, default=False)
 
     def set_in_progress(self, in_progress: bool) -> None:
         self._in_progress = in_progress
 
+    @property
+    def dirty(self) -> bool:
+        """Whether the storage was modified since it was loaded or last saved."""
+        return self._dirty
+
+    def mark_dirty(self) -> None:
+        """Record that the storage was modified, so it must be saved when committing the insert operations."""
+        self._dirty = True
+
     @final
     async def insert_start(self):
         if self._mode == "query":
@@ -48,10 +60,33 @@ class BaseStorage:
         self._mode = "insert"
 
         if self._in_progress is not True:
+            # Loading marks the storage dirty when what was saved must be saved again, e.g. converted
+            self._dirty = False
             await self._insert_start()
 
     @final
     async def query_start(self):
+        await self._switch_to_query()
+
+        if self._in_progress is not True:
+            await self._query_start()
+
+    @final
+    async def query_restore(self, state: Any) -> None:
+        """Prepare the storage for querying from a state previously returned by `get_state`."""
+        await self._switch_to_query()
+
+        if self._in_progress is not True:
+            self._set_state(state)
+
+    def get_state(self) -> Any:
+        """Return the loaded in-memory state of the storage.
+
+        The returned state is shared read-only between query sessions, so it must not be mutated afterwards.
+        """
+        raise NotImplementedError
+
+    async def _switch_to_query(self):
         if self._mode == "insert":
             logger.info("Switching from insert to query mode.")
             if self._in_progress is not False:
@@ -64,9 +99,6 @@ class BaseStorage:
                 self._in_progress = False
         self._mode = "query"
 
-        if self._in_progress is not True:
-            await self._query_start()
-
     @final
     async def insert_done(self) -> None:
         if self._mode == "query":
@@ -74,7 +106,13 @@ class BaseStorage:
             logger.error(t)
         else:
             if self._in_progress is not False:
-                await self._insert_done()
+                if self._dirty or self.namespace is None:
+                    await self._insert_done()
+                    self._dirty = False
+                else:
+                    # Nothing changed: the new checkpoint references the resources saved previously
+                    logger.debug(f"[{self.__class__.__name__}] No changes to commit, keeping the saved resources.")
+                    self.namespace.keep()
             else:
                 logger.warning(f"[{self.__class__.__name__}] No insert operations to commit.")
 
@@ -107,6 +145,10 @@ class BaseStorage:
         if self._mode == "insert":
             logger.error("Trying to commit query operations in insert mode.")
 
+    def _set_state(self, state: Any) -> None:
+        """Restore the in-memory state of the storage from the output of `get_state`."""
+        raise NotImplementedError
+
 
 ####################################################################################################
 # Blob Storage
@@ -223,6 +265,15 @@ class BaseGraphStorage(BaseStorage, Generic[GTNode, GTEdge, GTId]):
     ) -> Iterable[Tuple[GTEdge, TIndex]]:
         raise NotImplementedError
 
+    async def get_edges_many(
+        self, pairs: Iterable[Tuple[Union[GTId, TIndex], Union[GTId, TIndex]]]
+    ) -> List[List[Tuple[GTEdge, TIndex]]]:
+        """Return for each (source, target) pair the edges between the two nodes.
+
+        Storages should override this with a batched implementation.
+        """
+        return [list(await self.get_edges(source, target)) for source, target in pairs]
+
     async def get_edge_indices(
         self, source_node: Union[GTId, TIndex], target_node: Union[GTId, TIndex]
     ) -> Iterable[TIndex]:
@@ -237,6 +288,13 @@ class BaseGraphStorage(BaseStorage, Generic[GTNode, GTEdge, GTId]):
     async def upsert_node(self, node: GTNode, node_index: Union[TIndex, None]) -> TIndex:
         raise NotImplementedError
 
+    async def upsert_nodes(self, nodes: Iterable[GTNode], indices: Iterable[Union[TIndex, None]]) -> List[TIndex]:
+        """Update the nodes at the given indices and insert the nodes whose index is None.
+
+        Return the index of each node. Storages should override this with a batched implementation.
+        """
+        return [await self.upsert_node(node=node, node_index=index) for node, index in zip(nodes, indices)]
+
     async def upsert_edge(self, edge: GTEdge, edge_index: Union[TIndex, None]) -> TIndex:
         raise NotImplementedError
 
@@ -251,10 +309,28 @@ class BaseGraphStorage(BaseStorage, Generic[GTNode, GTEdge, GTId]):
     async def are_neighbours(self, source_node: Union[GTId, TIndex], target_node: Union[GTId, TIndex]) -> bool:
         raise NotImplementedError
 
+    async def are_neighbours_many(
+        self, pairs: Iterable[Tuple[Union[GTId, TIndex], Union[GTId, TIndex]]]
+    ) -> npt.NDArray[np.bool_]:
+        """Return for each (source, target) pair whether the two nodes are connected by an edge.
+
+        Storages should override this with a batched implementation.
+        """
+        return np.array([await self.are_neighbours(source, target) for source, target in pairs], dtype=bool)
+
     async def delete_edges_by_index(self, indices: Iterable[TIndex]) -> None:
         raise NotImplementedError
 
-    async def get_entities_to_relationships_map(self) -> csr_matrix:
+    async def compact_edges(self) -> bool:
+        """Remove the deleted edges still held by the storage, renumbering the remaining edges.
+
+        Storages that defer the deletion of edges decide whether compacting is worth it. Return whether the edges
+        were renumbered.
+        """
+        return False
+
+    async def get_entities_to_relationships_map(self, edge_indices: Optional[Iterable[TIndex]] = None) -> csr_matrix:
+        """Return the (#entities, #relationships) incidence matrix, only filled for the given edges if provided."""
         raise NotImplementedError
 
     async def get_relationships_to_chunks_map(
@@ -262,9 +338,23 @@ class BaseGraphStorage(BaseStorage, Generic[GTNode, GTEdge, GTId]):
     ) -> csr_matrix:
         raise NotImplementedError
 
-    async def get_relationships_attrs(self, key: str) -> List[List[Any]]:
+    async def get_relationships_attrs(
+        self, key: str, edge_indices: Optional[Iterable[TIndex]] = None
+    ) -> List[List[Any]]:
+        """Return the given attribute of all the edges, or of the given edges only."""
         raise NotImplementedError
 
+    async def get_edge_origins(self) -> Optional[npt.NDArray[np.int64]]:
+        """Return for each edge its index when the insert started, or -1 if the edge was inserted or modified since.
+
+        Return None if the storage does not track its changes.
+        """
+        return None
+
     async def score_nodes(self, initial_weights: Optional[csr_matrix]) -> csr_matrix:
-        """Score nodes based on the initial weights."""
+        """Score nodes based on the initial weights.
+
+        The initial weights are a (#queries, #nodes) matrix, each row is scored independently and the scores are
+        returned as a (#queries, #nodes) matrix. If no weights are given, a single row of scores is returned.
+        """
         raise NotImplementedError
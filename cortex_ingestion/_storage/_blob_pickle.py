@@ -4,7 +4,7 @@ from typing import Generic, Optional
 
 from cortex_ingestion._exceptions import InvalidStorageError
 from cortex_ingestion._types import GTBlob
-from cortex_ingestion.utilities import load_pickle, save_pickle
+from cortex_ingestion.utilities import async_load_pickle, async_save_pickle
 
 from cortex_ingestion._storage._base import BaseBlobStorage
 
@@ -31,22 +31,29 @@ class PickleBlobStorage(BaseBlobStorage[GTBlob]):
             blob: The blob to set.
         """
         self._blob = blob
+        self.mark_dirty()
+
+    def get_state(self) -> Optional[GTBlob]:
+        return self._blob
+
+    def _set_state(self, state: Optional[GTBlob]) -> None:
+        self._blob = state
 
     async def _insert_start(self):
         """Prepare the storage for inserting."""
         # Load the blob if it exists
-        self._blob = load_pickle(self.namespace, self.RESOURCE_NAME, None)
+        self._blob = await async_load_pickle(self.namespace, self.RESOURCE_NAME, None)
 
     async def _insert_done(self):
         """Commit the storage after inserting."""
         # Save the blob if it exists
         if self._blob is not None:
-            save_pickle(self.namespace, self.RESOURCE_NAME, self._blob)
+            await async_save_pickle(self.namespace, self.RESOURCE_NAME, self._blob)
 
     async def _query_start(self):
         """Prepare the storage for querying."""
         # Load the blob if it exists
-        self._blob = load_pickle(self.namespace, self.RESOURCE_NAME, None)
+        self._blob = await async_load_pickle(self.namespace, self.RESOURCE_NAME, None)
 
     async def _query_done(self):
         """Release the storage after querying."""
@@ -0,0 +1,87 @@
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, Optional
+
+from cortex_ingestion._utils import logger
+
+
+@dataclass
+class WorkspaceCacheEntry:
+    generation: Hashable = field()
+    states: Dict[str, Any] = field()
+    nbytes: int = field()
+
+
+@dataclass
+class WorkspaceCache:
+    """Process-wide LRU cache of the storages loaded for each workspace.
+
+    Entries are keyed by workspace location (see `Workspace.uri`) and hold the in-memory state of every
+    storage loaded for a given checkpoint generation. Only the latest generation of a workspace is kept:
+    looking up a different generation drops the stale entry. The cache is bounded by the (approximate) number of
+    bytes of the loaded artifacts, evicting the least recently used workspaces first.
+    """
+
+    max_bytes: int = field(default=2 * 1024**3)
+    _entries: "OrderedDict[str, WorkspaceCacheEntry]" = field(init=False, default_factory=OrderedDict)
+    _nbytes: int = field(init=False, default=0)
+    _lock: threading.Lock = field(init=False, default_factory=threading.Lock)
+    hits: int = field(init=False, default=0)
+    misses: int = field(init=False, default=0)
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def get(self, workspace: str, generation: Hashable) -> Optional[Dict[str, Any]]:
+        """Return the cached storage states of the workspace if they match the given generation."""
+        with self._lock:
+            entry = self._entries.get(workspace, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.generation != generation:
+                logger.info(f"Workspace cache entry for '{workspace}' is stale. Dropping it.")
+                self._pop(workspace)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(workspace)
+            self.hits += 1
+            return entry.states
+
+    def put(self, workspace: str, generation: Hashable, states: Dict[str, Any], nbytes: int) -> None:
+        """Store the loaded storage states of the workspace, evicting old workspaces if needed."""
+        if nbytes > self.max_bytes:
+            logger.info(f"Workspace '{workspace}' ({nbytes} bytes) exceeds the cache budget. Not caching it.")
+            return
+
+        with self._lock:
+            self._pop(workspace)
+            self._entries[workspace] = WorkspaceCacheEntry(generation=generation, states=states, nbytes=nbytes)
+            self._nbytes += nbytes
+
+            while self._nbytes > self.max_bytes:
+                evicted_dir, _ = next(iter(self._entries.items()))
+                logger.debug(f"Evicting workspace '{evicted_dir}' from the workspace cache.")
+                self._pop(evicted_dir)
+
+    def invalidate(self, workspace: str) -> None:
+        """Drop the cached storages of the workspace."""
+        with self._lock:
+            self._pop(workspace)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def _pop(self, workspace: str) -> None:
+        entry = self._entries.pop(workspace, None)
+        if entry is not None:
+            self._nbytes -= entry.nbytes
+
+
+workspace_cache = WorkspaceCache(max_bytes=int(os.getenv("WORKSPACE_CACHE_MAX_BYTES", 2 * 1024**3)))
@@ -1,19 +1,22 @@
 import gzip
-import io
 import os
+import tempfile
 from dataclasses import asdict, dataclass, field
-from typing import Any, Generic, Iterable, List, Mapping, Optional, Tuple, Type, Union
+from typing import Any, Dict, Generic, Iterable, List, Literal, Mapping, Optional, Tuple, Type, Union, cast
 
 import igraph as ig  # type: ignore
 import numpy as np
-from scipy.sparse import csr_matrix
+import numpy.typing as npt
+from scipy.sparse import csr_matrix, vstack
 
 from cortex_ingestion._exceptions import InvalidStorageError
 from cortex_ingestion._types import GTEdge, GTId, GTNode, TIndex
-from cortex_ingestion._utils import csr_from_indices_list, logger
+from cortex_ingestion._utils import logger, run_in_io_executor
 
 from cortex_ingestion._storage._base import BaseGraphStorage
-from cortex_ingestion.cloud_services._googlecloud import upload_graph_to_gcs, download_graph_to_gcs
+from cortex_ingestion._storage._graph_columns import GraphColumns
+from cortex_ingestion._storage._ppr import PersonalizedPageRank
+from cortex_ingestion.cloud_services import BaseObjectStore
 
 
 @dataclass
@@ -21,17 +24,78 @@ class IGraphStorageConfig(Generic[GTNode, GTEdge]):
     node_cls: Type[GTNode] = field()
     edge_cls: Type[GTEdge] = field()
     ppr_damping: float = field(default=0.85)
+    # "power" runs the power iteration on a transition matrix built once per loaded graph, "push" approximates the
+    # scores by only exploring the neighbourhood of the seeds (up to ppr_push_epsilon per unit of degree), "igraph"
+    # uses PRPACK
+    ppr_method: Literal["power", "push", "igraph"] = field(default="power")
+    ppr_tolerance: float = field(default=1e-6)
+    ppr_max_iter: int = field(default=100)
+    ppr_warm_start: bool = field(default=False)
+    ppr_push_epsilon: float = field(default=1e-5)
 
 
 @dataclass
 class IGraphStorage(BaseGraphStorage[GTNode, GTEdge, GTId]):
-    RESOURCE_NAME = "igraph_data.pklz"
+    """A graph storage backed by an undirected igraph graph.
+
+    Deleting edges only marks them with a tombstone, so that the other edges keep their index and the maps built on
+    them stay valid: deleted edges are skipped by the lookups and scoring. They are removed from the graph by
+    `compact_edges` once more than COMPACTION_TOMBSTONE_RATIO of the edges are deleted.
+    """
+
+    RESOURCE_NAME = "igraph_data.cols"
+    LEGACY_RESOURCE_NAME = "igraph_data.pklz"
+    COMPACTION_TOMBSTONE_RATIO = 0.2
     config: IGraphStorageConfig[GTNode, GTEdge] = field()
-    _graph: Optional[ig.Graph] = field(init=False, default=None)  # type: ignore
+    _igraph: Optional[ig.Graph] = field(init=False, default=None)  # type: ignore
+    # Columnar view of the loaded graph, the igraph graph is only decoded from it when needed
+    _columns: Optional[GraphColumns] = field(init=False, default=None)
+    # Node name -> vertex index, built on the first lookup by name
+    _name_to_index: Optional[Dict[Any, TIndex]] = field(init=False, default=None)
+    _edge_origins: Optional[npt.NDArray[np.int64]] = field(init=False, default=None)
+    _tombstones: npt.NDArray[np.bool_] = field(init=False, default_factory=lambda: np.zeros(0, dtype=bool))
+    # Unordered pair of vertices -> indices of the edges between them, built on first use
+    _edge_index: Optional[Dict[Tuple[int, int], List[TIndex]]] = field(init=False, default=None)
+    # Holds the PageRank engine of the loaded graph, shared by the query sessions restored from the same state
+    _ppr_cache: Dict[str, PersonalizedPageRank] = field(init=False, default_factory=dict)
+    # Scores of the previous query of this session, the initial guess of the next one if warm start is enabled
+    _ppr_last_scores: Optional[npt.NDArray[np.float64]] = field(init=False, default=None)
+
+    def mark_dirty(self) -> None:
+        super().mark_dirty()
+        self._ppr_cache = {}
+        self._ppr_last_scores = None
+
+    @property
+    def _graph(self) -> ig.Graph:  # type: ignore
+        if self._igraph is None and self._columns is not None:
+            logger.debug("Decoding the whole graph from its columnar view.")
+            self._igraph = self._columns.to_graph()
+        return self._igraph
+
+    @_graph.setter
+    def _graph(self, graph: ig.Graph) -> None:  # type: ignore
+        self._igraph = graph
+        self._columns = None
+
+    @property
+    def _columns_only(self) -> Optional[GraphColumns]:
+        """The columnar view of the graph, if the igraph graph was not decoded from it."""
+        return self._columns if self._igraph is None else None
+
+    @property
+    def _names(self) -> Dict[Any, TIndex]:
+        if self._name_to_index is None:
+            self._build_name_index()
+        return cast(Dict[Any, TIndex], self._name_to_index)
 
     async def save_graphml(self, path: str) -> None:
         if self._graph is not None:  # type: ignore
-            ig.Graph.write_graphmlz(self._graph, path + ".gz")  # type: ignore
+            graph = self._graph
+            if self._tombstones.any():
+                graph = graph.copy()  # type: ignore
+                graph.delete_edges(np.flatnonzero(self._tombstones))  # type: ignore
+            ig.Graph.write_graphmlz(graph, path + ".gz")  # type: ignore
 
             with gzip.open(path + ".gz", 'rb') as f:
                 file_content = f.read()
@@ -40,9 +104,13 @@ class IGraphStorage(BaseGraphStorage[GTNode, GTEdge, GTId]):
             os.remove(path + ".gz")
 
     async def node_count(self) -> int:
+        if columns := self._columns_only:
+            return columns.num_nodes
         return self._graph.vcount()  # type: ignore
 
     async def edge_count(self) -> int:
+        if columns := self._columns_only:
+            return columns.num_edges
         return self._graph.ecount()  # type: ignore
 
     async def get_node(self, node: Union[GTNode, GTId]) -> Union[Tuple[GTNode, TIndex], Tuple[None, None]]:
@@ -51,12 +119,11 @@ class IGraphStorage(BaseGraphStorage[GTNode, GTEdge, GTId]):
         else:
             node_id = node
 
-        try:
-            vertex = self._graph.vs.find(name=node_id)  # type: ignore
-        except ValueError:
-            vertex = None
+        index = self._names.get(node_id, None)
+        if index is None:
+            return (None, None)
 
-        return (self.config.node_cls(**vertex.attributes()), vertex.index) if vertex else (None, None)  # type: ignore
+        return (self.config.node_cls(**self._get_node_attributes(index)), index)
 
     async def get_edges(
         self, source_node: Union[GTId, TIndex], target_node: Union[GTId, TIndex]
@@ -69,34 +136,42 @@ class IGraphStorage(BaseGraphStorage[GTNode, GTEdge, GTId]):
                 edges.append((edge, index))
         return edges
 
+    async def get_edges_many(
+        self, pairs: Iterable[Tuple[Union[GTId, TIndex], Union[GTId, TIndex]]]
+    ) -> List[List[Tuple[GTEdge, TIndex]]]:
+        edges: List[List[Tuple[GTEdge, TIndex]]] = []
+        for indices in self._lookup_edges(pairs):
+            edges.append([(edge, index) for index in indices if (edge := await self.get_edge_by_index(index))])
+        return edges
+
     async def get_edge_indices(
         self, source_node: Union[GTId, TIndex], target_node: Union[GTId, TIndex]
     ) -> Iterable[TIndex]:
-        if type(source_node) is TIndex:
-            source_node = self._graph.vs.find(name=source_node).index  # type: ignore
-        if type(target_node) is TIndex:
-            target_node = self._graph.vs.find(name=target_node).index  # type: ignore
-        edges = self._graph.es.select(_source=source_node, _target=target_node)  # type: ignore
-
-        return (edge.index for edge in edges)  # type: ignore
+        return iter(self._lookup_edges([(source_node, target_node)])[0])
 
     async def get_node_by_index(self, index: TIndex) -> Union[GTNode, None]:
-        node = self._graph.vs[index] if index < self._graph.vcount() else None  # type: ignore
-        return self.config.node_cls(**node.attributes()) if index < self._graph.vcount() else None  # type: ignore
+        return self.config.node_cls(**self._get_node_attributes(index)) if index < await self.node_count() else None
 
     async def get_edge_by_index(self, index: TIndex) -> Union[GTEdge, None]:
-        edge = self._graph.es[index] if index < self._graph.ecount() else None  # type: ignore
-        return (
-            self.config.edge_cls(
-                source=self._graph.vs[edge.source]["name"],  # type: ignore
-                target=self._graph.vs[edge.target]["name"],  # type: ignore
-                **edge.attributes(),  # type: ignore
+        if index >= await self.edge_count() or self._tombstones[index]:
+            return None
+
+        if columns := self._columns_only:
+            source, target = columns.edges[index]
+            return self.config.edge_cls(
+                source=columns.get_vertex_attribute("name", [source])[0],
+                target=columns.get_vertex_attribute("name", [target])[0],
+                **columns.get_edge(index),
             )
-            if edge
-            else None
+        edge = self._graph.es[index]  # type: ignore
+        return self.config.edge_cls(
+            source=self._graph.vs[edge.source]["name"],  # type: ignore
+            target=self._graph.vs[edge.target]["name"],  # type: ignore
+            **edge.attributes(),  # type: ignore
         )
 
     async def upsert_node(self, node: GTNode, node_index: Union[TIndex, None]) -> TIndex:
+        self.mark_dirty()
         if node_index is not None:
             if node_index >= self._graph.vcount():  # type: ignore
                 logger.error(
@@ -104,13 +179,47 @@ class IGraphStorage(BaseGraphStorage[GTNode, GTEdge, GTId]):
                 )
                 raise ValueError(f"Index {node_index} is out of bounds")
             already_node = self._graph.vs[node_index]  # type: ignore
+            if already_node["name"] != node.name:  # type: ignore
+                self._names.pop(already_node["name"], None)  # type: ignore
+                self._names[node.name] = node_index
             already_node.update_attributes(**asdict(node))  # type: ignore
 
             return already_node.index  # type: ignore
         else:
-            return self._graph.add_vertex(**asdict(node)).index  # type: ignore
+            index = self._graph.add_vertex(**asdict(node)).index  # type: ignore
+            self._names.setdefault(node.name, index)
+            return index
+
+    async def upsert_nodes(self, nodes: Iterable[GTNode], indices: Iterable[Union[TIndex, None]]) -> List[TIndex]:
+        nodes = list(nodes)
+        indices = list(indices)
+        assert len(nodes) == len(indices), "nodes and indices must have the same length"
+        if len(nodes) == 0:
+            return []
+        self.mark_dirty()
+
+        vcount = self._graph.vcount()  # type: ignore
+        upserted_indices: List[TIndex] = []
+        new_nodes: List[Dict[str, Any]] = []
+        for node, node_index in zip(nodes, indices):
+            if node_index is None:
+                upserted_indices.append(vcount + len(new_nodes))
+                new_nodes.append(asdict(node))
+            else:
+                upserted_indices.append(await self.upsert_node(node, node_index))
+
+        # Adding all the vertices at once grows the attribute arrays once, instead of once per vertex
+        if new_nodes:
+            self._graph.add_vertices(  # type: ignore
+                len(new_nodes), attributes={key: [n[key] for n in new_nodes] for key in new_nodes[0]}
+            )
+            for i, node in enumerate(new_nodes):
+                self._names.setdefault(node["name"], vcount + i)
+
+        return upserted_indices
 
     async def upsert_edge(self, edge: GTEdge, edge_index: Union[TIndex, None]) -> TIndex:
+        self.mark_dirty()
         if edge_index is not None:
             if edge_index >= self._graph.ecount():  # type: ignore
                 logger.error(
@@ -119,12 +228,17 @@ class IGraphStorage(BaseGraphStorage[GTNode, GTEdge, GTId]):
                 raise ValueError(f"Index {edge_index} is out of bounds")
             already_edge = self._graph.es[edge_index]  # type: ignore
             already_edge.update_attributes(**edge.to_attrs(edge=edge))  # type: ignore
+            self._track_edges(modified=[edge_index])
 
             return already_edge.index  # type: ignore
         else:
-            return self._graph.add_edge(  # type: ignore
+            index = self._graph.add_edge(  # type: ignore
                 **asdict(edge)
             ).index  # type: ignore
+            # Only counted once added, a failed add_edge must not leave the edge counters ahead of the graph
+            self._track_edges(added=1)
+            self._index_new_edges(index)
+            return index
 
     async def insert_edges(
         self,
@@ -138,10 +252,13 @@ class IGraphStorage(BaseGraphStorage[GTNode, GTEdge, GTId]):
             indices = list(indices)
             if len(indices) == 0:
                 return []
+            self.mark_dirty()
             self._graph.add_edges(  # type: ignore
                 indices,
                 attributes=attrs,
             )
+            self._track_edges(added=len(indices))
+            self._index_new_edges(self._graph.ecount() - len(indices))  # type: ignore
             # TODO: not sure if this is the best way to get the indices of the new edges
             return list(range(self._graph.ecount() - len(indices), self._graph.ecount()))  # type: ignore
         elif edges is not None:
@@ -149,96 +266,260 @@ class IGraphStorage(BaseGraphStorage[GTNode, GTEdge, GTId]):
             edges = list(edges)
             if len(edges) == 0:
                 return []
+            self.mark_dirty()
             self._graph.add_edges(  # type: ignore
                 ((edge.source, edge.target) for edge in edges),
                 attributes=type(edges[0]).to_attrs(edges=edges),
             )
+            self._track_edges(added=len(edges))
+            self._index_new_edges(self._graph.ecount() - len(edges))  # type: ignore
             # TODO: not sure if this is the best way to get the indices of the new edges
             return list(range(self._graph.ecount() - len(edges), self._graph.ecount()))  # type: ignore
         else:
             return []
 
     async def are_neighbours(self, source_node: Union[GTId, TIndex], target_node: Union[GTId, TIndex]) -> bool:
-        return self._graph.get_eid(source_node, target_node, directed=False, error=False) != -1  # type: ignore
+        return len(self._lookup_edges([(source_node, target_node)])[0]) > 0
+
+    async def are_neighbours_many(
+        self, pairs: Iterable[Tuple[Union[GTId, TIndex], Union[GTId, TIndex]]]
+    ) -> npt.NDArray[np.bool_]:
+        return np.array([len(indices) > 0 for indices in self._lookup_edges(pairs)], dtype=bool)
 
     async def delete_edges_by_index(self, indices: Iterable[TIndex]) -> None:
-        self._graph.delete_edges(indices)  # type: ignore
+        indices = list(indices)
+        if len(indices) == 0:
+            return
+        self.mark_dirty()
+        self._tombstones[indices] = True
+        # The maps must drop the deleted edges
+        self._track_edges(modified=indices)
+
+    async def compact_edges(self) -> bool:
+        deleted = np.flatnonzero(self._tombstones)
+        if len(deleted) == 0 or len(deleted) <= self.COMPACTION_TOMBSTONE_RATIO * len(self._tombstones):
+            return False
+
+        self.mark_dirty()
+        self._graph.delete_edges(deleted)  # type: ignore
+        self._tombstones = np.zeros(self._graph.ecount(), dtype=bool)  # type: ignore
+        self._edge_index = None
+        # The remaining edges are renumbered, keeping their order
+        if self._edge_origins is not None:
+            self._edge_origins = np.delete(self._edge_origins, deleted)
+        logger.debug(f"Compacted graph storage, removing {len(deleted)} deleted edges.")
+        return True
 
     async def score_nodes(self, initial_weights: Optional[csr_matrix]) -> csr_matrix:
-        if self._graph.vcount() == 0:  # type: ignore
+        if await self.node_count() == 0:
             logger.info("Trying to score nodes in an empty graph.")
-            return csr_matrix((1, 0))
-
-        reset_prob = initial_weights.toarray().flatten() if initial_weights is not None else None
-
-        ppr_scores = self._graph.personalized_pagerank(  # type: ignore
-            damping=self.config.ppr_damping, directed=False, reset=reset_prob
-        )
+            return csr_matrix((1 if initial_weights is None else initial_weights.shape[0], 0))
+        if initial_weights is not None:
+            initial_weights = csr_matrix(initial_weights)
+
+        if self.config.ppr_method == "push" and initial_weights is not None:
+            return vstack(
+                [
+                    self._get_ppr_engine().push(initial_weights[i], epsilon=self.config.ppr_push_epsilon)
+                    for i in range(initial_weights.shape[0])
+                ],
+                format="csr",
+            ).astype(np.float32)
+        elif self.config.ppr_method == "igraph":
+            reset_probs = initial_weights.toarray() if initial_weights is not None else [None]
+            # Deleted edges are not walked
+            weights = (~self._tombstones).astype(np.float64) if self._tombstones.any() else None
+            ppr_scores = [
+                self._graph.personalized_pagerank(  # type: ignore
+                    damping=self.config.ppr_damping, directed=False, reset=reset_prob, weights=weights
+                )
+                for reset_prob in reset_probs
+            ]
+        else:
+            ppr_scores = self._get_ppr_engine()(
+                initial_weights, x0=self._ppr_last_scores if self.config.ppr_warm_start else None
+            )
+            if self.config.ppr_warm_start:
+                self._ppr_last_scores = ppr_scores
         ppr_scores = np.array(ppr_scores, dtype=np.float32)  # type: ignore
 
         return csr_matrix(
-            ppr_scores.reshape(1, -1)  # type: ignore
+            ppr_scores.reshape(-1, await self.node_count())  # type: ignore
         )
 
-    async def get_entities_to_relationships_map(self) -> csr_matrix:
-        if len(self._graph.vs) == 0:  # type: ignore
+    def _get_ppr_engine(self) -> PersonalizedPageRank:
+        engine = self._ppr_cache.get("engine", None)
+        if engine is None and (columns := self._columns_only):
+            engine = PersonalizedPageRank.from_adjacency(
+                columns.adjacency,
+                damping=self.config.ppr_damping,
+                tolerance=self.config.ppr_tolerance,
+                max_iter=self.config.ppr_max_iter,
+            )
+            self._ppr_cache["engine"] = engine
+        elif engine is None:
+            engine = PersonalizedPageRank.from_edges(
+                self._graph.vcount(),  # type: ignore
+                np.array(self._graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)[~self._tombstones],  # type: ignore
+                damping=self.config.ppr_damping,
+                tolerance=self.config.ppr_tolerance,
+                max_iter=self.config.ppr_max_iter,
+            )
+            self._ppr_cache["engine"] = engine
+        return engine
+
+    async def get_entities_to_relationships_map(self, edge_indices: Optional[Iterable[TIndex]] = None) -> csr_matrix:
+        if await self.node_count() == 0:
             return csr_matrix((0, 0))
 
-        return csr_from_indices_list(
-            [
-                [edge.index for edge in vertex.incident()]  # type: ignore
-                for vertex in self._graph.vs  # type: ignore
-            ],
+        if edge_indices is None:
+            edge_ids = np.flatnonzero(~self._tombstones)
+        else:
+            edge_ids = np.array(list(edge_indices), dtype=np.int64)
+            edge_ids = edge_ids[~self._tombstones[edge_ids]]
+
+        if columns := self._columns_only:
+            edge_list = columns.edges[edge_ids].astype(np.int64).reshape(-1, 2)
+        elif edge_indices is None:
+            edge_list = np.array(self._graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)  # type: ignore
+            edge_list = edge_list[edge_ids]
+        else:
+            edge_list = np.array(
+                [self._graph.es[i].tuple for i in edge_ids], dtype=np.int64  # type: ignore
+            ).reshape(-1, 2)
+
+        # Each edge is incident to its two endpoints (twice to the same vertex for self-loops)
+        return csr_matrix(
+            (
+                np.ones(2 * len(edge_ids), dtype=np.int64),
+                (np.concatenate([edge_list[:, 0], edge_list[:, 1]]), np.concatenate([edge_ids, edge_ids])),
+            ),
             shape=(await self.node_count(), await self.edge_count()),
         )
 
-    async def get_relationships_attrs(self, key: str) -> List[List[Any]]:
-        if len(self._graph.es) == 0:  # type: ignore
+    async def get_relationships_attrs(
+        self, key: str, edge_indices: Optional[Iterable[TIndex]] = None
+    ) -> List[List[Any]]:
+        if await self.edge_count() == 0:
             return []
 
+        if columns := self._columns_only:
+            attrs = columns.get_edge_attribute(key, range(columns.num_edges) if edge_indices is None else edge_indices)
+        elif edge_indices is None:
+            attrs = self._graph.es[key]  # type: ignore
+        else:
+            attrs = [self._graph.es[i][key] for i in edge_indices]  # type: ignore
+
+        indices = range(len(self._tombstones)) if edge_indices is None else edge_indices
         lists_of_attrs: List[List[TIndex]] = []
-        for attr in self._graph.es[key]:  # type: ignore
-            lists_of_attrs.append(list(attr))  # type: ignore
+        for index, attr in zip(indices, attrs):  # type: ignore
+            # Deleted edges have no attributes
+            lists_of_attrs.append(list(attr) if not self._tombstones[index] else [])  # type: ignore
 
         return lists_of_attrs
 
+    async def get_edge_origins(self) -> Optional[npt.NDArray[np.int64]]:
+        return self._edge_origins
+
+    def _lookup_edges(self, pairs: Iterable[Tuple[Union[GTId, TIndex], Union[GTId, TIndex]]]) -> List[List[TIndex]]:
+        """Return for each (source, target) pair, given by vertex names or indices, the edges between them."""
+        if self._edge_index is None:
+            edge_list = (
+                columns.edges.tolist()
+                if (columns := self._columns_only)
+                else self._graph.get_edgelist()  # type: ignore
+            )
+            self._edge_index = {}
+            for index, (source, target) in enumerate(edge_list):
+                self._edge_index.setdefault(self._pair(source, target), []).append(index)
+
+        edges: List[List[TIndex]] = []
+        for source, target in pairs:
+            if not isinstance(source, (int, np.integer)):
+                source = self._names.get(source, None)  # type: ignore
+            if not isinstance(target, (int, np.integer)):
+                target = self._names.get(target, None)  # type: ignore
+            if source is None or target is None:
+                edges.append([])
+            else:
+                indices = self._edge_index.get(self._pair(int(source), int(target)), ())
+                edges.append([index for index in indices if not self._tombstones[index]])
+        return edges
+
+    def _index_new_edges(self, start: TIndex) -> None:
+        """Add the edges appended to the graph from the given index to the pair index."""
+        if self._edge_index is None:
+            return
+        for edge in self._graph.es[start:]:  # type: ignore
+            self._edge_index.setdefault(self._pair(*edge.tuple), []).append(edge.index)  # type: ignore
+
+    @staticmethod
+    def _pair(source: int, target: int) -> Tuple[int, int]:
+        return (source, target) if source <= target else (target, source)
+
+    def _track_edges(self, added: int = 0, modified: Iterable[TIndex] = ()) -> None:
+        if added:
+            self._tombstones = np.concatenate([self._tombstones, np.zeros(added, dtype=bool)])
+        if self._edge_origins is None:
+            return
+        modified = list(modified)
+        if modified:
+            self._edge_origins[modified] = -1
+        if added:
+            self._edge_origins = np.concatenate([self._edge_origins, np.full(added, -1, dtype=np.int64)])
+
+    def get_state(self) -> Tuple[Any, ...]:
+        return self._igraph, self._columns, self._tombstones, self._name_to_index, self._ppr_cache
+
+    def _set_state(self, state: Tuple[Any, ...]) -> None:
+        self._igraph, self._columns, self._tombstones, self._name_to_index, self._ppr_cache = state
+        self._edge_index = None
+        self._ppr_last_scores = None
+
+    def _get_node_attributes(self, index: TIndex) -> Dict[str, Any]:
+        if columns := self._columns_only:
+            return columns.get_vertex(index)
+        return self._graph.vs[index].attributes()  # type: ignore
+
+    def _build_name_index(self) -> None:
+        """Build the map from node names to vertex indices, decoding the names of all the vertices."""
+        if columns := self._columns_only:
+            names = columns.get_vertex_attribute("name", range(columns.num_nodes)) if columns.num_nodes else []
+        elif self._graph.vcount() == 0:  # type: ignore
+            names = []
+        else:
+            names = self._graph.vs["name"]  # type: ignore
+        # Keep the first vertex of duplicated names, as `vs.find` did
+        self._name_to_index = {names[i]: i for i in range(len(names) - 1, -1, -1)}
+
     async def _insert_start(self):
         if self.namespace:
-            graph_file_name = self.namespace.get_load_path(self.RESOURCE_NAME)
-
-            if graph_file_name:
-                try:
-                    buffer = download_graph_to_gcs(graph_file_name)
-                    self._graph = ig.Graph.Read_Picklez(buffer)  
-                    logger.debug(f"Loaded graph storage '{graph_file_name}'.")
-                    buffer.close()
-                except Exception as e:
-                    t = f"Error loading graph from {graph_file_name}: {e}"
-                    logger.error(t)
-                    raise InvalidStorageError(t) from e
+            graph = await self._load()
+            # Inserting mutates the graph, so it is decoded with all its attributes
+            if isinstance(graph, GraphColumns):
+                self._graph, self._tombstones = graph.to_graph(), np.array(graph.deleted, dtype=bool)
             else:
-                logger.info(f"No data file found for graph storage '{graph_file_name}'. Loading empty graph.")
-                self._graph = ig.Graph(directed=False)
+                self._graph, self._tombstones = graph, np.zeros(graph.ecount(), dtype=bool)  # type: ignore
         else:
-            self._graph = ig.Graph(directed=False)
+            self._graph, self._tombstones = ig.Graph(directed=False), np.zeros(0, dtype=bool)
             logger.debug("Creating new volatile graphdb storage.")
+        self._name_to_index = None
+        self._ppr_cache = {}
+        self._ppr_last_scores = None
+        self._edge_index = None
+        self._edge_origins = np.arange(self._graph.ecount(), dtype=np.int64)  # type: ignore
 
     async def _insert_done(self):
         if self.namespace:
             graph_file_name = self.namespace.get_save_path(self.RESOURCE_NAME)
             try:
-                # Create an in-memory buffer
-                buffer = io.BytesIO()
-                
-                # Write the graph to the buffer instead of file
-                ig.Graph.write_picklez(self._graph, buffer)
-                
-                # Reset buffer position
-                buffer.seek(0)
-                
-                upload_graph_to_gcs(graph_file_name, buffer)
-                buffer.close()
-                
+                await run_in_io_executor(
+                    self._save_graph, self.namespace.store, self._graph, self._tombstones, graph_file_name
+                )
+                # A legacy graph saved in place is superseded by the columnar one
+                legacy_file_name = await self.namespace.async_get_load_path(self.LEGACY_RESOURCE_NAME)
+                if legacy_file_name and legacy_file_name == self.namespace.get_save_path(self.LEGACY_RESOURCE_NAME):
+                    await run_in_io_executor(self.namespace.store.delete, legacy_file_name)
             except Exception as e:
                 t = f"Error saving graph to {graph_file_name}: {e}"
                 logger.error(t)
@@ -246,20 +527,75 @@ class IGraphStorage(BaseGraphStorage[GTNode, GTEdge, GTId]):
 
     async def _query_start(self):
         assert self.namespace, "Loading a graph requires a namespace."
-        graph_file_name = self.namespace.get_load_path(self.RESOURCE_NAME)
-        if graph_file_name:
-            try:
-                buffer = download_graph_to_gcs(graph_file_name)
-                self._graph = ig.Graph.Read_Picklez(buffer)  
-                logger.debug(f"Loaded graph storage '{graph_file_name}'.")
-                buffer.close()
-            except Exception as e:
-                t = f"Error loading graph from '{graph_file_name}': {e}"
-                logger.error(t)
-                raise InvalidStorageError(t) from e
+        graph = await self._load()
+        if isinstance(graph, GraphColumns):
+            self._igraph, self._columns, self._tombstones = None, graph, graph.deleted
         else:
-            logger.warning(f"No data file found for graph storage '{graph_file_name}'. Loading empty graph.")
-            self._graph = ig.Graph(directed=False)
+            self._graph, self._tombstones = graph, np.zeros(graph.ecount(), dtype=bool)  # type: ignore
+        self._name_to_index = None
+        self._ppr_cache = {}
+        self._ppr_last_scores = None
+        self._edge_index = None
+
+    async def _load(self) -> Union[ig.Graph, GraphColumns]:  # type: ignore
+        assert self.namespace, "Loading a graph requires a namespace."
+        graph_file_name = await self.namespace.async_get_load_path(self.RESOURCE_NAME)
+        # Graphs saved before the columnar format are converted the next time they are saved
+        legacy_file_name = (
+            await self.namespace.async_get_load_path(self.LEGACY_RESOURCE_NAME) if not graph_file_name else None
+        )
+        if not graph_file_name and not legacy_file_name:
+            logger.info(f"No data file found for graph storage '{graph_file_name}'. Loading empty graph.")
+            return ig.Graph(directed=False)
+
+        try:
+            if graph_file_name:
+                graph = await run_in_io_executor(self._load_columns, self.namespace.store, graph_file_name)
+            else:
+                graph = await run_in_io_executor(self._load_graph, self.namespace.store, legacy_file_name)
+            logger.debug(f"Loaded graph storage '{graph_file_name or legacy_file_name}'.")
+            return graph
+        except Exception as e:
+            t = f"Error loading graph from '{graph_file_name or legacy_file_name}': {e}"
+            logger.error(t)
+            raise InvalidStorageError(t) from e
+
+    @staticmethod
+    def _load_columns(store: BaseObjectStore, graph_file_name: str) -> GraphColumns:
+        # Map the local copy of the store when there is one, so that only the accessed pages are read
+        local_file = store.get_local_path(graph_file_name)
+        if local_file is not None:
+            return GraphColumns.read(np.memmap(local_file, dtype=np.uint8, mode="r"))
+        return GraphColumns.read(store.read_bytes(graph_file_name))
+
+    @staticmethod
+    def _load_graph(store: BaseObjectStore, graph_file_name: str) -> ig.Graph:  # type: ignore
+        # Read the graph straight from disk, reusing the local copy of the store when there is one
+        local_file = store.get_local_path(graph_file_name)
+        if local_file is not None:
+            return ig.Graph.Read_Picklez(local_file)
+
+        fd, temp_file = tempfile.mkstemp(suffix=".pklz")
+        os.close(fd)
+        try:
+            store.download_to_file(graph_file_name, temp_file)
+            return ig.Graph.Read_Picklez(temp_file)
+        finally:
+            os.remove(temp_file)
+
+    @staticmethod
+    def _save_graph(
+        store: BaseObjectStore, graph: ig.Graph, deleted: npt.NDArray[np.bool_], graph_file_name: str  # type: ignore
+    ) -> None:
+        # Serialize to a temporary file rather than memory, large graphs are uploaded in parallel chunks from it
+        fd, temp_file = tempfile.mkstemp(suffix=".cols")
+        os.close(fd)
+        try:
+            with open(temp_file, "wb") as f:
+                GraphColumns.write(graph, f, deleted=deleted)
+            store.upload_from_file(graph_file_name, temp_file)
+        finally:
+            os.remove(temp_file)
 
     async def _query_done(self):
         pass
@@ -0,0 +1,168 @@
+import json
+import pickle
+import struct
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
+
+import igraph as ig  # type: ignore
+import numpy as np
+import numpy.typing as npt
+from scipy.sparse import csr_matrix
+
+from cortex_ingestion._exceptions import InvalidStorageError
+
+from cortex_ingestion._storage._ppr import undirected_adjacency
+
+
+@dataclass
+class GraphColumns:
+    """Read-only columnar view of an undirected igraph graph.
+
+    The file holds a JSON header followed by 64-byte aligned arrays: the int32 edge list, the mask of the deleted
+    edges, the CSR adjacency of the remaining edges (int64 offsets, int32 neighbours, float32 edge multiplicities)
+    and one table per vertex and edge attribute.
+    Attributes holding only strings are stored as utf-8 bytes with int64 offsets, the others as one pickle per
+    element. Since the arrays are views over the buffer they were read from, a memory-mapped file is only paged
+    in where it is accessed: the graph can be scored without decoding any attribute, and each attribute value is
+    decoded when it is requested.
+    """
+
+    MAGIC = b"CGCOLS01"
+    ALIGNMENT = 64
+
+    num_nodes: int = field()
+    num_edges: int = field()
+    edges: npt.NDArray[np.int32] = field(repr=False)
+    deleted: npt.NDArray[np.bool_] = field(repr=False)
+    adjacency: csr_matrix = field(repr=False)
+    # Attribute name -> (kind, offsets, data), kind is "str" or "pickle"
+    vertex_attributes: Dict[str, Tuple[str, npt.NDArray[np.int64], npt.NDArray[np.uint8]]] = field(repr=False)
+    edge_attributes: Dict[str, Tuple[str, npt.NDArray[np.int64], npt.NDArray[np.uint8]]] = field(repr=False)
+
+    @staticmethod
+    def write(graph: ig.Graph, f: BinaryIO, deleted: Optional[npt.NDArray[np.bool_]] = None) -> None:  # type: ignore
+        num_nodes = graph.vcount()  # type: ignore
+        edges = np.array(graph.get_edgelist(), dtype=np.int32).reshape(-1, 2)  # type: ignore
+        if deleted is None:
+            deleted = np.zeros(len(edges), dtype=bool)
+
+        adjacency = undirected_adjacency(num_nodes, edges[~deleted], dtype=np.float32)
+
+        arrays: Dict[str, npt.NDArray[Any]] = {
+            "edges": edges,
+            "edges.deleted": deleted,
+            "adjacency.indptr": adjacency.indptr.astype(np.int64),
+            "adjacency.indices": adjacency.indices.astype(np.int32),
+            "adjacency.data": adjacency.data,
+        }
+        attributes: Dict[str, Dict[str, str]] = {"vertex": {}, "edge": {}}
+        for prefix, sequence in (("vertex", graph.vs), ("edge", graph.es)):  # type: ignore
+            for name in sequence.attribute_names():  # type: ignore
+                kind, offsets, data = GraphColumns._encode(sequence[name])  # type: ignore
+                attributes[prefix][name] = kind
+                arrays[f"{prefix}.{name}.offsets"] = offsets
+                arrays[f"{prefix}.{name}.data"] = data
+
+        header: Dict[str, Any] = {
+            "num_nodes": num_nodes,
+            "num_edges": len(edges),
+            "attributes": attributes,
+            "arrays": {},
+        }
+        offset = 0
+        for name, array in arrays.items():
+            header["arrays"][name] = {"dtype": array.dtype.str, "shape": array.shape, "offset": offset}
+            offset = GraphColumns._align(offset + array.nbytes)
+        header_bytes = json.dumps(header).encode()
+
+        # The arrays start at the first aligned position after the magic, the header and its length
+        start = GraphColumns._align(len(GraphColumns.MAGIC) + 8 + len(header_bytes))
+        f.write(GraphColumns.MAGIC + struct.pack("<Q", len(header_bytes)) + header_bytes)
+        f.write(b"\0" * (start - f.tell()))
+        for name, array in arrays.items():
+            f.write(b"\0" * (start + header["arrays"][name]["offset"] - f.tell()))
+            f.write(np.ascontiguousarray(array).tobytes())
+
+    @staticmethod
+    def read(buffer: Union[bytes, np.memmap]) -> "GraphColumns":  # type: ignore
+        buffer = np.frombuffer(buffer, dtype=np.uint8) if isinstance(buffer, bytes) else buffer
+        magic_size = len(GraphColumns.MAGIC)
+        if buffer[:magic_size].tobytes() != GraphColumns.MAGIC:
+            raise InvalidStorageError("Invalid columnar graph file.")
+        (header_size,) = struct.unpack("<Q", buffer[magic_size : magic_size + 8].tobytes())
+        header = json.loads(buffer[magic_size + 8 : magic_size + 8 + header_size].tobytes())
+        start = GraphColumns._align(magic_size + 8 + header_size)
+
+        def array(name: str) -> npt.NDArray[Any]:
+            spec = header["arrays"][name]
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            offset = start + spec["offset"]
+            return buffer[offset : offset + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+
+        num_nodes = header["num_nodes"]
+        return GraphColumns(
+            num_nodes=num_nodes,
+            num_edges=header["num_edges"],
+            edges=array("edges"),
+            deleted=(
+                array("edges.deleted")
+                if "edges.deleted" in header["arrays"]
+                else np.zeros(header["num_edges"], dtype=bool)
+            ),
+            adjacency=csr_matrix(
+                (array("adjacency.data"), array("adjacency.indices"), array("adjacency.indptr")),
+                shape=(num_nodes, num_nodes),
+            ),
+            vertex_attributes={
+                name: (kind, array(f"vertex.{name}.offsets"), array(f"vertex.{name}.data"))
+                for name, kind in header["attributes"]["vertex"].items()
+            },
+            edge_attributes={
+                name: (kind, array(f"edge.{name}.offsets"), array(f"edge.{name}.data"))
+                for name, kind in header["attributes"]["edge"].items()
+            },
+        )
+
+    def get_vertex(self, index: int) -> Dict[str, Any]:
+        return {name: self._decode(column, index) for name, column in self.vertex_attributes.items()}
+
+    def get_edge(self, index: int) -> Dict[str, Any]:
+        return {name: self._decode(column, index) for name, column in self.edge_attributes.items()}
+
+    def get_vertex_attribute(self, name: str, indices: Iterable[int]) -> List[Any]:
+        column = self.vertex_attributes[name]
+        return [self._decode(column, i) for i in indices]
+
+    def get_edge_attribute(self, name: str, indices: Iterable[int]) -> List[Any]:
+        column = self.edge_attributes[name]
+        return [self._decode(column, i) for i in indices]
+
+    def to_graph(self) -> ig.Graph:  # type: ignore
+        """Decode the whole graph, with all its attributes and including the deleted edges."""
+        graph = ig.Graph(n=self.num_nodes, edges=self.edges.tolist(), directed=False)  # type: ignore
+        for name in self.vertex_attributes:
+            graph.vs[name] = self.get_vertex_attribute(name, range(self.num_nodes))  # type: ignore
+        for name in self.edge_attributes:
+            graph.es[name] = self.get_edge_attribute(name, range(self.num_edges))  # type: ignore
+        return graph
+
+    @staticmethod
+    def _encode(values: List[Any]) -> Tuple[str, npt.NDArray[np.int64], npt.NDArray[np.uint8]]:
+        if all(isinstance(v, str) for v in values):
+            kind, encoded = "str", [v.encode() for v in values]
+        else:
+            kind, encoded = "pickle", [pickle.dumps(v) for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return kind, offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    @staticmethod
+    def _decode(column: Tuple[str, npt.NDArray[np.int64], npt.NDArray[np.uint8]], index: int) -> Any:
+        kind, offsets, data = column
+        raw = data[offsets[index] : offsets[index + 1]].tobytes()
+        return raw.decode() if kind == "str" else pickle.loads(raw)
+
+    @staticmethod
+    def _align(offset: int) -> int:
+        return -(-offset // GraphColumns.ALIGNMENT) * GraphColumns.ALIGNMENT
@@ -1,6 +1,6 @@
 import pickle
 from dataclasses import dataclass, field
-from typing import Dict, Iterable, List, Optional, Union
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 import numpy as np
 import numpy.typing as npt
@@ -10,7 +10,6 @@ from cortex_ingestion._types import GTKey, GTValue, TIndex
 from cortex_ingestion._utils import logger
 
 from cortex_ingestion._storage._base import BaseIndexedKeyValueStorage
-from cortex_ingestion.cloud_services._googlecloud import download_pickle_from_gcs, upload_pickle_to_gcs
 
 
 @dataclass
@@ -34,6 +33,7 @@ class PickleIndexedKeyValueStorage(BaseIndexedKeyValueStorage[GTKey, GTValue]):
         return (self._key_to_index.get(key, None) for key in keys)
 
     async def upsert(self, keys: Iterable[GTKey], values: Iterable[GTValue]) -> None:
+        self.mark_dirty()
         for key, value in zip(keys, values):
             index = self._key_to_index.get(key, None)
             if index is None:
@@ -48,6 +48,7 @@ class PickleIndexedKeyValueStorage(BaseIndexedKeyValueStorage[GTKey, GTValue]):
             self._data[index] = value
 
     async def delete(self, keys: Iterable[GTKey]) -> None:
+        self.mark_dirty()
         for key in keys:
             index = self._key_to_index.pop(key, None)
             if index is not None:
@@ -75,13 +76,22 @@ class PickleIndexedKeyValueStorage(BaseIndexedKeyValueStorage[GTKey, GTValue]):
 
         return ~np.isin(keys_array, self._np_keys)
 
+    def get_state(self) -> Tuple[Dict[Union[None, TIndex], GTValue], List[TIndex], Dict[GTKey, TIndex]]:
+        return self._data, self._free_indices, self._key_to_index
+
+    def _set_state(self, state: Tuple[Dict[Union[None, TIndex], GTValue], List[TIndex], Dict[GTKey, TIndex]]) -> None:
+        self._data, self._free_indices, self._key_to_index = state
+        self._np_keys = None
+
     async def _insert_start(self):
         if self.namespace:
-            data_file_name = self.namespace.get_load_path(self.RESOURCE_NAME)
+            data_file_name = await self.namespace.async_get_load_path(self.RESOURCE_NAME)
 
             if data_file_name:
                 try:
-                    self._data, self._free_indices, self._key_to_index = download_pickle_from_gcs(data_file_name)
+                    self._data, self._free_indices, self._key_to_index = await self.namespace.store.async_read_pickle(
+                        data_file_name
+                    )
                     logger.debug(
                         f"Loaded {len(self._data)} elements from indexed key-value storage '{data_file_name}'."
                     )
@@ -105,7 +115,9 @@ class PickleIndexedKeyValueStorage(BaseIndexedKeyValueStorage[GTKey, GTValue]):
         if self.namespace:
             data_file_name = self.namespace.get_save_path(self.RESOURCE_NAME)
             try:
-                upload_pickle_to_gcs(data_file_name, (self._data, self._free_indices, self._key_to_index))
+                await self.namespace.store.async_write_pickle(
+                    data_file_name, (self._data, self._free_indices, self._key_to_index)
+                )
                 logger.debug(f"Saving {len(self._data)} elements to indexed key-value storage '{data_file_name}'.")
             except Exception as e:
                 t = f"Error saving data file for key-vector storage '{data_file_name}': {e}"
@@ -114,10 +126,12 @@ class PickleIndexedKeyValueStorage(BaseIndexedKeyValueStorage[GTKey, GTValue]):
 
     async def _query_start(self):
         assert self.namespace, "Loading a kv storage requires a namespace."
-        data_file_name = self.namespace.get_load_path(self.RESOURCE_NAME)
+        data_file_name = await self.namespace.async_get_load_path(self.RESOURCE_NAME)
         if data_file_name:
             try:
-                self._data, self._free_indices, self._key_to_index = download_pickle_from_gcs(data_file_name)
+                self._data, self._free_indices, self._key_to_index = await self.namespace.store.async_read_pickle(
+                    data_file_name
+                )
                 logger.debug(
                     f"Loaded {len(self._data)} elements from indexed key-value storage '{data_file_name}'."
                 )
@@ -0,0 +1,308 @@
+import asyncio
+import mmap
+import pickle
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import numpy.typing as npt
+
+from cortex_ingestion._exceptions import InvalidStorageError
+from cortex_ingestion._types import GTKey, GTValue, TIndex
+from cortex_ingestion._utils import logger, run_in_io_executor
+
+from cortex_ingestion._storage._base import BaseIndexedKeyValueStorage
+from cortex_ingestion._storage._ikv_pickle import PickleIndexedKeyValueStorage
+
+# Location of a value: (segment, offset, length)
+TLocation = Tuple[int, int, int]
+
+
+@dataclass
+class SegmentedIndexedKeyValueStorage(BaseIndexedKeyValueStorage[GTKey, GTValue]):
+    """An indexed key-value storage keeping its values in append-only segments.
+
+    The storage is saved as an index, mapping the keys to indices and the indices to the location of their value,
+    and a list of segments holding the individually compressed values. Each commit appends one segment with the
+    values upserted since the previous one, so the unchanged segments are never saved again. Segments are only
+    loaded (memory-mapped if the object store provides a local file) once one of their values is requested.
+    When more than COMPACTION_GARBAGE_RATIO of the saved bytes belong to overwritten or deleted values, all the
+    segments are compacted into a single one.
+    """
+
+    RESOURCE_NAME = "kv_index.pkl"
+    RESOURCE_SEGMENT_NAME = "kv_segment_{:06d}.bin"
+    COMPACTION_GARBAGE_RATIO = 0.5
+
+    _key_to_index: Dict[GTKey, TIndex] = field(init=False, default_factory=dict)
+    _free_indices: List[TIndex] = field(init=False, default_factory=list)
+    _locations: Dict[TIndex, TLocation] = field(init=False, default_factory=dict)
+    _segments: Dict[int, int] = field(init=False, default_factory=dict)  # Segment -> size in bytes
+    _next_segment: int = field(init=False, default=0)
+    _pending: Dict[TIndex, GTValue] = field(init=False, default_factory=dict)  # Values not saved in a segment yet
+    _segment_data: Dict[int, Union[bytes, mmap.mmap]] = field(init=False, default_factory=dict)
+    _np_keys: Optional[npt.NDArray[np.object_]] = field(init=False, default=None)
+
+    async def size(self) -> int:
+        return len(self._key_to_index)
+
+    async def get(self, keys: Iterable[GTKey]) -> Iterable[Optional[GTValue]]:
+        return await self._get_values([self._key_to_index.get(key, None) for key in keys])
+
+    async def get_by_index(self, indices: Iterable[TIndex]) -> Iterable[Optional[GTValue]]:
+        return await self._get_values(list(indices))
+
+    async def get_index(self, keys: Iterable[GTKey]) -> Iterable[Optional[TIndex]]:
+        return (self._key_to_index.get(key, None) for key in keys)
+
+    async def upsert(self, keys: Iterable[GTKey], values: Iterable[GTValue]) -> None:
+        self.mark_dirty()
+        for key, value in zip(keys, values):
+            index = self._key_to_index.get(key, None)
+            if index is None:
+                if len(self._free_indices) > 0:
+                    index = self._free_indices.pop()
+                else:
+                    index = TIndex(len(self._key_to_index))
+                self._key_to_index[key] = index
+
+                # Invalidate cache
+                self._np_keys = None
+            # The saved value, if any, becomes garbage
+            self._locations.pop(index, None)
+            self._pending[index] = value
+
+    async def delete(self, keys: Iterable[GTKey]) -> None:
+        self.mark_dirty()
+        for key in keys:
+            index = self._key_to_index.pop(key, None)
+            if index is not None:
+                self._free_indices.append(index)
+                self._locations.pop(index, None)
+                self._pending.pop(index, None)
+
+                # Invalidate cache
+                self._np_keys = None
+            else:
+                logger.warning(f"Key '{key}' not found in indexed key-value storage.")
+
+    async def mask_new(self, keys: Iterable[GTKey]) -> Iterable[bool]:
+        keys = list(keys)
+
+        if len(keys) == 0:
+            return np.array([], dtype=bool)
+
+        if self._np_keys is None:
+            self._np_keys = np.fromiter(
+                self._key_to_index.keys(),
+                count=len(self._key_to_index),
+                dtype=type(keys[0]),
+            )
+        keys_array = np.array(keys, dtype=type(keys[0]))
+
+        return ~np.isin(keys_array, self._np_keys)
+
+    def get_state(self) -> Tuple[Any, ...]:
+        # The loaded segments are immutable, sharing them lets later sessions skip loading them again
+        return (
+            self._key_to_index,
+            self._free_indices,
+            self._locations,
+            self._segments,
+            self._next_segment,
+            self._pending,
+            self._segment_data,
+        )
+
+    def _set_state(self, state: Tuple[Any, ...]) -> None:
+        (
+            self._key_to_index,
+            self._free_indices,
+            self._locations,
+            self._segments,
+            self._next_segment,
+            self._pending,
+            self._segment_data,
+        ) = state
+        self._np_keys = None
+
+    async def _insert_start(self):
+        await self._load()
+
+    async def _insert_done(self):
+        if self.namespace:
+            try:
+                await run_in_io_executor(self._save)
+            except Exception as e:
+                t = f"Error saving indexed key-value storage '{self.namespace.get_save_path(self.RESOURCE_NAME)}': {e}"
+                logger.error(t)
+                raise InvalidStorageError(t) from e
+
+    async def _query_start(self):
+        assert self.namespace, "Loading a kv storage requires a namespace."
+        await self._load()
+
+    async def _query_done(self):
+        pass
+
+    async def _get_values(self, indices: List[Optional[TIndex]]) -> List[Optional[GTValue]]:
+        missing_segments = {
+            location[0]
+            for index in indices
+            if index is not None and (location := self._locations.get(index, None)) is not None
+        }.difference(self._segment_data)
+        if missing_segments:
+            segments = list(missing_segments)
+            loaded = await asyncio.gather(*[run_in_io_executor(self._load_segment, s) for s in segments])
+            self._segment_data.update(zip(segments, loaded))
+
+        return [self._get_value(index) for index in indices]
+
+    def _get_value(self, index: Optional[TIndex]) -> Optional[GTValue]:
+        if index is None:
+            return None
+        if index in self._pending:
+            return self._pending[index]
+        if index not in self._locations:
+            return None
+        return pickle.loads(zlib.decompress(self._get_record(index)))
+
+    def _get_record(self, index: TIndex) -> bytes:
+        segment, offset, length = self._locations[index]
+        return self._segment_data[segment][offset : offset + length]
+
+    def _reset(self) -> None:
+        self._key_to_index = {}
+        self._free_indices = []
+        self._locations = {}
+        self._segments = {}
+        self._next_segment = 0
+        self._pending = {}
+        self._segment_data = {}
+        self._np_keys = None
+
+    async def _load(self) -> None:
+        self._reset()
+        if self.namespace is None:
+            logger.debug("Creating new volatile indexed key-value storage.")
+            return
+
+        index_file_name = await self.namespace.async_get_load_path(self.RESOURCE_NAME)
+        if index_file_name:
+            try:
+                index = await self.namespace.store.async_read_pickle(index_file_name)
+                self._key_to_index = index["key_to_index"]
+                self._free_indices = index["free_indices"]
+                self._locations = index["locations"]
+                self._segments = index["segments"]
+                self._next_segment = index["next_segment"]
+                logger.debug(
+                    f"Loaded index of {len(self._key_to_index)} elements in {len(self._segments)} segments "
+                    f"from indexed key-value storage '{index_file_name}'."
+                )
+            except Exception as e:
+                t = f"Error loading index file for key-value storage '{index_file_name}': {e}"
+                logger.error(t)
+                raise InvalidStorageError(t) from e
+            return
+
+        # Storages saved by PickleIndexedKeyValueStorage are converted to segments the next time they are saved
+        data_file_name = await self.namespace.async_get_load_path(PickleIndexedKeyValueStorage.RESOURCE_NAME)
+        if data_file_name:
+            try:
+                data, self._free_indices, self._key_to_index = await self.namespace.store.async_read_pickle(
+                    data_file_name
+                )
+                self._pending = dict(data)
+                # Converted even if nothing else changes, the legacy file is then deleted
+                self.mark_dirty()
+                logger.debug(f"Loaded {len(self._pending)} elements from key-value storage '{data_file_name}'.")
+            except Exception as e:
+                t = f"Error loading data file for key-value storage '{data_file_name}': {e}"
+                logger.error(t)
+                raise InvalidStorageError(t) from e
+        else:
+            logger.info(f"No index file found for key-value storage '{index_file_name}'. Loading empty storage.")
+
+    def _load_segment(self, segment: int) -> Union[bytes, mmap.mmap]:
+        assert self.namespace, "Loading a kv segment requires a namespace."
+        segment_file_name = self.namespace.get_load_path(self.RESOURCE_SEGMENT_NAME.format(segment))
+        if segment_file_name is None:
+            raise InvalidStorageError(f"Segment {segment} of key-value storage '{self.namespace.namespace}' not found.")
+
+        local_file_name = self.namespace.store.get_local_path(segment_file_name)
+        if local_file_name is not None:
+            with open(local_file_name, "rb") as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.namespace.store.read_bytes(segment_file_name)
+
+    def _save(self) -> None:
+        assert self.namespace, "Saving a kv storage requires a namespace."
+        store = self.namespace.store
+
+        saved_bytes = sum(self._segments.values())
+        live_bytes = sum(length for _, _, length in self._locations.values())
+        compact = saved_bytes > 0 and (saved_bytes - live_bytes) > self.COMPACTION_GARBAGE_RATIO * saved_bytes
+
+        records = [(index, zlib.compress(pickle.dumps(value))) for index, value in self._pending.items()]
+        obsolete_segments: List[int] = []
+        if compact:
+            # Copy the live records as they are, without decompressing them
+            obsolete_segments = list(self._segments)
+            for segment in obsolete_segments:
+                if segment not in self._segment_data:
+                    self._segment_data[segment] = self._load_segment(segment)
+            records.extend((index, self._get_record(index)) for index in self._locations)
+            self._locations = {}
+            self._segments = {}
+
+        new_segment: Optional[int] = None
+        if records:
+            new_segment = self._next_segment
+            data = b"".join(record for _, record in records)
+            store.write_bytes(self.namespace.get_save_path(self.RESOURCE_SEGMENT_NAME.format(new_segment)), data)
+
+            offset = 0
+            for index, record in records:
+                self._locations[index] = (new_segment, offset, len(record))
+                offset += len(record)
+            self._segments[new_segment] = len(data)
+            self._segment_data[new_segment] = data
+            self._next_segment += 1
+        self._pending = {}
+
+        index_file_name = self.namespace.get_save_path(self.RESOURCE_NAME)
+        store.write_pickle(
+            index_file_name,
+            {
+                "key_to_index": self._key_to_index,
+                "free_indices": self._free_indices,
+                "locations": self._locations,
+                "segments": self._segments,
+                "next_segment": self._next_segment,
+            },
+        )
+        logger.debug(
+            f"Saved {len(records)} elements to indexed key-value storage '{index_file_name}' "
+            f"({len(self._segments)} segments{', compacted' if compact else ''})."
+        )
+
+        # A legacy data file saved in place is superseded by the segments, it would otherwise stay in the checkpoint
+        legacy_name = PickleIndexedKeyValueStorage.RESOURCE_NAME
+        legacy_file_name = self.namespace.get_load_path(legacy_name)
+        if legacy_file_name and legacy_file_name == self.namespace.get_save_path(legacy_name):
+            store.delete(legacy_file_name)
+
+        # The segments saved by previous checkpoints are referenced instead of being copied
+        self.namespace.keep(
+            self.RESOURCE_SEGMENT_NAME.format(segment) for segment in self._segments if segment != new_segment
+        )
+
+        for segment in obsolete_segments:
+            self._segment_data.pop(segment, None)
+            # Segments of the previous checkpoints are pruned with them, only the ones saved in place are deleted
+            segment_name = self.RESOURCE_SEGMENT_NAME.format(segment)
+            segment_file_name = self.namespace.get_load_path(segment_name)
+            if segment_file_name == self.namespace.get_save_path(segment_name):
+                store.delete(segment_file_name)
@@ -0,0 +1,108 @@
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Hashable, List, Optional
+
+from cortex_ingestion._exceptions import InvalidStorageError
+from cortex_ingestion.cloud_services import ObjectStat
+
+
+@dataclass
+class ManifestEntry:
+    size: int = field()
+    generation: Hashable = field()
+    checksum: Optional[str] = field(default=None)
+    checkpoint: Optional[int] = field(default=None)  # Checkpoint holding the object, if saved by a previous one
+
+
+@dataclass
+class CheckpointManifest:
+    """Index of the resources stored in a checkpoint.
+
+    The manifest is written once all the storages of the checkpoint have been saved, so that loading a checkpoint
+    only requires reading this object instead of listing the checkpoint directory. Resources that did not change
+    since the previous checkpoint are not saved again: their entry references the checkpoint holding them.
+    """
+
+    FILE_NAME = "manifest.json"
+    VERSION = 1
+
+    checkpoint: int = field()
+    resources: Dict[str, ManifestEntry] = field(default_factory=dict)
+    embedding_dim: Optional[int] = field(default=None)
+
+    @staticmethod
+    def from_stats(
+        checkpoint: int, stats: Dict[str, ObjectStat], embedding_dim: Optional[int] = None
+    ) -> "CheckpointManifest":
+        return CheckpointManifest(
+            checkpoint=checkpoint,
+            resources={
+                name: ManifestEntry(size=s.size, generation=s.generation, checksum=s.checksum)
+                for name, s in stats.items()
+                if name not in (CheckpointManifest.FILE_NAME, CheckpointIndex.FILE_NAME)
+            },
+            embedding_dim=embedding_dim,
+        )
+
+    @staticmethod
+    def from_bytes(data: bytes) -> "CheckpointManifest":
+        try:
+            raw = json.loads(data)
+            if raw["version"] != CheckpointManifest.VERSION:
+                raise ValueError(f"unsupported manifest version {raw['version']}")
+            return CheckpointManifest(
+                checkpoint=raw["checkpoint"],
+                resources={name: ManifestEntry(**entry) for name, entry in raw["resources"].items()},
+                embedding_dim=raw["embedding_dim"],
+            )
+        except (ValueError, KeyError, TypeError) as e:
+            raise InvalidStorageError(f"Invalid checkpoint manifest: {e}") from e
+
+    def to_bytes(self) -> bytes:
+        raw = {"version": self.VERSION, **asdict(self)}
+        return json.dumps(raw, indent=2, sort_keys=True).encode()
+
+    def get_checkpoint(self, resource_name: str) -> int:
+        """Return the checkpoint holding the given resource."""
+        entry = self.resources[resource_name]
+        return entry.checkpoint if entry.checkpoint is not None else self.checkpoint
+
+    @property
+    def generation(self) -> Hashable:
+        """Changes whenever any resource of the checkpoint is rewritten."""
+        return (
+            self.checkpoint,
+            tuple(sorted((name, self.get_checkpoint(name), e.generation) for name, e in self.resources.items())),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return sum(e.size for e in self.resources.values())
+
+
+@dataclass
+class CheckpointIndex:
+    """List of the committed checkpoints of a workspace, from the newest to the oldest.
+
+    The index is stored at the root of the workspace and updated once the manifest of a checkpoint has been written,
+    so that opening a workspace reads this object instead of listing its directories, and never sees checkpoints
+    still being written. Its presence also tells that the workspace is saved with manifests.
+    """
+
+    FILE_NAME = "checkpoints.json"
+    VERSION = 1
+
+    checkpoints: List[int] = field(default_factory=list)
+
+    @staticmethod
+    def from_bytes(data: bytes) -> "CheckpointIndex":
+        try:
+            raw = json.loads(data)
+            if raw["version"] != CheckpointIndex.VERSION:
+                raise ValueError(f"unsupported checkpoint index version {raw['version']}")
+            return CheckpointIndex(checkpoints=sorted((int(c) for c in raw["checkpoints"]), reverse=True))
+        except (ValueError, KeyError, TypeError) as e:
+            raise InvalidStorageError(f"Invalid checkpoint index: {e}") from e
+
+    def to_bytes(self) -> bytes:
+        return json.dumps({"version": self.VERSION, "checkpoints": self.checkpoints}).encode()
@@ -1,18 +1,23 @@
 import os
 import shutil
+import threading
 import time
-from typing import Any, Callable, List, Optional
+from dataclasses import replace
+from typing import Any, Callable, Hashable, Iterable, List, Optional, Set, Tuple, cast
 
 from cortex_ingestion._exceptions import InvalidStorageError
-from cortex_ingestion._utils import logger
-from cortex_ingestion.cloud_services._googlecloud import blob_exists, delete_blob, list_blobs, rename_blob
+from cortex_ingestion._utils import logger, run_in_io_executor
+from cortex_ingestion.cloud_services import BaseObjectStore, get_default_object_store
+
+from cortex_ingestion._storage._manifest import CheckpointIndex, CheckpointManifest
 
-bucket_name = "cortex-knowledge-base-beta"
 
 class Workspace:
     @staticmethod
-    def new(working_dir: str, checkpoint: int = 0, keep_n: int = 0) -> "Workspace":
-        return Workspace(working_dir, checkpoint, keep_n)
+    def new(
+        working_dir: str, checkpoint: int = 0, keep_n: int = 0, store: Optional[BaseObjectStore] = None
+    ) -> "Workspace":
+        return Workspace(working_dir, checkpoint, keep_n, store)
 
     @staticmethod
     def get_path(working_dir: str, checkpoint: Optional[int] = None) -> Optional[str]:
@@ -22,9 +27,12 @@ class Workspace:
             return working_dir
         return os.path.join(working_dir, str(checkpoint))
 
-    def __init__(self, working_dir: str, checkpoint: int = 0, keep_n: int = 0):
+    def __init__(
+        self, working_dir: str, checkpoint: int = 0, keep_n: int = 0, store: Optional[BaseObjectStore] = None
+    ):
         self.working_dir: str = working_dir
         self.keep_n: int = keep_n
+        self.store: BaseObjectStore = store if store is not None else get_default_object_store()
         # if not os.path.exists(working_dir):
         #     os.makedirs(working_dir)
         
@@ -33,15 +41,11 @@ class Workspace:
         #     reverse=True,
         # )
         
-        if not blob_exists(working_dir, bucket_name):
-            self.checkpoints = []
-            logger.info(f"Blob does not exist in GCS bucket: {working_dir}")
-            # raise InvalidStorageError("Blob does not exist in GCS bucket.")
-        else:
-            self.checkpoints = sorted(
-                (int(x) for x in list_blobs(working_dir) if not x.startswith("0__err_")),
-                reverse=True,
-            )
+        # Committed checkpoints are read from the index, workspaces saved before it existed are listed instead.
+        # A missing workspace simply has no checkpoint directories, no need for a separate existence check
+        index = self._read_index()
+        self._indexed = index is not None
+        self.checkpoints = index.checkpoints if index is not None else self._list_checkpoints()
 
         if self.checkpoints:
             self.current_load_checkpoint = checkpoint if checkpoint else self.checkpoints[0]
@@ -49,33 +53,216 @@ class Workspace:
             self.current_load_checkpoint = checkpoint
         self.save_checkpoint: Optional[int] = None
         self.failed_checkpoints: List[str] = []
+        self._save_lock = threading.Lock()
+        self._manifest: Optional[CheckpointManifest] = None
+        self._manifest_lock = threading.Lock()
+        self._kept_namespaces: Set[str] = set()
+        self._kept_resources: Set[str] = set()
 
     def __del__(self):
         for checkpoint in self.failed_checkpoints:
             old_path = os.path.join(self.working_dir, checkpoint)
             new_path = os.path.join(self.working_dir, f"0__err_{checkpoint}")
-            rename_blob(old_path, new_path)
+            self.store.rename_dir(old_path, new_path)
+        if self.failed_checkpoints and self._indexed:
+            self._update_index(remove=[int(c) for c in self.failed_checkpoints])
 
         if self.keep_n > 0:
-            checkpoints = list_blobs(self.working_dir, bucket_name)
-            for checkpoint in checkpoints[self.keep_n + 1 :]:
-                delete_blob(os.path.join(self.working_dir, str(checkpoint)))
+            self._prune_checkpoints()
+
+    def _prune_checkpoints(self) -> None:
+        index = self._read_index()
+        committed = index.checkpoints if index is not None else self._list_checkpoints()
+        if len(committed) <= self.keep_n + 1:
+            return
+        retained = committed[: self.keep_n + 1]
+        # Directories never committed are pruned as well, unless they are newer and may still be being written
+        pruned = [checkpoint for checkpoint in self._list_checkpoints() if checkpoint < retained[-1]]
+
+        # Resources of old checkpoints may still be referenced by the manifests of the retained ones
+        referenced: Set[Tuple[int, str]] = set()
+        for checkpoint in retained:
+            manifest_path = os.path.join(self.working_dir, str(checkpoint), CheckpointManifest.FILE_NAME)
+            try:
+                manifest = CheckpointManifest.from_bytes(self.store.read_bytes(manifest_path))
+            except InvalidStorageError:
+                continue
+            referenced.update((manifest.get_checkpoint(name), name) for name in manifest.resources)
+
+        for checkpoint in pruned:
+            checkpoint_path = os.path.join(self.working_dir, str(checkpoint))
+            kept = {name for c, name in referenced if c == checkpoint}
+            if len(kept) == 0:
+                self.store.delete_dir(checkpoint_path)
+                continue
+
+            # The manifest is kept as well, so that loading this checkpoint fails instead of loading partial data
+            for name in self.store.list(checkpoint_path):
+                if name not in kept and name != CheckpointManifest.FILE_NAME:
+                    self.store.delete(os.path.join(checkpoint_path, name))
+
+        if index is not None:
+            self._update_index(remove=[c for c in committed if c < retained[-1]])
+
+    def _list_checkpoints(self) -> List[int]:
+        # Failed checkpoints are renamed to "0__err_<checkpoint>", so they are skipped as well
+        return sorted((int(x) for x in self.store.list_dirs(self.working_dir) if x.isdigit()), reverse=True)
+
+    def _read_index(self) -> Optional[CheckpointIndex]:
+        try:
+            return CheckpointIndex.from_bytes(
+                self.store.read_bytes(os.path.join(self.working_dir, CheckpointIndex.FILE_NAME))
+            )
+        except InvalidStorageError as e:
+            logger.debug(f"No checkpoint index for workspace '{self.uri}' ({e}).")
+            return None
+
+    def _update_index(self, add: Optional[int] = None, remove: Iterable[int] = ()) -> None:
+        # Read again, other processes may have committed checkpoints since the workspace was opened
+        index = self._read_index()
+        checkpoints = set(index.checkpoints if index is not None else []) - set(remove)
+        if add is not None:
+            checkpoints.add(add)
+        self.store.write_bytes(
+            os.path.join(self.working_dir, CheckpointIndex.FILE_NAME),
+            CheckpointIndex(checkpoints=sorted(checkpoints, reverse=True)).to_bytes(),
+        )
+        self._indexed = True
+
+    @property
+    def uri(self) -> str:
+        return self.store.uri(self.working_dir)
 
     def make_for(self, namespace: str) -> "Namespace":
         return Namespace(self, namespace)
 
     def get_load_path(self) -> Optional[str]:
         load_path = self.get_path(self.working_dir, self.current_load_checkpoint)
-        if load_path == self.working_dir and len(list_blobs(load_path, bucket_name)) == 0:
+        if load_path is None:
+            return None
+        manifest = self.get_manifest()
+        if manifest is None or len(manifest.resources) == 0:
             return None
         return load_path
 
+    def get_manifest(self) -> Optional[CheckpointManifest]:
+        """Return the manifest of the checkpoint to load, reading it from the store only once per checkpoint."""
+        # Storages resolve their load paths concurrently from different threads
+        with self._manifest_lock:
+            if self._manifest is None or self._manifest.checkpoint != self.current_load_checkpoint:
+                self._manifest = self._read_manifest()
+            return self._manifest
+
+    def refresh_manifest(self) -> Optional[CheckpointManifest]:
+        """Drop the manifest read so far and read it again, to see the checkpoints saved by other processes."""
+        with self._manifest_lock:
+            self._manifest = None
+        return self.get_manifest()
+
+    async def async_refresh_manifest(self) -> Optional[CheckpointManifest]:
+        return await run_in_io_executor(self.refresh_manifest)
+
+    def _read_manifest(self) -> Optional[CheckpointManifest]:
+        while True:
+            load_path = self.get_path(self.working_dir, self.current_load_checkpoint)
+            if load_path is None:
+                return None
+
+            checkpoint = cast(int, self.current_load_checkpoint)
+            try:
+                manifest = CheckpointManifest.from_bytes(
+                    self.store.read_bytes(os.path.join(load_path, CheckpointManifest.FILE_NAME))
+                )
+            except InvalidStorageError as e:
+                if self._indexed:
+                    # The checkpoint was never committed, some of its resources may be missing or partially written
+                    logger.warning(f"No valid manifest for checkpoint '{self.store.uri(load_path)}' ({e}).")
+                    self.failed_checkpoints.append(str(checkpoint))
+                    self._rollback()
+                    continue
+                # Checkpoints saved before manifests were introduced: fall back to listing them
+                logger.debug(f"No manifest for checkpoint '{self.store.uri(load_path)}' ({e}). Listing its resources.")
+                manifest = CheckpointManifest.from_stats(checkpoint, self.store.list_stats(load_path))
+
+            # Loads of the resources can then skip requesting their metadata
+            self.store.set_expected_generations(
+                {self.get_resource_path(manifest, name): entry.generation for name, entry in manifest.resources.items()}
+            )
+            return manifest
+
+    def get_resource_path(self, manifest: CheckpointManifest, name: str) -> str:
+        # Unchanged resources are stored in the checkpoint which saved them last
+        checkpoint_path = cast(str, self.get_path(self.working_dir, manifest.get_checkpoint(name)))
+        return os.path.join(checkpoint_path, name)
+
+    def keep(self, namespace: str, resource_names: Optional[Iterable[str]] = None) -> None:
+        """Reference the loaded resources of the namespace from the next saved checkpoint, instead of saving them.
+
+        If no resource names are given, all the resources of the namespace are kept.
+        """
+        if resource_names is None:
+            self._kept_namespaces.add(namespace)
+        else:
+            self._kept_resources.update(f"{namespace}_{name}" for name in resource_names)
+
+    def _is_kept(self, name: str) -> bool:
+        return name in self._kept_resources or any(name.startswith(f"{ns}_") for ns in self._kept_namespaces)
+
+    def save_manifest(self, embedding_dim: Optional[int] = None) -> CheckpointManifest:
+        """Write the manifest of the checkpoint being saved, once all its resources have been written."""
+        save_path = self.get_save_path()
+        save_checkpoint = cast(int, self.save_checkpoint)
+        manifest = CheckpointManifest.from_stats(save_checkpoint, self.store.list_stats(save_path), embedding_dim)
+
+        loaded_manifest = self.get_manifest()
+        if loaded_manifest is not None:
+            for name, entry in loaded_manifest.resources.items():
+                if name in manifest.resources or not self._is_kept(name):
+                    continue
+                checkpoint = loaded_manifest.get_checkpoint(name)
+                manifest.resources[name] = replace(
+                    entry, checkpoint=checkpoint if checkpoint != save_checkpoint else None
+                )
+
+        self.store.write_bytes(os.path.join(save_path, CheckpointManifest.FILE_NAME), manifest.to_bytes())
+        # The checkpoint is committed once listed in the index
+        self._update_index(add=save_checkpoint)
+
+        # The saved checkpoint is now the latest valid one, the next loads must start from it
+        with self._manifest_lock:
+            if save_checkpoint not in self.checkpoints:
+                self.checkpoints = sorted(self.checkpoints + [save_checkpoint], reverse=True)
+            self.current_load_checkpoint = save_checkpoint
+            self._manifest = None
+        self._kept_namespaces.clear()
+        self._kept_resources.clear()
+        return manifest
+
+    async def async_save_manifest(self, embedding_dim: Optional[int] = None) -> CheckpointManifest:
+        return await run_in_io_executor(self.save_manifest, embedding_dim)
+
+    def get_load_signature(self) -> Optional[Tuple[Hashable, int]]:
+        """Return the generation of the checkpoint to load and the total size of its resources.
+
+        The manifest is read again, so the generation changes whenever the checkpoint is saved again. It can be used
+        to check whether previously loaded storages are still up to date.
+        """
+        manifest = self.refresh_manifest()
+        if manifest is None or len(manifest.resources) == 0:
+            return None
+        return manifest.generation, manifest.nbytes
+
+    async def async_get_load_signature(self) -> Optional[Tuple[Hashable, int]]:
+        return await run_in_io_executor(self.get_load_signature)
+
     def get_save_path(self) -> str:
-        if self.save_checkpoint is None:
-            if self.keep_n > 0:
-                self.save_checkpoint = int(time.time())
-            else:
-                self.save_checkpoint = 0
+        # Storages may be saved concurrently from different threads, they must agree on the checkpoint
+        with self._save_lock:
+            if self.save_checkpoint is None:
+                if self.keep_n > 0:
+                    self.save_checkpoint = int(time.time())
+                else:
+                    self.save_checkpoint = 0
         save_path = self.get_path(self.working_dir, self.save_checkpoint)
 
         assert save_path is not None, "Save path cannot be None."
@@ -114,12 +301,26 @@ class Namespace:
         self.namespace = namespace
         self.workspace = workspace
 
+    @property
+    def store(self) -> BaseObjectStore:
+        return self.workspace.store
+
     def get_load_path(self, resource_name: str) -> Optional[str]:
         assert self.namespace is not None, "Namespace must be set to get resource load path."
-        load_path = self.workspace.get_load_path()
-        if load_path is None:
+        if self.workspace.get_load_path() is None:
+            return None
+        name = f"{self.namespace}_{resource_name}"
+        manifest = cast(CheckpointManifest, self.workspace.get_manifest())
+        if name not in manifest.resources:
             return None
-        return os.path.join(load_path, f"{self.namespace}_{resource_name}")
+        return self.workspace.get_resource_path(manifest, name)
+
+    async def async_get_load_path(self, resource_name: str) -> Optional[str]:
+        return await run_in_io_executor(self.get_load_path, resource_name)
+
+    def keep(self, resource_names: Optional[Iterable[str]] = None) -> None:
+        assert self.namespace is not None, "Namespace must be set to keep its resources."
+        self.workspace.keep(self.namespace, resource_names)
 
     def get_save_path(self, resource_name: str) -> str:
         assert self.namespace is not None, "Namespace must be set to get resource save path."
@@ -0,0 +1,185 @@
+from dataclasses import dataclass, field
+from typing import Any, Optional, Union
+
+import numpy as np
+import numpy.typing as npt
+from scipy.sparse import csr_matrix, diags, issparse
+
+from cortex_ingestion._utils import logger
+
+
+def undirected_adjacency(num_nodes: int, edges: npt.NDArray[np.integer], dtype: Any = np.float64) -> csr_matrix:
+    """Return the symmetric adjacency matrix of the (#edges, 2) undirected edges, counting parallel edges."""
+    edges = edges.reshape(-1, 2)
+    # Each undirected edge can be walked both ways, self-loops are counted twice as in igraph
+    rows = np.concatenate([edges[:, 0], edges[:, 1]])
+    cols = np.concatenate([edges[:, 1], edges[:, 0]])
+    adjacency = csr_matrix((np.ones(len(rows), dtype=dtype), (rows, cols)), shape=(num_nodes, num_nodes))
+    adjacency.sum_duplicates()
+    return adjacency
+
+
+@dataclass
+class PersonalizedPageRank:
+    """Personalized PageRank over an undirected graph, computed on a sparse adjacency matrix.
+
+    The adjacency and transition matrices are built once, when the engine is built, and reused by every query. The
+    random walk matches igraph's `personalized_pagerank`: a walker stuck on a vertex without edges restarts from the
+    reset distribution, and the scores sum to 1. Two solvers are available: `__call__` runs the power iteration over
+    the whole graph, while `push` only explores the neighbourhood of the seeds.
+    """
+
+    num_nodes: int = field()
+    _adjacency: csr_matrix = field(repr=False)
+    _degrees: npt.NDArray[np.float64] = field(repr=False)
+    damping: float = field(default=0.85)
+    tolerance: float = field(default=1e-6)
+    max_iter: int = field(default=100)
+    # Transposed row-stochastic transition matrix, so that an iteration is a single sparse product
+    _transition_t: Optional[csr_matrix] = field(init=False, default=None, repr=False)
+
+    @staticmethod
+    def from_edges(
+        num_nodes: int,
+        edges: npt.NDArray[np.int64],
+        damping: float = 0.85,
+        tolerance: float = 1e-6,
+        max_iter: int = 100,
+    ) -> "PersonalizedPageRank":
+        """Build the engine from the (#edges, 2) array of the endpoints of the undirected edges."""
+        return PersonalizedPageRank.from_adjacency(
+            undirected_adjacency(num_nodes, edges), damping=damping, tolerance=tolerance, max_iter=max_iter
+        )
+
+    @staticmethod
+    def from_adjacency(
+        adjacency: csr_matrix,
+        damping: float = 0.85,
+        tolerance: float = 1e-6,
+        max_iter: int = 100,
+    ) -> "PersonalizedPageRank":
+        """Build the engine from the symmetric adjacency matrix, holding the number of edges between each pair."""
+        return PersonalizedPageRank(
+            num_nodes=adjacency.shape[0],
+            _adjacency=adjacency,
+            _degrees=np.asarray(adjacency.sum(axis=1, dtype=np.float64)).ravel(),
+            damping=damping,
+            tolerance=tolerance,
+            max_iter=max_iter,
+        )
+
+    def __call__(
+        self,
+        reset: Optional[Union[csr_matrix, npt.NDArray[np.float64]]] = None,
+        x0: Optional[npt.NDArray[np.float64]] = None,
+    ) -> npt.NDArray[np.float64]:
+        """Return the PageRank scores personalized on the given reset weights.
+
+        The reset weights are either a (#nodes,) vector or a (#queries, #nodes) matrix with one query per row, in
+        which case all the queries are solved together, one sparse matrix-matrix product per iteration, and the
+        scores are returned with the same shape.
+
+        Args:
+            reset: The non-negative restart weights, uniform if None.
+            x0: Initial guess of the solution, with the shape of the scores, such as the scores of a previous query of
+                the same caller. The engine is shared by all the callers, so it does not keep solutions itself.
+        """
+        r = self._get_reset(reset)  # (#nodes, #queries)
+        dangling = self._degrees == 0
+        if self._transition_t is None:
+            inv_degrees = np.divide(1.0, self._degrees, out=np.zeros_like(self._degrees), where=~dangling)
+            self._transition_t = csr_matrix((diags(inv_degrees) @ self._adjacency).T)
+
+        if x0 is None or x0.size != r.size:
+            x = r.copy()
+        else:
+            x0 = np.asarray(x0, dtype=np.float64).reshape(r.shape[1], -1).T
+            x = x0 / np.maximum(x0.sum(axis=0), 1e-300)
+
+        delta = np.inf
+        for _ in range(self.max_iter):
+            restart = self.damping * x[dangling].sum(axis=0) + (1.0 - self.damping)
+            x_next = self.damping * self._transition_t.dot(x) + restart * r
+            x_next /= x_next.sum(axis=0)
+            delta = np.abs(x_next - x).sum(axis=0).max()
+            x = x_next
+            if delta < self.tolerance:
+                break
+        else:
+            logger.warning(f"PageRank did not converge in {self.max_iter} iterations (last delta {delta:.2e}).")
+
+        return x.T if reset is not None and len(reset.shape) == 2 else x.ravel()
+
+    def push(self, reset: Union[csr_matrix, npt.NDArray[np.float64]], epsilon: float) -> csr_matrix:
+        """Return the approximate PageRank scores personalized on the given (1, #nodes) reset weights.
+
+        Runs the forward push of Andersen, Chung and Lang: the residual mass of a vertex is pushed to its neighbours
+        only while it exceeds epsilon times its degree, so the work depends on the seeds and epsilon, not on the size
+        of the graph. All the active vertices are pushed together at each round. The scores are rescaled to sum to 1
+        and only the vertices reached by the push are stored in the returned (1, #nodes) sparse matrix.
+        """
+        # Read the seeds from the sparse weights without densifying them
+        if issparse(reset):
+            weights = csr_matrix(reset).tocoo()
+            weights.sum_duplicates()
+            seeds, seed_weights = weights.col.astype(np.int64), weights.data.astype(np.float64)
+        else:
+            dense = np.asarray(reset, dtype=np.float64).ravel()
+            seeds = np.flatnonzero(dense)
+            seed_weights = dense[seeds]
+        seeds, seed_weights = seeds[seed_weights > 0], seed_weights[seed_weights > 0]
+        if len(seeds) == 0:
+            raise ValueError("The reset weights must contain at least one positive value.")
+        seed_weights = seed_weights / seed_weights.sum()
+        alpha = 1.0 - self.damping
+        indptr, indices, data = self._adjacency.indptr, self._adjacency.indices, self._adjacency.data
+
+        # Zero-filled arrays are allocated lazily by the OS, only the pages of the explored vertices are touched
+        residual = np.zeros(self.num_nodes)
+        residual[seeds] = seed_weights
+        scores = np.zeros(self.num_nodes)
+        pushed = [seeds[:0]]
+        # Only the vertices whose residual grew since they were last checked can become active
+        candidates = seeds
+        while True:
+            degrees = self._degrees[candidates]
+            active = candidates[residual[candidates] >= epsilon * np.maximum(degrees, 1.0)]
+            if len(active) == 0:
+                break
+            mass = residual[active]
+            residual[active] = 0.0
+            scores[active] += alpha * mass
+            pushed.append(active)
+
+            # Spread the remaining mass over the edges, walkers on vertices without edges restart from the seeds
+            degrees = self._degrees[active]
+            counts = indptr[active + 1] - indptr[active]
+            starts = np.repeat(indptr[active] - np.cumsum(counts) + counts, counts)
+            offsets = starts + np.arange(counts.sum())
+            share = self.damping * np.divide(mass, degrees, out=np.zeros_like(mass), where=degrees > 0)
+            targets = np.concatenate([indices[offsets], seeds])
+            amounts = np.concatenate(
+                [np.repeat(share, counts) * data[offsets], self.damping * mass[degrees == 0].sum() * seed_weights]
+            )
+
+            candidates, inverse = np.unique(targets, return_inverse=True)
+            residual[candidates] += np.bincount(inverse, weights=amounts, minlength=len(candidates))
+
+        touched = np.unique(np.concatenate(pushed))
+        values = scores[touched]
+        total = values.sum()
+        if total > 0:
+            values /= total
+        return csr_matrix(
+            (values, (np.zeros(len(touched), dtype=np.int64), touched)), shape=(1, self.num_nodes)
+        )
+
+    def _get_reset(self, reset: Optional[Union[csr_matrix, npt.NDArray[np.float64]]]) -> npt.NDArray[np.float64]:
+        if reset is None:
+            return np.full((self.num_nodes, 1), 1.0 / self.num_nodes)
+
+        r = np.asarray(reset.toarray() if issparse(reset) else reset, dtype=np.float64).reshape(-1, self.num_nodes).T
+        totals = r.sum(axis=0)
+        if np.any(totals <= 0):
+            raise ValueError("The reset weights must contain at least one positive value per query.")
+        return r / totals
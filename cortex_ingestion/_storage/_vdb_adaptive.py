@@ -0,0 +1,155 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Literal, Optional, Tuple, Type, Union
+
+import hnswlib
+import numpy as np
+import numpy.typing as npt
+from scipy.sparse import csr_matrix
+
+from cortex_ingestion._types import GTEmbedding, GTId, TScore
+from cortex_ingestion._utils import logger, run_in_io_executor
+
+from cortex_ingestion._storage._base import BaseVectorStorage
+from cortex_ingestion._storage._vdb_hnswlib import HNSWVectorStorage, HNSWVectorStorageConfig
+from cortex_ingestion._storage._vdb_numpy import NumpyVectorStorage, NumpyVectorStorageConfig
+
+TBackend = Union[NumpyVectorStorage[GTId, GTEmbedding], HNSWVectorStorage[GTId, GTEmbedding]]
+
+
+@dataclass
+class AdaptiveVectorStorageConfig(HNSWVectorStorageConfig):
+    # Largest index searched exactly, larger ones are moved to HNSW
+    exact_max_size: int = field(default=20000)
+    # Storage type of the exact index, float16 and int8 trade a little recall for a smaller index. Opt-in: it only
+    # applies to indexes of up to `exact_max_size` embeddings, larger ones are kept as float32 in HNSW
+    exact_dtype: Literal["float32", "float16", "int8"] = field(default="float32")
+    # Candidates per result selected on the int8 embeddings and scored again with their float16 copy, below 2 the
+    # copy is not saved and recall@10 drops to ~0.96
+    exact_rerank_factor: int = field(default=4)
+
+
+@dataclass
+class AdaptiveVectorStorage(BaseVectorStorage[GTId, GTEmbedding]):
+    """Vector storage searching small indexes exactly and large ones with HNSW.
+
+    Indexes of up to `exact_max_size` embeddings are kept in a `NumpyVectorStorage`: its exact search is faster
+    than traversing the HNSW graph at that size, and it loads and takes less memory. Once an upsert makes the index
+    larger, its embeddings are moved to a `HNSWVectorStorage`. Indexes are moved back when loaded for an insert with a
+    threshold above their size. Queries always load the index as it was saved.
+    """
+
+    config: AdaptiveVectorStorageConfig = field()  # type: ignore
+    _backend: Optional[TBackend[GTId, GTEmbedding]] = field(init=False, default=None)
+
+    @property
+    def size(self) -> int:
+        return self._backend.size if self._backend is not None else 0
+
+    async def upsert(
+        self,
+        ids: Iterable[GTId],
+        embeddings: Iterable[GTEmbedding],
+        metadata: Union[Iterable[Dict[str, Any]], None] = None,
+    ) -> None:
+        assert self._backend is not None, "Vector storage is not loaded."
+        self.mark_dirty()
+        await self._backend.upsert(ids, embeddings, metadata)
+        await self._switch_backend()
+
+    async def get_knn(
+        self, embeddings: Iterable[GTEmbedding], top_k: int
+    ) -> Tuple[Iterable[Iterable[GTId]], npt.NDArray[TScore]]:
+        assert self._backend is not None, "Vector storage is not loaded."
+        return await self._backend.get_knn(embeddings, top_k)
+
+    async def score_all(
+        self, embeddings: Iterable[GTEmbedding], top_k: int = 1, threshold: Optional[float] = None
+    ) -> csr_matrix:
+        assert self._backend is not None, "Vector storage is not loaded."
+        return await self._backend.score_all(embeddings, top_k, threshold)
+
+    def get_state(self) -> Tuple[Type[TBackend[GTId, GTEmbedding]], Any]:
+        assert self._backend is not None, "Vector storage is not loaded."
+        return type(self._backend), self._backend.get_state()
+
+    def _set_state(self, state: Tuple[Type[TBackend[GTId, GTEmbedding]], Any]) -> None:
+        backend_cls, backend_state = state
+        self._backend = self._make_backend(backend_cls)
+        self._backend._set_state(backend_state)
+
+    def _make_backend(self, backend_cls: Type[TBackend[GTId, GTEmbedding]]) -> TBackend[GTId, GTEmbedding]:
+        if backend_cls is NumpyVectorStorage:
+            config: Any = NumpyVectorStorageConfig(
+                dtype=self.config.exact_dtype, rerank_factor=self.config.exact_rerank_factor
+            )
+        else:
+            config = self.config
+        return backend_cls(config=config, namespace=self.namespace, embedding_dim=self.embedding_dim)
+
+    async def _get_saved_backend(self) -> Type[TBackend[GTId, GTEmbedding]]:
+        """Return the kind of storage of the saved index, exact for new indexes."""
+        if self.namespace is not None:
+            for backend_cls in (NumpyVectorStorage, HNSWVectorStorage):
+                if await self.namespace.async_get_load_path(backend_cls.RESOURCE_NAME.format(self.embedding_dim)):
+                    return backend_cls
+        return NumpyVectorStorage
+
+    async def _switch_backend(self) -> None:
+        """Move the embeddings to the other kind of storage when the size of the index crossed the threshold."""
+        assert self._backend is not None, "Vector storage is not loaded."
+        exact = self._backend.size <= self.config.exact_max_size
+        if exact == isinstance(self._backend, NumpyVectorStorage):
+            return
+
+        logger.info(
+            f"Moving {self._backend.size} elements to {'exact' if exact else 'HNSW'} vectordb storage "
+            f"(threshold: {self.config.exact_max_size})."
+        )
+        if isinstance(self._backend, NumpyVectorStorage):
+            ids, vectors = self._backend.get_embeddings()
+            metadata = self._backend._metadata
+            backend: TBackend[GTId, GTEmbedding] = self._make_backend(HNSWVectorStorage)
+            backend._index = hnswlib.Index(space="cosine", dim=self.embedding_dim)  # type: ignore
+            backend._init_index()
+        else:
+            index, metadata = self._backend.get_state()
+            ids = np.array(index.get_ids_list(), dtype=np.int64)
+            vectors = await run_in_io_executor(index.get_items, ids) if len(ids) else np.zeros((0, self.embedding_dim))
+            backend = self._make_backend(NumpyVectorStorage)
+            backend._init_index()
+
+        if len(ids):
+            await backend.upsert(ids.tolist(), np.asarray(vectors, dtype=np.float32))
+        backend._metadata = dict(metadata)
+        self._backend = backend
+        # The converted index must be saved even if nothing else changes, or every insert would convert it again
+        self.mark_dirty()
+
+    async def _insert_start(self):
+        self._backend = self._make_backend(await self._get_saved_backend())
+        await self._backend._insert_start()
+        await self._switch_backend()
+
+    async def _insert_done(self):
+        assert self._backend is not None, "Vector storage is not loaded."
+        await self._backend._insert_done()
+
+        # The index saved in place by the other kind of storage is superseded by this one
+        if self.namespace is not None:
+            other_cls = HNSWVectorStorage if isinstance(self._backend, NumpyVectorStorage) else NumpyVectorStorage
+            resource_names = [other_cls.RESOURCE_NAME.format(self.embedding_dim), other_cls.RESOURCE_METADATA_NAME]
+            if other_cls is NumpyVectorStorage:
+                resource_names.append(NumpyVectorStorage.RESOURCE_RERANK_NAME.format(self.embedding_dim))
+            for resource_name in resource_names:
+                file_name = await self.namespace.async_get_load_path(resource_name)
+                if file_name and file_name == self.namespace.get_save_path(resource_name):
+                    await run_in_io_executor(self.namespace.store.delete, file_name)
+
+    async def _query_start(self):
+        # Converting would cost a full rebuild on every cold load and is never saved, the index is queried as saved
+        self._backend = self._make_backend(await self._get_saved_backend())
+        await self._backend._query_start()
+
+    async def _query_done(self):
+        if self._backend is not None:
+            await self._backend._query_done()
@@ -1,7 +1,8 @@
+import os
 import pickle
+import tempfile
 from dataclasses import dataclass, field
 from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
-import io
 
 import hnswlib
 import numpy as np
@@ -10,9 +11,9 @@ from scipy.sparse import csr_matrix
 
 from cortex_ingestion._exceptions import InvalidStorageError
 from cortex_ingestion._types import GTEmbedding, GTId, TScore
-from cortex_ingestion._utils import logger 
-from cortex_ingestion.cloud_services._googlecloud import download_pickle_from_gcs, download_graph_to_gcs, upload_graph_to_gcs, upload_pickle_to_gcs
-from cortex_ingestion.utilities import load_pickle, save_pickle
+from cortex_ingestion._utils import logger, run_in_io_executor
+from cortex_ingestion.cloud_services import BaseObjectStore
+from cortex_ingestion.utilities import async_load_pickle, async_save_pickle
 
 from cortex_ingestion._storage._base import BaseVectorStorage
 
@@ -55,6 +56,7 @@ class HNSWVectorStorage(BaseVectorStorage[GTId, GTEmbedding]):
         assert (len(ids) == len(embeddings)) and (
             metadata is None or (len(metadata) == len(ids))
         ), "ids, embeddings, and metadata (if provided) must have the same length"
+        self.mark_dirty()
 
         if self.size + len(embeddings) >= self.max_size:
             new_size = self.max_size * 2
@@ -119,31 +121,26 @@ class HNSWVectorStorage(BaseVectorStorage[GTId, GTEmbedding]):
 
         return scores
 
+    def get_state(self) -> Tuple[Any, Dict[GTId, Dict[str, Any]]]:
+        return self._index, self._metadata
+
+    def _set_state(self, state: Tuple[Any, Dict[GTId, Dict[str, Any]]]) -> None:
+        self._index, self._metadata = state
+
     async def _insert_start(self):
         self._index = hnswlib.Index(space="cosine", dim=self.embedding_dim)  # type: ignore
 
         if self.namespace:
-            index_file_name = self.namespace.get_load_path(self.RESOURCE_NAME.format(self.embedding_dim))
-            metadata_file_name = self.namespace.get_load_path(self.RESOURCE_METADATA_NAME)
+            index_file_name = await self.namespace.async_get_load_path(self.RESOURCE_NAME.format(self.embedding_dim))
+            metadata_file_name = await self.namespace.async_get_load_path(self.RESOURCE_METADATA_NAME)
 
             if index_file_name and metadata_file_name:
                 try:
-                    # Download index from GCS to a temporary file
-                    temp_file = "/tmp/temp_index.bin"
-                    buffer = download_graph_to_gcs(index_file_name)
-                    with open(temp_file, 'wb') as f:
-                        f.write(buffer.getvalue())
-                    
-                    # Load from temp file
-                    self._index.load_index(temp_file, allow_replace_deleted=True)
-                    
-                    # Clean up temp file
-                    import os
-                    os.remove(temp_file)
-                    
+                    await run_in_io_executor(self._load_index, self.namespace.store, self._index, index_file_name)
+
                     logger.info(f"Loading metadata from {metadata_file_name}")
-                    self._metadata = download_pickle_from_gcs(metadata_file_name)
-                    
+                    self._metadata = await self.namespace.store.async_read_pickle(metadata_file_name)
+
                     logger.info(
                         f"Loaded {self.size} elements from vectordb storage '{index_file_name}'."
                     )
@@ -156,37 +153,18 @@ class HNSWVectorStorage(BaseVectorStorage[GTId, GTEmbedding]):
                 logger.info(f"No data file found for vectordb storage '{index_file_name}'. Loading empty vectordb.")
         else:
             logger.debug("Creating new volatile vectordb storage.")
-        self._index.init_index(
-            max_elements=self.INITIAL_MAX_ELEMENTS,
-            ef_construction=self.config.ef_construction,
-            M=self.config.M,
-            allow_replace_deleted=True
-        )
-        self._index.set_ef(self.config.ef_search)
-        self._metadata = {}
+        self._init_index()
 
     async def _insert_done(self):
         if self.namespace:
             index_file_name = self.namespace.get_save_path(self.RESOURCE_NAME.format(self.embedding_dim))
-            
+
             try:
-                # Save index to a temporary file first
-                temp_file = "/tmp/temp_index.bin"
-                self._index.save_index(temp_file)
-                
-                # Read the temp file into a buffer and upload to GCS
-                with open(temp_file, 'rb') as f:
-                    buffer = io.BytesIO(f.read())
-                    buffer.seek(0)
-                    upload_graph_to_gcs(index_file_name, buffer)
-                
-                # Clean up temp file
-                import os
-                os.remove(temp_file)
-                
+                await run_in_io_executor(self._save_index, self.namespace.store, self._index, index_file_name)
+
                 # Save metadata
-                save_pickle(self.namespace, self.RESOURCE_METADATA_NAME, self._metadata)
-                
+                await async_save_pickle(self.namespace, self.RESOURCE_METADATA_NAME, self._metadata)
+
                 logger.debug(f"Saving {self.size} elements from vectordb storage '{index_file_name}'.")
             except Exception as e:
                 t = f"Error saving vectordb storage to {index_file_name}: {e}"
@@ -197,27 +175,16 @@ class HNSWVectorStorage(BaseVectorStorage[GTId, GTEmbedding]):
         assert self.namespace, "Loading a vectordb requires a namespace."
         self._index = hnswlib.Index(space="cosine", dim=self.embedding_dim)  # type: ignore
 
-        index_file_name = self.namespace.get_load_path(self.RESOURCE_NAME.format(self.embedding_dim))
-        
+        index_file_name = await self.namespace.async_get_load_path(self.RESOURCE_NAME.format(self.embedding_dim))
+
         # Try to load the index
         if index_file_name:
             try:
-                # Download index from GCS to a temporary file
-                temp_file = "/tmp/temp_index.bin"
-                buffer = download_graph_to_gcs(index_file_name)
-                with open(temp_file, 'wb') as f:
-                    f.write(buffer.getvalue())
-                
-                # Load from temp file
-                self._index.load_index(temp_file, allow_replace_deleted=True)
-                
-                # Clean up temp file
-                import os
-                os.remove(temp_file)
-                
+                await run_in_io_executor(self._load_index, self.namespace.store, self._index, index_file_name)
+
                 # Load metadata
-                self._metadata = load_pickle(self.namespace, self.RESOURCE_METADATA_NAME, {})
-                
+                self._metadata = await async_load_pickle(self.namespace, self.RESOURCE_METADATA_NAME, {})
+
                 logger.debug(f"Loaded {self.size} elements from vectordb storage '{index_file_name}'.")
                 return # All good
             except Exception as e:
@@ -226,16 +193,50 @@ class HNSWVectorStorage(BaseVectorStorage[GTId, GTEmbedding]):
                 raise InvalidStorageError(t) from e
         else:
             logger.warning(f"No data file found for vectordb storage '{index_file_name}'. Loading empty vectordb.")
-            
+
             # Initialize a new index
-            self._index.init_index(
-                max_elements=self.INITIAL_MAX_ELEMENTS,
-                ef_construction=self.config.ef_construction,
-                M=self.config.M,
-                allow_replace_deleted=True
-            )
-            self._index.set_ef(self.config.ef_search)
-            self._metadata = {}
+            self._init_index()
+
+    def _init_index(self) -> None:
+        self._index.init_index(
+            max_elements=self.INITIAL_MAX_ELEMENTS,
+            ef_construction=self.config.ef_construction,
+            M=self.config.M,
+            allow_replace_deleted=True
+        )
+        self._index.set_ef(self.config.ef_search)
+        self._metadata = {}
+
+    @staticmethod
+    def _load_index(store: BaseObjectStore, index: Any, index_file_name: str) -> None:
+        # Load straight from the local copy of the store when there is one, it is specific to this index and
+        # generation so concurrent loads can share it
+        local_file = store.get_local_path(index_file_name)
+        if local_file is not None:
+            index.load_index(local_file, allow_replace_deleted=True)
+            return
+
+        # Otherwise download the index to a temporary file, unique per load as several indices can load concurrently
+        fd, temp_file = tempfile.mkstemp(suffix=".bin")
+        os.close(fd)
+        try:
+            store.download_to_file(index_file_name, temp_file)
+            index.load_index(temp_file, allow_replace_deleted=True)
+        finally:
+            # Clean up temp file
+            os.remove(temp_file)
+
+    @staticmethod
+    def _save_index(store: BaseObjectStore, index: Any, index_file_name: str) -> None:
+        # Save index to a temporary file first
+        fd, temp_file = tempfile.mkstemp(suffix=".bin")
+        os.close(fd)
+        try:
+            index.save_index(temp_file)
+            store.upload_from_file(index_file_name, temp_file)
+        finally:
+            # Clean up temp file
+            os.remove(temp_file)
 
     async def _query_done(self):
         pass
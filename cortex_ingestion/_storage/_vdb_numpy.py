@@ -0,0 +1,394 @@
+import io
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Literal, Optional, Tuple, Union
+
+import numpy as np
+import numpy.typing as npt
+from scipy.sparse import csr_matrix
+
+from cortex_ingestion._exceptions import InvalidStorageError
+from cortex_ingestion._types import GTEmbedding, GTId, TScore
+from cortex_ingestion._utils import logger, run_in_io_executor
+from cortex_ingestion.cloud_services import BaseObjectStore
+from cortex_ingestion.utilities import async_load_pickle, async_save_pickle
+
+from cortex_ingestion._storage._base import BaseVectorStorage
+
+
+@dataclass
+class NumpyVectorStorageConfig:
+    # Storage type of the embeddings, "int8" quantizes each embedding with its own scale
+    dtype: Literal["float32", "float16", "int8"] = field(default="float32")
+    # Candidates selected on the int8 embeddings for each result, then scored again with a float16 copy of the
+    # embeddings saved next to them. Below 2, no copy is kept, trading ~4% of recall@10 for a smaller saved index
+    rerank_factor: int = field(default=4)
+
+
+@dataclass
+class NumpyVectorStorage(BaseVectorStorage[GTId, GTEmbedding]):
+    """Exact vector storage scoring the queries against all the embeddings at once.
+
+    The embeddings are kept normalized in one contiguous matrix, so a search is a single matrix product followed by
+    a partial sort. Scores are the same as the cosine scores of `HNSWVectorStorage`, without its approximation or
+    the memory taken by its graph, which suits indexes of up to a few tens of thousands of embeddings.
+    Storing the embeddings as float16 or int8 halves or quarters the memory and the size of the saved index, at the
+    cost of a small error on the scores (see `benchmarks/bench_vdb.py`). Without native half precision support,
+    converting float16 embeddings makes their search slower than the int8 one. The int8 scores only select
+    `rerank_factor` candidates per result, which are scored again with a float16 copy of their embeddings: the copy
+    is saved as a separate file and mapped when querying, so only the rows of the candidates are read. This keeps
+    the recall of float32 with the search speed of int8, but the saved index is larger than a float16 one.
+    """
+
+    RESOURCE_NAME = "numpy_index_{}.npy"
+    RESOURCE_METADATA_NAME = "numpy_metadata.pkl"
+    RESOURCE_RERANK_NAME = "numpy_rerank_{}.npy"
+    INITIAL_MAX_ELEMENTS = 1024
+    # Rows scored at once, quantized embeddings are converted block by block to keep the memory bounded
+    BLOCK_SIZE = 4096
+    config: NumpyVectorStorageConfig = field(default_factory=NumpyVectorStorageConfig)
+    # Embedding rows, only the first `size` rows are used
+    _vectors: npt.NDArray[np.floating[Any]] = field(init=False, default_factory=lambda: np.zeros((0, 0)))
+    # Scale of each int8 row, None for float embeddings
+    _scales: Optional[npt.NDArray[np.float32]] = field(init=False, default=None)
+    # Float16 copy of the int8 rows scoring the candidates again, None without reranking
+    _rerank: Optional[npt.NDArray[np.float16]] = field(init=False, default=None)
+    _ids: npt.NDArray[np.int64] = field(init=False, default_factory=lambda: np.zeros(0, dtype=np.int64))
+    _size: int = field(init=False, default=0)
+    # Id -> row, built on first use
+    _id_to_row: Optional[Dict[GTId, int]] = field(init=False, default=None)
+    _metadata: Dict[GTId, Dict[str, Any]] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def max_size(self) -> int:
+        return len(self._vectors)
+
+    async def upsert(
+        self,
+        ids: Iterable[GTId],
+        embeddings: Iterable[GTEmbedding],
+        metadata: Union[Iterable[Dict[str, Any]], None] = None,
+    ) -> None:
+        ids = list(ids)
+        embeddings = self._normalize(np.array(list(embeddings), dtype=np.float32))
+        metadata = list(metadata) if metadata else None
+
+        assert (len(ids) == len(embeddings)) and (
+            metadata is None or (len(metadata) == len(ids))
+        ), "ids, embeddings, and metadata (if provided) must have the same length"
+        self.mark_dirty()
+
+        # Existing ids are overwritten in place, the others are appended
+        id_to_row = self._get_id_to_row()
+        rows = np.empty(len(ids), dtype=np.int64)
+        for i, id in enumerate(ids):
+            row = id_to_row.get(id)
+            if row is None:
+                row = id_to_row[id] = self._size
+                self._size += 1
+            rows[i] = row
+
+        if self._size > self.max_size:
+            new_size = max(self.max_size, self.INITIAL_MAX_ELEMENTS)
+            while self._size > new_size:
+                new_size *= 2
+            self._resize(new_size)
+            logger.info("Resizing numpy vector index.")
+
+        if metadata:
+            self._metadata.update(dict(zip(ids, metadata)))
+        self._set_rows(rows, embeddings)
+        self._ids[rows] = ids
+
+    async def get_knn(
+        self, embeddings: Iterable[GTEmbedding], top_k: int
+    ) -> Tuple[Iterable[Iterable[GTId]], npt.NDArray[TScore]]:
+        if self.size == 0:
+            empty_list: List[List[GTId]] = []
+            logger.info("Querying knns in empty index.")
+            return empty_list, np.array([], dtype=TScore)
+
+        rows, scores = self._top_k(np.array(list(embeddings), dtype=np.float32), min(top_k, self.size))
+
+        return self._ids[rows], scores
+
+    async def score_all(
+        self, embeddings: Iterable[GTEmbedding], top_k: int = 1, threshold: Optional[float] = None
+    ) -> csr_matrix:
+        if not isinstance(embeddings, np.ndarray):
+            embeddings = np.array(list(embeddings), dtype=np.float32)
+
+        if embeddings.size == 0 or self.size == 0:
+            logger.warning(f"No provided embeddings ({embeddings.size}) or empty index ({self.size}).")
+            return csr_matrix((0, self.size))
+
+        top_k = min(top_k, self.size)
+        rows, scores = self._top_k(embeddings, top_k)
+
+        if threshold is not None:
+            scores[scores < threshold] = 0
+
+        # Create sparse distance matrix with shape (#embeddings, #all_embeddings)
+        return csr_matrix(
+            (scores.ravel(), (np.repeat(np.arange(len(rows)), top_k), self._ids[rows].ravel())),
+            shape=(len(rows), self.size),
+        )
+
+    def get_embeddings(self) -> Tuple[npt.NDArray[np.int64], npt.NDArray[np.float32]]:
+        """Return the ids and the normalized embeddings of the storage, dequantized if needed."""
+        if self._rerank is not None:
+            return self._ids[: self._size], self._rerank[: self._size].astype(np.float32)
+        return self._ids[: self._size], self._dequantize(self._vectors[: self._size], self._get_scales())
+
+    def get_state(
+        self,
+    ) -> Tuple[
+        npt.NDArray[Any],
+        Optional[npt.NDArray[np.float32]],
+        Optional[npt.NDArray[np.float16]],
+        npt.NDArray[np.int64],
+        Dict[GTId, Dict[str, Any]],
+    ]:
+        rerank = self._rerank[: self._size] if self._rerank is not None else None
+        return self._vectors[: self._size], self._get_scales(), rerank, self._ids[: self._size], self._metadata
+
+    def _set_state(
+        self,
+        state: Tuple[
+            npt.NDArray[Any],
+            Optional[npt.NDArray[np.float32]],
+            Optional[npt.NDArray[np.float16]],
+            npt.NDArray[np.int64],
+            Dict[GTId, Dict[str, Any]],
+        ],
+    ) -> None:
+        self._vectors, self._scales, self._rerank, self._ids, self._metadata = state
+        self._size = len(self._ids)
+        self._id_to_row = None
+
+    def _get_scales(self) -> Optional[npt.NDArray[np.float32]]:
+        return self._scales[: self._size] if self._scales is not None else None
+
+    def _set_rows(self, rows: Union[slice, npt.NDArray[np.int64]], embeddings: npt.NDArray[np.float32]) -> None:
+        if self._scales is not None:
+            # Symmetric quantization, the largest component of each embedding is mapped to 127
+            scales = np.abs(embeddings).max(axis=1, initial=0.0) / 127
+            scales[scales == 0] = 1
+            self._vectors[rows] = np.rint(embeddings / scales[:, None])
+            self._scales[rows] = scales
+            if self._rerank is not None:
+                self._rerank[rows] = embeddings
+        else:
+            self._vectors[rows] = embeddings
+
+    @staticmethod
+    def _dequantize(
+        vectors: npt.NDArray[Any], scales: Optional[npt.NDArray[np.float32]]
+    ) -> npt.NDArray[np.float32]:
+        vectors = vectors.astype(np.float32)
+        return vectors * scales[:, None] if scales is not None else vectors
+
+    def _top_k(
+        self, embeddings: npt.NDArray[np.float32], top_k: int
+    ) -> Tuple[npt.NDArray[np.int64], npt.NDArray[TScore]]:
+        """Return the rows of the `top_k` best embeddings of each query, best first, and their scores."""
+        queries = self._normalize(embeddings.astype(np.float32, copy=False))
+        similarities = np.empty((len(queries), self._size), dtype=np.float32)
+        for start in range(0, self._size, self.BLOCK_SIZE):
+            stop = min(start + self.BLOCK_SIZE, self._size)
+            similarities[:, start:stop] = queries @ self._vectors[start:stop].astype(np.float32, copy=False).T
+        if self._scales is not None:
+            similarities *= self._scales[: self._size]
+
+        rerank = self._rerank is not None and self.config.rerank_factor > 1
+        candidates = min(top_k * self.config.rerank_factor, self._size) if rerank else top_k
+        rows = self._best(similarities, candidates)
+        best = np.take_along_axis(similarities, rows, axis=1)
+        if rerank:
+            # The quantized scores only select the candidates, their float embeddings give the final scores
+            vectors = self._rerank[rows].astype(np.float32)  # type: ignore
+            best = np.einsum("qcd,qd->qc", vectors, queries)
+            keep = self._best(best, top_k)
+            rows, best = np.take_along_axis(rows, keep, axis=1), np.take_along_axis(best, keep, axis=1)
+        order = np.argsort(-best, axis=1, kind="stable")
+        rows = np.take_along_axis(rows, order, axis=1)
+
+        # Same scale as the hnswlib cosine distances, in [0, 1] (worst, best)
+        scores = 0.5 + 0.5 * np.take_along_axis(best, order, axis=1).astype(TScore)
+        return rows, scores
+
+    @staticmethod
+    def _best(similarities: npt.NDArray[np.float32], top_k: int) -> npt.NDArray[np.int64]:
+        """Return the columns of the `top_k` largest similarities of each row, unordered."""
+        if top_k < similarities.shape[1]:
+            return np.argpartition(-similarities, top_k - 1, axis=1)[:, :top_k]
+        return np.broadcast_to(np.arange(similarities.shape[1]), similarities.shape)
+
+    def _get_id_to_row(self) -> Dict[GTId, int]:
+        if self._id_to_row is None:
+            self._id_to_row = {id: row for row, id in enumerate(self._ids[: self._size].tolist())}
+        return self._id_to_row
+
+    def _resize(self, max_elements: int) -> None:
+        vectors = np.zeros((max_elements, self.embedding_dim), dtype=self.config.dtype)
+        ids = np.zeros(max_elements, dtype=np.int64)
+        count = min(len(self._vectors), max_elements)
+        vectors[:count] = self._vectors[:count]
+        ids[:count] = self._ids[:count]
+        if self._scales is not None:
+            scales = np.ones(max_elements, dtype=np.float32)
+            scales[:count] = self._scales[:count]
+            self._scales = scales
+        if self._rerank is not None:
+            rerank = np.zeros((max_elements, self.embedding_dim), dtype=np.float16)
+            rerank[:count] = self._rerank[:count]
+            self._rerank = rerank
+        self._vectors, self._ids = vectors, ids
+
+    @staticmethod
+    def _normalize(embeddings: npt.NDArray[np.float32]) -> npt.NDArray[np.float32]:
+        norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+        return embeddings / np.maximum(norms, np.finfo(np.float32).tiny)
+
+    def _init_index(self) -> None:
+        self._vectors = np.zeros((0, self.embedding_dim), dtype=self.config.dtype)
+        self._scales = np.zeros(0, dtype=np.float32) if self.config.dtype == "int8" else None
+        rerank = self.config.dtype == "int8" and self.config.rerank_factor > 1
+        self._rerank = np.zeros((0, self.embedding_dim), dtype=np.float16) if rerank else None
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._size = 0
+        self._id_to_row = None
+        self._metadata = {}
+
+    async def _insert_start(self):
+        self._init_index()
+
+        if self.namespace:
+            index_file_name = await self.namespace.async_get_load_path(self.RESOURCE_NAME.format(self.embedding_dim))
+            metadata_file_name = await self.namespace.async_get_load_path(self.RESOURCE_METADATA_NAME)
+
+            if index_file_name and metadata_file_name:
+                try:
+                    vectors = await run_in_io_executor(self._load_index, self.namespace.store, index_file_name)
+                    ids, scales, self._metadata = await self.namespace.store.async_read_pickle(metadata_file_name)
+                    rerank = await self._load_rerank(len(ids))
+
+                    # The loaded vectors may be mapped read-only, they are copied to be updated and converted to the
+                    # configured type if they were saved with another one
+                    self._size = len(ids)
+                    self._resize(max(self._size, self.INITIAL_MAX_ELEMENTS))
+                    embeddings = rerank if rerank is not None else self._dequantize(vectors, scales)
+                    if vectors.dtype == self._vectors.dtype and (scales is None) == (self._scales is None):
+                        self._vectors[: self._size] = vectors
+                        if scales is not None:
+                            self._scales[: self._size] = scales  # type: ignore
+                        if self._rerank is not None:
+                            self._rerank[: self._size] = embeddings
+                    else:
+                        self._set_rows(slice(0, self._size), embeddings.astype(np.float32, copy=False))
+                    self._ids[: self._size] = ids
+
+                    logger.info(f"Loaded {self.size} elements from vectordb storage '{index_file_name}'.")
+                    return  # All good
+                except Exception as e:
+                    t = f"Error loading vectordb storage from {index_file_name}: {e}"
+                    logger.error(t)
+                    raise InvalidStorageError(t) from e
+            else:
+                logger.info(f"No data file found for vectordb storage '{index_file_name}'. Loading empty vectordb.")
+        else:
+            logger.debug("Creating new volatile vectordb storage.")
+
+    async def _insert_done(self):
+        if self.namespace:
+            index_file_name = self.namespace.get_save_path(self.RESOURCE_NAME.format(self.embedding_dim))
+
+            try:
+                await run_in_io_executor(
+                    self._save_index, self.namespace.store, self._vectors[: self._size], index_file_name
+                )
+                await async_save_pickle(
+                    self.namespace,
+                    self.RESOURCE_METADATA_NAME,
+                    (self._ids[: self._size], self._get_scales(), self._metadata),
+                )
+
+                rerank_file_name = self.namespace.get_save_path(self.RESOURCE_RERANK_NAME.format(self.embedding_dim))
+                if self._rerank is not None:
+                    await run_in_io_executor(
+                        self._save_index, self.namespace.store, self._rerank[: self._size], rerank_file_name
+                    )
+                elif await self.namespace.async_get_load_path(
+                    self.RESOURCE_RERANK_NAME.format(self.embedding_dim)
+                ) == rerank_file_name:
+                    # A copy saved in place would not match the rows anymore
+                    await run_in_io_executor(self.namespace.store.delete, rerank_file_name)
+
+                logger.debug(f"Saving {self.size} elements from vectordb storage '{index_file_name}'.")
+            except Exception as e:
+                t = f"Error saving vectordb storage to {index_file_name}: {e}"
+                logger.error(t)
+                raise InvalidStorageError(t) from e
+
+    async def _query_start(self):
+        assert self.namespace, "Loading a vectordb requires a namespace."
+        self._init_index()
+
+        index_file_name = await self.namespace.async_get_load_path(self.RESOURCE_NAME.format(self.embedding_dim))
+
+        if index_file_name:
+            try:
+                # Queries only read the vectors, they stay mapped from the local copy of the store when there is one
+                self._vectors = await run_in_io_executor(self._load_index, self.namespace.store, index_file_name)
+                self._ids, self._scales, self._metadata = await async_load_pickle(
+                    self.namespace, self.RESOURCE_METADATA_NAME, (np.zeros(0, dtype=np.int64), None, {})
+                )
+                self._size = len(self._ids)
+                self._rerank = await self._load_rerank(self._size) if self._scales is not None else None
+
+                logger.debug(f"Loaded {self.size} elements from vectordb storage '{index_file_name}'.")
+            except Exception as e:
+                t = f"Error loading vectordb storage from {index_file_name}: {e}"
+                logger.error(t)
+                raise InvalidStorageError(t) from e
+        else:
+            logger.warning(f"No data file found for vectordb storage '{index_file_name}'. Loading empty vectordb.")
+
+    async def _load_rerank(self, size: int) -> Optional[npt.NDArray[np.float16]]:
+        """Load the saved float16 copy of the int8 embeddings, if any and still needed."""
+        assert self.namespace, "Loading a vectordb requires a namespace."
+        if self.config.rerank_factor < 2:
+            return None
+        file_name = await self.namespace.async_get_load_path(self.RESOURCE_RERANK_NAME.format(self.embedding_dim))
+        if not file_name:
+            return None
+        rerank = await run_in_io_executor(self._load_index, self.namespace.store, file_name)
+        if len(rerank) != size:
+            logger.warning(f"Ignoring the rerank embeddings '{file_name}', which do not match the vectordb storage.")
+            return None
+        return rerank
+
+    @staticmethod
+    def _load_index(store: BaseObjectStore, index_file_name: str) -> npt.NDArray[Any]:
+        local_file = store.get_local_path(index_file_name)
+        if local_file is not None:
+            return np.load(local_file, mmap_mode="r")
+        return np.load(io.BytesIO(store.read_bytes(index_file_name)))
+
+    @staticmethod
+    def _save_index(store: BaseObjectStore, vectors: npt.NDArray[Any], index_file_name: str) -> None:
+        fd, temp_file = tempfile.mkstemp(suffix=".npy")
+        os.close(fd)
+        try:
+            np.save(temp_file, vectors)
+            store.upload_from_file(index_file_name, temp_file)
+        finally:
+            os.remove(temp_file)
+
+    async def _query_done(self):
+        pass
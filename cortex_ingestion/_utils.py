@@ -1,9 +1,12 @@
 import asyncio
+import copy
 import logging
 import time
 import os
-from functools import wraps
-from typing import Any, Callable, List, Optional, Tuple, TypeVar, Union
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial, wraps
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, TypeVar, Union
 from pathlib import Path
 
 import numpy as np
@@ -40,6 +43,12 @@ logger.addHandler(console_handler)
 
 TOKEN_TO_CHAR_RATIO = 4
 
+# Bounded thread pool shared by all blocking storage operations (network transfers, (de)serialization)
+IO_MAX_WORKERS = int(os.getenv("IO_MAX_WORKERS", 16))
+_io_executor = ThreadPoolExecutor(max_workers=IO_MAX_WORKERS, thread_name_prefix="cortex-io")
+
+T = TypeVar("T")
+
 
 def timeit(func: Callable[..., Any]):
     @wraps(func)
@@ -80,6 +89,54 @@ def throttle_async_func_call(
     return decorator
 
 
+@dataclass
+class SingleFlight:
+    """Coalesce identical concurrent calls: while a call for a key is in flight, calls for the same key await it.
+
+    The call runs in its own task, so cancelling the caller which started it does not fail the others. Unless
+    `copy_results` is False, the callers which joined a call get a deep copy of its result, so that they can modify
+    it independently. Calls are only coalesced within an event loop, one instance can be shared by several loops.
+    """
+
+    copy_results: bool = field(default=True)
+    # Keyed by event loop and call key, tasks cannot be awaited from another loop
+    _in_flight: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], "asyncio.Task[Any]"] = field(
+        init=False, default_factory=dict
+    )
+    calls: int = field(init=False, default=0)
+    coalesced: int = field(init=False, default=0)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._in_flight)}
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        task = self._in_flight.get((loop, key), None)
+        if task is not None:
+            self.coalesced += 1
+            result = await asyncio.shield(task)
+            return copy.deepcopy(result) if self.copy_results else result
+
+        self.calls += 1
+        task = loop.create_task(func())  # type: ignore
+        self._in_flight[(loop, key)] = task
+        task.add_done_callback(partial(self._done, (loop, key)))
+        return await asyncio.shield(task)
+
+    def _done(self, key: Tuple[asyncio.AbstractEventLoop, Hashable], task: "asyncio.Task[Any]") -> None:
+        if self._in_flight.get(key, None) is task:
+            del self._in_flight[key]
+        # Mark the exception as retrieved, every caller may have been cancelled
+        if not task.cancelled():
+            task.exception()
+
+
+async def run_in_io_executor(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking function in the shared I/O thread pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, partial(func, *args, **kwargs))
+
+
 def get_event_loop() -> asyncio.AbstractEventLoop:
     try:
         # If there is already an event loop, use it.
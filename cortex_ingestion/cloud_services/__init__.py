@@ -0,0 +1,17 @@
+__all__ = [
+    "BaseObjectStore",
+    "ObjectStat",
+    "CachedObjectStore",
+    "DefaultObjectStore",
+    "GCSObjectStore",
+    "InMemoryObjectStore",
+    "LocalObjectStore",
+    "get_default_object_store",
+]
+
+from cortex_ingestion.cloud_services._base import BaseObjectStore, ObjectStat
+from cortex_ingestion.cloud_services._cached import CachedObjectStore
+from cortex_ingestion.cloud_services._default import DefaultObjectStore, get_default_object_store
+from cortex_ingestion.cloud_services._googlecloud import GCSObjectStore
+from cortex_ingestion.cloud_services._local import LocalObjectStore
+from cortex_ingestion.cloud_services._memory import InMemoryObjectStore
@@ -0,0 +1,115 @@
+import pickle
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional
+
+from cortex_ingestion._utils import run_in_io_executor
+
+
+@dataclass
+class ObjectStat:
+    """Metadata of a stored object."""
+
+    size: int = field()
+    generation: Hashable = field()
+    checksum: Optional[str] = field(default=None)  # Content checksum, if provided by the store
+
+
+@dataclass
+class BaseObjectStore:
+    """Base class for the object stores holding the workspaces.
+
+    Paths are '/'-separated keys relative to the root of the store. Directories are implicit: a
+    directory exists as long as some object is stored below it.
+    All the methods are blocking, their `async_` counterparts run them in the shared I/O thread pool.
+    """
+
+    def uri(self, path: str) -> str:
+        """Return a unique human-readable location for the given path."""
+        raise NotImplementedError
+
+    def exists(self, path: str) -> bool:
+        """Check whether an object or a directory exists at the given path."""
+        raise NotImplementedError
+
+    def list(self, prefix: str) -> List[str]:
+        """List the names of the objects directly under the given directory."""
+        raise NotImplementedError
+
+    def list_dirs(self, prefix: str) -> List[str]:
+        """List the names of the sub-directories directly under the given directory."""
+        raise NotImplementedError
+
+    def list_stats(self, prefix: str) -> Dict[str, ObjectStat]:
+        """Return the metadata of the objects directly under the given directory, keyed by object name."""
+        raise NotImplementedError
+
+    def stat(self, path: str) -> Optional[ObjectStat]:
+        """Return the metadata of the object or None if it does not exist."""
+        raise NotImplementedError
+
+    def set_expected_generations(self, generations: Dict[str, Hashable]) -> None:
+        """Record the generations of objects known from elsewhere, such as a checkpoint manifest.
+
+        Stores keeping local copies can then serve these objects without requesting their metadata first.
+        """
+
+    def get_local_path(self, path: str) -> Optional[str]:
+        """Return a local file holding the content of the object, or None if the store cannot provide one.
+
+        The file must be treated as read-only and may be replaced once the object is rewritten.
+        """
+        return None
+
+    def read_bytes(self, path: str) -> bytes:
+        raise NotImplementedError
+
+    def write_bytes(self, path: str, data: bytes) -> None:
+        raise NotImplementedError
+
+    def download_to_file(self, path: str, file_name: str) -> None:
+        """Copy the object to a local file."""
+        with open(file_name, "wb") as f:
+            f.write(self.read_bytes(path))
+
+    def upload_from_file(self, path: str, file_name: str) -> None:
+        """Store the content of a local file as an object."""
+        with open(file_name, "rb") as f:
+            self.write_bytes(path, f.read())
+
+    def delete(self, path: str) -> None:
+        raise NotImplementedError
+
+    def delete_dir(self, prefix: str) -> None:
+        """Delete the directory and all the objects below it."""
+        raise NotImplementedError
+
+    def rename_dir(self, old_prefix: str, new_prefix: str) -> None:
+        """Move all the objects below a directory to a new directory."""
+        raise NotImplementedError
+
+    def read_pickle(self, path: str) -> Any:
+        return pickle.loads(self.read_bytes(path))
+
+    def write_pickle(self, path: str, data: Any) -> None:
+        self.write_bytes(path, pickle.dumps(data))
+
+    async def async_list_stats(self, prefix: str) -> Dict[str, ObjectStat]:
+        return await run_in_io_executor(self.list_stats, prefix)
+
+    async def async_read_bytes(self, path: str) -> bytes:
+        return await run_in_io_executor(self.read_bytes, path)
+
+    async def async_write_bytes(self, path: str, data: bytes) -> None:
+        return await run_in_io_executor(self.write_bytes, path, data)
+
+    async def async_download_to_file(self, path: str, file_name: str) -> None:
+        return await run_in_io_executor(self.download_to_file, path, file_name)
+
+    async def async_upload_from_file(self, path: str, file_name: str) -> None:
+        return await run_in_io_executor(self.upload_from_file, path, file_name)
+
+    async def async_read_pickle(self, path: str) -> Any:
+        return await run_in_io_executor(self.read_pickle, path)
+
+    async def async_write_pickle(self, path: str, data: Any) -> None:
+        return await run_in_io_executor(self.write_pickle, path, data)
@@ -0,0 +1,246 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from cortex_ingestion._exceptions import InvalidStorageError
+from cortex_ingestion._utils import logger
+
+from cortex_ingestion.cloud_services._base import BaseObjectStore, ObjectStat
+
+
+@dataclass
+class CachedObjectStore(BaseObjectStore):
+    """A read-through local disk cache in front of another (remote) object store.
+
+    Objects are cached as files named after their path and generation, so a read only costs a metadata
+    request to the underlying store when the object did not change, and none when its generation was given by
+    `set_expected_generations`. Writes go to the underlying store and populate the cache. The cache directory is
+    bounded in size, evicting the least recently used files: their sizes and order are tracked in memory, the
+    directory is only walked once when the store is created.
+    """
+
+    store: BaseObjectStore = field()
+    cache_dir: str = field(default_factory=lambda: os.getenv("OBJECT_CACHE_DIR", "/tmp/cortex_object_cache"))
+    max_bytes: int = field(default_factory=lambda: int(os.getenv("OBJECT_CACHE_MAX_BYTES", 8 * 1024**3)))
+    _lock: threading.Lock = field(init=False, default_factory=threading.Lock)
+    # Cached file names and sizes from the least to the most recently used, and the cached files of each object
+    _entries: "OrderedDict[str, int]" = field(init=False, default_factory=OrderedDict)
+    _generations: Dict[str, Set[str]] = field(init=False, default_factory=dict)
+    _nbytes: int = field(init=False, default=0)
+    # Generations of the objects listed by the loaded manifests, from the least to the most recently set
+    _expected: "OrderedDict[str, Hashable]" = field(init=False, default_factory=OrderedDict)
+
+    MAX_EXPECTED_GENERATIONS = 65536
+
+    def __post_init__(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def uri(self, path: str) -> str:
+        return self.store.uri(path)
+
+    def exists(self, path: str) -> bool:
+        return self.store.exists(path)
+
+    def list(self, prefix: str) -> List[str]:
+        return self.store.list(prefix)
+
+    def list_dirs(self, prefix: str) -> List[str]:
+        return self.store.list_dirs(prefix)
+
+    def list_stats(self, prefix: str) -> Dict[str, ObjectStat]:
+        return self.store.list_stats(prefix)
+
+    def stat(self, path: str) -> Optional[ObjectStat]:
+        return self.store.stat(path)
+
+    def set_expected_generations(self, generations: Dict[str, Hashable]) -> None:
+        with self._lock:
+            for path, generation in generations.items():
+                self._expected.pop(path, None)
+                self._expected[path] = generation
+            while len(self._expected) > self.MAX_EXPECTED_GENERATIONS:
+                self._expected.popitem(last=False)
+
+    def get_local_path(self, path: str) -> Optional[str]:
+        return self._fetch(path)
+
+    def read_bytes(self, path: str) -> bytes:
+        with open(self._fetch(path), "rb") as f:
+            return f.read()
+
+    def write_bytes(self, path: str, data: bytes) -> None:
+        self.store.write_bytes(path, data)
+        self._populate(path, lambda tmp: _write_file(tmp, data))
+
+    def download_to_file(self, path: str, file_name: str) -> None:
+        shutil.copyfile(self._fetch(path), file_name)
+
+    def upload_from_file(self, path: str, file_name: str) -> None:
+        self.store.upload_from_file(path, file_name)
+        self._populate(path, lambda tmp: _link_or_copy(file_name, tmp))
+
+    def delete(self, path: str) -> None:
+        self.store.delete(path)
+        with self._lock:
+            self._expected.pop(path, None)
+
+    def delete_dir(self, prefix: str) -> None:
+        self.store.delete_dir(prefix)
+        self._forget_expected(prefix)
+
+    def rename_dir(self, old_prefix: str, new_prefix: str) -> None:
+        self.store.rename_dir(old_prefix, new_prefix)
+        self._forget_expected(old_prefix)
+
+    def _forget_expected(self, prefix: str) -> None:
+        prefix = prefix if prefix.endswith("/") else prefix + "/"
+        with self._lock:
+            for path in [p for p in self._expected if p.startswith(prefix)]:
+                del self._expected[path]
+
+    def _fetch(self, path: str) -> str:
+        """Return the cached file of the object, downloading it if missing or outdated."""
+        with self._lock:
+            generation = self._expected.get(path, None)
+        if generation is not None and self._hit(self._cache_file(path, generation)):
+            return self._cache_file(path, generation)
+
+        stat = self.store.stat(path)
+        if stat is None:
+            raise InvalidStorageError(f"Resource not found at {self.uri(path)}")
+        if generation is not None and stat.generation != generation:
+            logger.debug(f"Object {self.uri(path)} was rewritten since its generation was recorded.")
+
+        cache_file = self._cache_file(path, stat.generation)
+        if self._hit(cache_file):
+            return cache_file
+
+        logger.debug(f"Object cache miss for {self.uri(path)}.")
+        return self._populate(path, lambda tmp: self.store.download_to_file(path, tmp), stat)
+
+    def _populate(self, path: str, write_fn: Callable[[str], Any], stat: Optional[ObjectStat] = None) -> str:
+        if stat is None:
+            stat = self.store.stat(path)
+            assert stat is not None, f"Object {self.uri(path)} was not written."
+
+        cache_file = self._cache_file(path, stat.generation)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp_")
+        os.close(fd)
+        try:
+            write_fn(tmp)
+            os.replace(tmp, cache_file)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+        name = os.path.basename(cache_file)
+        size = os.path.getsize(cache_file)
+        with self._lock:
+            if path in self._expected:
+                self._expected[path] = stat.generation
+            # The outdated generations of the object will not be read again
+            for outdated in self._generations.get(name.split(".", 1)[0], set()) - {name}:
+                self._discard(outdated)
+                _remove(os.path.join(self.cache_dir, outdated))
+            self._add(name, size)
+            self._evict(keep=name)
+        return cache_file
+
+    def _cache_file(self, path: str, generation: Hashable) -> str:
+        key = hashlib.sha256(self.uri(path).encode()).hexdigest()[:32]
+        return os.path.join(self.cache_dir, f"{key}.{generation}")
+
+    def _hit(self, cache_file: str) -> bool:
+        try:
+            # Refresh the modification time, which orders the files by last access when the index is rebuilt
+            os.utime(cache_file)
+        except FileNotFoundError:
+            return False
+        self._touch(cache_file)
+        return True
+
+    def _load_index(self) -> None:
+        """Index the files already in the cache directory, which is not walked again afterwards."""
+        files: List[Tuple[float, str, int]] = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.startswith(".tmp_"):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, entry.name, st.st_size))
+
+        with self._lock:
+            for _, name, size in sorted(files):
+                self._add(name, size)
+            self._evict(keep=None)
+
+    def _touch(self, cache_file: str) -> None:
+        name = os.path.basename(cache_file)
+        with self._lock:
+            if name in self._entries:
+                self._entries.move_to_end(name)
+                return
+        # Written by another process sharing the cache directory
+        try:
+            size = os.path.getsize(cache_file)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._add(name, size)
+            self._evict(keep=name)
+
+    def _add(self, name: str, size: int) -> None:
+        self._discard(name)
+        self._entries[name] = size
+        self._nbytes += size
+        self._generations.setdefault(name.split(".", 1)[0], set()).add(name)
+
+    def _discard(self, name: str) -> None:
+        size = self._entries.pop(name, None)
+        if size is None:
+            return
+        self._nbytes -= size
+        key = name.split(".", 1)[0]
+        self._generations[key].discard(name)
+        if not self._generations[key]:
+            del self._generations[key]
+
+    def _evict(self, keep: Optional[str]) -> None:
+        """Evict the least recently used files beyond the size budget, except the kept (most recent) one."""
+        while self._nbytes > self.max_bytes and self._entries:
+            name = next(iter(self._entries))
+            if name == keep:
+                break
+            logger.debug(f"Evicting '{name}' from the object cache.")
+            self._discard(name)
+            _remove(os.path.join(self.cache_dir, name))
+
+
+def _write_file(file_name: str, data: bytes) -> None:
+    with open(file_name, "wb") as f:
+        f.write(data)
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    # Hard-linking spares copying large files when the cache directory is on the same file system
+    try:
+        os.remove(dst)
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def _remove(file_name: str) -> None:
+    try:
+        os.remove(file_name)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,29 @@
+__all__ = ["DefaultObjectStore", "get_default_object_store"]
+
+import threading
+from typing import Optional
+
+from cortex_ingestion.cloud_services._base import BaseObjectStore
+from cortex_ingestion.cloud_services._cached import CachedObjectStore
+from cortex_ingestion.cloud_services._googlecloud import GCSObjectStore
+
+
+class DefaultObjectStore(GCSObjectStore):
+    pass
+
+
+_default_object_store: Optional[BaseObjectStore] = None
+_default_object_store_lock = threading.Lock()
+
+
+def get_default_object_store() -> BaseObjectStore:
+    """Return the process-wide default object store, created on first use.
+
+    It is a `CachedObjectStore` in front of a `DefaultObjectStore`. A single instance indexes the cache directory
+    once and accounts for all its files, so that `max_bytes` holds however many graphs are built concurrently.
+    """
+    global _default_object_store
+    with _default_object_store_lock:
+        if _default_object_store is None:
+            _default_object_store = CachedObjectStore(DefaultObjectStore())
+        return _default_object_store
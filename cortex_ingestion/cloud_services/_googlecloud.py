@@ -1,7 +1,15 @@
 import io
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
 from google.cloud import storage
+from google.cloud.storage import transfer_manager
 import pickle
 from google.api_core import exceptions as google_exceptions
+from google.auth.transport.requests import AuthorizedSession
+from google.oauth2 import service_account
+from requests.adapters import HTTPAdapter
 import os
 from pathlib import Path
 from cortex_ingestion._utils import logger
@@ -9,23 +17,80 @@ from cortex_ingestion._utils import logger
 # from cortex_ingestion._storage._namespace import Namespace
 from cortex_ingestion._exceptions import InvalidStorageError
 
+from cortex_ingestion.cloud_services._base import BaseObjectStore, ObjectStat
+
 # Get the absolute path to the credentials file relative to this script
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_CREDENTIALS_PATH = os.path.join(SCRIPT_DIR, "cortex-service-key.json")
 
-bucket_name = "cortex-knowledge-base-beta"
+# Maximum number of pooled HTTP connections per client, i.e. concurrent requests without reconnecting
+GCS_MAX_POOL_SIZE = int(os.getenv("GCS_MAX_POOL_SIZE", 32))
+
+# Objects larger than this are transferred as chunks in parallel (sliced download / multipart upload)
+GCS_PARALLEL_TRANSFER_THRESHOLD = int(os.getenv("GCS_PARALLEL_TRANSFER_THRESHOLD", 64 * 1024**2))
+GCS_TRANSFER_CHUNK_SIZE = int(os.getenv("GCS_TRANSFER_CHUNK_SIZE", 32 * 1024**2))
+GCS_TRANSFER_WORKERS = int(os.getenv("GCS_TRANSFER_WORKERS", 8))
+
+bucket_name = os.getenv("GCS_BUCKET_NAME", "cortex-knowledge-base-beta")
+
+_clients: dict[str, storage.Client] = {}
+_buckets: dict[tuple[str, str], storage.Bucket] = {}
+_clients_lock = threading.Lock()
+
+def _create_storage_client(abs_path: str, pool_size: int) -> storage.Client:
+    """
+    Build a storage client whose HTTP session keeps up to `pool_size` connections alive.
+    """
+    credentials = service_account.Credentials.from_service_account_file(abs_path, scopes=storage.Client.SCOPE)
+    session = AuthorizedSession(credentials)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return storage.Client(project=credentials.project_id, credentials=credentials, _http=session)
 
 def get_authenticated_storage_client(credentials_path=DEFAULT_CREDENTIALS_PATH):
     """
     Returns an authenticated Google Cloud Storage client using service account credentials.
+
+    Clients are created lazily once per credentials file and shared by all callers (and threads),
+    so that the credentials are only read once and the HTTP connections are reused.
     """
-    try:
-        abs_path = os.path.abspath(credentials_path)
-        if not os.path.exists(abs_path):
-            raise FileNotFoundError(f"Credentials file not found at: {abs_path}")
-        return storage.Client.from_service_account_json(abs_path)
-    except Exception as e:
-        raise InvalidStorageError(f"Failed to authenticate: {str(e)}")
+    abs_path = os.path.abspath(credentials_path)
+    client = _clients.get(abs_path, None)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(abs_path, None)
+        if client is not None:
+            return client
+        try:
+            if not os.path.exists(abs_path):
+                raise FileNotFoundError(f"Credentials file not found at: {abs_path}")
+            client = _create_storage_client(abs_path, GCS_MAX_POOL_SIZE)
+        except Exception as e:
+            raise InvalidStorageError(f"Failed to authenticate: {str(e)}")
+        _clients[abs_path] = client
+        logger.debug(f"Created storage client for credentials '{abs_path}' (pool size {GCS_MAX_POOL_SIZE}).")
+        return client
+
+def get_bucket(bucket_name: str = bucket_name, credentials_path=DEFAULT_CREDENTIALS_PATH) -> storage.Bucket:
+    """
+    Returns the shared bucket handle for the given bucket name and credentials.
+    """
+    key = (os.path.abspath(credentials_path), bucket_name)
+    bucket = _buckets.get(key, None)
+    if bucket is not None:
+        return bucket
+
+    # The client is resolved first, its registry takes the same lock
+    client = get_authenticated_storage_client(credentials_path)
+    with _clients_lock:
+        bucket = _buckets.get(key, None)
+        if bucket is None:
+            bucket = client.bucket(bucket_name)
+            _buckets[key] = bucket
+        return bucket
 
 def blob_exists(blob_path: str, bucket_name="cortex-knowledge-base-beta") -> bool:
     """
@@ -43,8 +108,7 @@ def blob_exists(blob_path: str, bucket_name="cortex-knowledge-base-beta") -> boo
         # if not blob_path.endswith('/') and '.' not in blob_path.split('/')[-1]:
         #     blob_path += '/'
             
-        client = get_authenticated_storage_client()
-        bucket = client.bucket(bucket_name)
+        bucket = get_bucket(bucket_name)
         # Ensure the folder path ends with '/'
         if not blob_path.endswith('/'):
             blob_path += '/'
@@ -74,8 +138,7 @@ def list_blobs(prefix: str = "", delimiter: str = "/", bucket_name: str = "corte
         InvalidStorageError: If listing fails due to permissions or other issues
     """
     try:
-        client = get_authenticated_storage_client()
-        bucket = client.bucket(bucket_name)
+        bucket = get_bucket(bucket_name)
         
         # List all blobs with the prefix
         blobs = bucket.list_blobs(prefix=prefix, delimiter=delimiter)
@@ -105,8 +168,7 @@ def delete_blob(blob_path: str, bucket_name: str = "cortex-knowledge-base-beta")
         InvalidStorageError: If deletion fails due to permissions or other issues
     """
     try:
-        client = get_authenticated_storage_client()
-        bucket = client.bucket(bucket_name)
+        bucket = get_bucket(bucket_name)
         blob = bucket.blob(blob_path)
         
         if not blob.exists():
@@ -132,8 +194,7 @@ def create_directory(dir_path: str, bucket_name: str = "cortex-knowledge-base-be
         dir_path += '/'
         
     try:
-        client = get_authenticated_storage_client()
-        bucket = client.bucket(bucket_name)
+        bucket = get_bucket(bucket_name)
         blob = bucket.blob(dir_path)
         
         if not blob.exists():
@@ -155,8 +216,7 @@ def rename_blob(old_path: str, new_path: str, bucket_name: str = "cortex-knowled
         InvalidStorageError: If rename fails due to permissions or other issues
     """
     try:
-        client = get_authenticated_storage_client()
-        bucket = client.bucket(bucket_name)
+        bucket = get_bucket(bucket_name)
         blob = bucket.blob(old_path)
         
         if not blob.exists():
@@ -174,8 +234,7 @@ def rename_blob(old_path: str, new_path: str, bucket_name: str = "cortex-knowled
 def upload_pickle_to_gcs(blobpath, data, credentials_path=DEFAULT_CREDENTIALS_PATH, bucket_name=bucket_name):
     """Pickles the data and uploads it to the specified GCS bucket/path."""
     try:
-        client = get_authenticated_storage_client(credentials_path)
-        bucket = client.bucket(bucket_name)
+        bucket = get_bucket(bucket_name, credentials_path)
         blob = bucket.blob(blobpath)
         
         # Serialize data
@@ -196,8 +255,7 @@ def upload_pickle_to_gcs(blobpath, data, credentials_path=DEFAULT_CREDENTIALS_PA
 def upload_graph_to_gcs(blobpath, buffer, credentials_path=DEFAULT_CREDENTIALS_PATH, bucket_name=bucket_name):
     """Uploads the graph data to the specified GCS bucket/path."""
     try:
-        client = get_authenticated_storage_client(credentials_path)
-        bucket = client.bucket(bucket_name)
+        bucket = get_bucket(bucket_name, credentials_path)
         blob = bucket.blob(blobpath)
         
         # Upload the serialized data
@@ -215,8 +273,7 @@ def upload_graph_to_gcs(blobpath, buffer, credentials_path=DEFAULT_CREDENTIALS_P
 def download_graph_to_gcs(blobpath, credentials_path=DEFAULT_CREDENTIALS_PATH, bucket_name=bucket_name):
     """Uploads the graph data to the specified GCS bucket/path."""
     try:
-        client = get_authenticated_storage_client(credentials_path)
-        bucket = client.bucket(bucket_name)
+        bucket = get_bucket(bucket_name, credentials_path)
         blob = bucket.blob(blobpath)
         
         # Upload the serialized data
@@ -239,8 +296,7 @@ def download_graph_to_gcs(blobpath, credentials_path=DEFAULT_CREDENTIALS_PATH, b
 def download_pickle_from_gcs(blobpath, credentials_path=DEFAULT_CREDENTIALS_PATH, bucket_name=bucket_name):
     """Downloads the pickled data from the specified GCS bucket/path and unpickles it."""
     try:
-        client = get_authenticated_storage_client(credentials_path)
-        bucket = client.bucket(bucket_name)
+        bucket = get_bucket(bucket_name, credentials_path)
         blob = bucket.blob(blobpath)
         
         # Download and deserialize the data
@@ -258,6 +314,144 @@ def download_pickle_from_gcs(blobpath, credentials_path=DEFAULT_CREDENTIALS_PATH
         raise InvalidStorageError(f"Failed to download data from storage: {str(e)}")
 
 
+
+####################################################################################################
+# Object store
+####################################################################################################
+
+
+def _to_stat(blob: storage.Blob) -> ObjectStat:
+    return ObjectStat(size=blob.size or 0, generation=blob.generation, checksum=blob.crc32c)
+
+
+@contextmanager
+def _translate_errors(action: str) -> Iterator[None]:
+    try:
+        yield
+    except InvalidStorageError:
+        raise
+    except google_exceptions.Forbidden as e:
+        raise InvalidStorageError(f"Authentication failed or insufficient permissions: {str(e)}")
+    except google_exceptions.NotFound as e:
+        raise InvalidStorageError(f"Resource not found while trying to {action}: {str(e)}")
+    except Exception as e:
+        raise InvalidStorageError(f"Failed to {action}: {str(e)}")
+
+
+@dataclass
+class GCSObjectStore(BaseObjectStore):
+    """An object store backed by a Google Cloud Storage bucket."""
+
+    bucket_name: str = field(default=bucket_name)
+    credentials_path: str = field(default=DEFAULT_CREDENTIALS_PATH)
+    parallel_transfer_threshold: int = field(default=GCS_PARALLEL_TRANSFER_THRESHOLD)
+    transfer_chunk_size: int = field(default=GCS_TRANSFER_CHUNK_SIZE)
+    transfer_workers: int = field(default=GCS_TRANSFER_WORKERS)
+
+    @property
+    def bucket(self) -> storage.Bucket:
+        return get_bucket(self.bucket_name, self.credentials_path)
+
+    def uri(self, path: str) -> str:
+        return f"gs://{self.bucket_name}/{path}"
+
+    def exists(self, path: str) -> bool:
+        with _translate_errors(f"check existence of {self.uri(path)}"):
+            if len(list(self.bucket.list_blobs(prefix=self._dir(path), max_results=1))) > 0:
+                return True
+            return self.bucket.blob(path).exists()
+
+    def list(self, prefix: str) -> List[str]:
+        return sorted(self.list_stats(prefix).keys())
+
+    def list_dirs(self, prefix: str) -> List[str]:
+        prefix = self._dir(prefix)
+        with _translate_errors(f"list {self.uri(prefix)}"):
+            blobs = self.bucket.list_blobs(prefix=prefix, delimiter="/")
+            # Prefixes are only populated once all the pages have been consumed
+            for _ in blobs:
+                pass
+            return sorted(p[len(prefix) :].rstrip("/") for p in blobs.prefixes)
+
+    def list_stats(self, prefix: str) -> Dict[str, ObjectStat]:
+        prefix = self._dir(prefix)
+        with _translate_errors(f"list {self.uri(prefix)}"):
+            return {
+                blob.name[len(prefix) :]: _to_stat(blob)
+                for blob in self.bucket.list_blobs(prefix=prefix, delimiter="/")
+                if blob.name != prefix  # Skip directory markers
+            }
+
+    def stat(self, path: str) -> Optional[ObjectStat]:
+        with _translate_errors(f"get metadata of {self.uri(path)}"):
+            blob = self.bucket.get_blob(path)
+            return _to_stat(blob) if blob is not None else None
+
+    def read_bytes(self, path: str) -> bytes:
+        with _translate_errors(f"download {self.uri(path)}"):
+            return self.bucket.blob(path).download_as_bytes()
+
+    def write_bytes(self, path: str, data: bytes) -> None:
+        with _translate_errors(f"upload {self.uri(path)}"):
+            self.bucket.blob(path).upload_from_string(data)
+
+    def download_to_file(self, path: str, file_name: str) -> None:
+        with _translate_errors(f"download {self.uri(path)}"):
+            blob = self.bucket.get_blob(path)
+            if blob is None:
+                raise InvalidStorageError(f"Resource not found at {self.uri(path)}")
+
+            if (blob.size or 0) < self.parallel_transfer_threshold:
+                blob.download_to_filename(file_name)
+                return
+
+            # The blob carries its generation, so all the chunks are read from the same version of the object
+            transfer_manager.download_chunks_concurrently(
+                blob,
+                file_name,
+                chunk_size=self.transfer_chunk_size,
+                max_workers=self.transfer_workers,
+                worker_type=transfer_manager.THREAD,
+            )
+
+    def upload_from_file(self, path: str, file_name: str) -> None:
+        with _translate_errors(f"upload {self.uri(path)}"):
+            blob = self.bucket.blob(path)
+            if os.path.getsize(file_name) < self.parallel_transfer_threshold:
+                blob.upload_from_filename(file_name)
+                return
+
+            transfer_manager.upload_chunks_concurrently(
+                file_name,
+                blob,
+                chunk_size=self.transfer_chunk_size,
+                max_workers=self.transfer_workers,
+                worker_type=transfer_manager.THREAD,
+            )
+
+    def delete(self, path: str) -> None:
+        with _translate_errors(f"delete {self.uri(path)}"):
+            try:
+                self.bucket.blob(path).delete()
+            except google_exceptions.NotFound:
+                logger.info(f"Blob does not exist at path: {path}")
+
+    def delete_dir(self, prefix: str) -> None:
+        with _translate_errors(f"delete {self.uri(prefix)}"):
+            blobs = list(self.bucket.list_blobs(prefix=self._dir(prefix)))
+            self.bucket.delete_blobs(blobs, on_error=lambda blob: None)
+
+    def rename_dir(self, old_prefix: str, new_prefix: str) -> None:
+        old_prefix, new_prefix = self._dir(old_prefix), self._dir(new_prefix)
+        with _translate_errors(f"rename {self.uri(old_prefix)} to {self.uri(new_prefix)}"):
+            for blob in self.bucket.list_blobs(prefix=old_prefix):
+                self.bucket.rename_blob(blob, new_prefix + blob.name[len(old_prefix) :])
+
+    @staticmethod
+    def _dir(prefix: str) -> str:
+        return prefix if prefix.endswith("/") else prefix + "/"
+
+
 if __name__ == "__main__":
     # Set your bucket name, blob path, and optionally the credentials path
     blob_path = "tmp/"
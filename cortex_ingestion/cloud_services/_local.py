@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from cortex_ingestion._exceptions import InvalidStorageError
+
+from cortex_ingestion.cloud_services._base import BaseObjectStore, ObjectStat
+
+
+@dataclass
+class LocalObjectStore(BaseObjectStore):
+    """An object store keeping the objects as files below a local directory."""
+
+    root_dir: str = field(default="./cortex_data")
+
+    def __post_init__(self):
+        self.root_dir = os.path.abspath(self.root_dir)
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def uri(self, path: str) -> str:
+        return f"file://{self._abspath(path)}"
+
+    def exists(self, path: str) -> bool:
+        return os.path.exists(self._abspath(path))
+
+    def list(self, prefix: str) -> List[str]:
+        return sorted(entry.name for entry in self._scandir(prefix) if entry.is_file())
+
+    def list_dirs(self, prefix: str) -> List[str]:
+        return sorted(entry.name for entry in self._scandir(prefix) if entry.is_dir())
+
+    def list_stats(self, prefix: str) -> Dict[str, ObjectStat]:
+        return {
+            entry.name: self._to_stat(entry.stat()) for entry in self._scandir(prefix) if entry.is_file()
+        }
+
+    def stat(self, path: str) -> Optional[ObjectStat]:
+        try:
+            return self._to_stat(os.stat(self._abspath(path)))
+        except FileNotFoundError:
+            return None
+
+    def get_local_path(self, path: str) -> Optional[str]:
+        file_name = self._abspath(path)
+        return file_name if os.path.isfile(file_name) else None
+
+    def read_bytes(self, path: str) -> bytes:
+        try:
+            with open(self._abspath(path), "rb") as f:
+                return f.read()
+        except OSError as e:
+            raise InvalidStorageError(f"Failed to read object {self.uri(path)}: {e}") from e
+
+    def write_bytes(self, path: str, data: bytes) -> None:
+        self._atomic_write(path, lambda tmp: _write_file(tmp, data))
+
+    def download_to_file(self, path: str, file_name: str) -> None:
+        try:
+            shutil.copyfile(self._abspath(path), file_name)
+        except OSError as e:
+            raise InvalidStorageError(f"Failed to read object {self.uri(path)}: {e}") from e
+
+    def upload_from_file(self, path: str, file_name: str) -> None:
+        self._atomic_write(path, lambda tmp: shutil.copyfile(file_name, tmp))
+
+    def delete(self, path: str) -> None:
+        try:
+            os.remove(self._abspath(path))
+        except FileNotFoundError:
+            pass
+
+    def delete_dir(self, prefix: str) -> None:
+        shutil.rmtree(self._abspath(prefix), ignore_errors=True)
+
+    def rename_dir(self, old_prefix: str, new_prefix: str) -> None:
+        if os.path.exists(self._abspath(old_prefix)):
+            os.replace(self._abspath(old_prefix), self._abspath(new_prefix))
+
+    def _abspath(self, path: str) -> str:
+        return os.path.join(self.root_dir, path.strip("/"))
+
+    def _scandir(self, prefix: str) -> List[os.DirEntry[str]]:
+        try:
+            with os.scandir(self._abspath(prefix)) as it:
+                # Skip the temporary files of in-progress writes
+                return [entry for entry in it if not entry.name.startswith(".tmp_")]
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+
+    def _atomic_write(self, path: str, write_fn: Callable[[str], Any]) -> None:
+        # Write to a temporary file first, so that concurrent readers never see partial objects
+        file_name = self._abspath(path)
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(file_name), prefix=".tmp_")
+        os.close(fd)
+        try:
+            write_fn(tmp)
+            os.replace(tmp, file_name)
+        except OSError as e:
+            os.remove(tmp)
+            raise InvalidStorageError(f"Failed to write object {self.uri(path)}: {e}") from e
+
+    @staticmethod
+    def _to_stat(st: os.stat_result) -> ObjectStat:
+        return ObjectStat(size=st.st_size, generation=st.st_mtime_ns)
+
+
+def _write_file(file_name: str, data: bytes) -> None:
+    with open(file_name, "wb") as f:
+        f.write(data)
@@ -0,0 +1,94 @@
+import itertools
+import zlib
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from cortex_ingestion._exceptions import InvalidStorageError
+
+from cortex_ingestion.cloud_services._base import BaseObjectStore, ObjectStat
+
+
+@dataclass
+class InMemoryObjectStore(BaseObjectStore):
+    """A volatile object store keeping the objects in the process memory.
+
+    Mostly useful for tests and benchmarks. Share the same instance to share the objects.
+    """
+
+    _objects: Dict[str, Tuple[bytes, int]] = field(init=False, default_factory=dict)
+    _generations: "itertools.count[int]" = field(init=False, default_factory=lambda: itertools.count(1))
+    _lock: threading.Lock = field(init=False, default_factory=threading.Lock)
+
+    def uri(self, path: str) -> str:
+        return f"memory://{id(self):x}/{self._key(path)}"
+
+    def exists(self, path: str) -> bool:
+        key = self._key(path)
+        with self._lock:
+            return key in self._objects or any(k.startswith(self._dir(key)) for k in self._objects)
+
+    def list(self, prefix: str) -> List[str]:
+        return sorted(self.list_stats(prefix).keys())
+
+    def list_dirs(self, prefix: str) -> List[str]:
+        prefix = self._dir(prefix)
+        with self._lock:
+            names = [k[len(prefix) :] for k in self._objects if k.startswith(prefix)]
+        return sorted({name.split("/", 1)[0] for name in names if "/" in name})
+
+    def list_stats(self, prefix: str) -> Dict[str, ObjectStat]:
+        prefix = self._dir(prefix)
+        with self._lock:
+            return {
+                k[len(prefix) :]: self._to_stat(obj)
+                for k, obj in self._objects.items()
+                if k.startswith(prefix) and "/" not in k[len(prefix) :]
+            }
+
+    def stat(self, path: str) -> Optional[ObjectStat]:
+        with self._lock:
+            obj = self._objects.get(self._key(path), None)
+        return self._to_stat(obj) if obj else None
+
+    def read_bytes(self, path: str) -> bytes:
+        with self._lock:
+            obj = self._objects.get(self._key(path), None)
+        if obj is None:
+            raise InvalidStorageError(f"Resource not found at {self.uri(path)}")
+        return obj[0]
+
+    def write_bytes(self, path: str, data: bytes) -> None:
+        with self._lock:
+            self._objects[self._key(path)] = (bytes(data), next(self._generations))
+
+    def delete(self, path: str) -> None:
+        with self._lock:
+            self._objects.pop(self._key(path), None)
+
+    def delete_dir(self, prefix: str) -> None:
+        prefix = self._dir(prefix)
+        with self._lock:
+            for k in [k for k in self._objects if k.startswith(prefix)]:
+                del self._objects[k]
+
+    def rename_dir(self, old_prefix: str, new_prefix: str) -> None:
+        old_prefix = self._dir(old_prefix)
+        new_prefix = self._dir(new_prefix)
+        with self._lock:
+            for k in [k for k in self._objects if k.startswith(old_prefix)]:
+                self._objects[new_prefix + k[len(old_prefix) :]] = self._objects.pop(k)
+
+    @staticmethod
+    def _to_stat(obj: Tuple[bytes, int]) -> ObjectStat:
+        data, generation = obj
+        return ObjectStat(size=len(data), generation=generation, checksum=f"{zlib.crc32(data):08x}")
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return path.strip("/")
+
+    @staticmethod
+    def _dir(prefix: str) -> str:
+        prefix = prefix.strip("/")
+        return prefix + "/" if prefix else ""
@@ -1 +1 @@
-from cortex_ingestion.utilities._pickle import load_pickle, save_pickle
+from cortex_ingestion.utilities._pickle import async_load_pickle, async_save_pickle, load_pickle, save_pickle
@@ -4,7 +4,6 @@ from typing import Any, Optional
 from cortex_ingestion._exceptions import InvalidStorageError
 from cortex_ingestion._storage._namespace import Namespace
 from cortex_ingestion._utils import logger
-from cortex_ingestion.cloud_services._googlecloud import download_pickle_from_gcs, upload_pickle_to_gcs
 
 
 def load_pickle(namespace: Namespace, resource_name: str, default: Any = None) -> Any:
@@ -29,7 +28,7 @@ def load_pickle(namespace: Namespace, resource_name: str, default: Any = None) -
         return default
     
     try:
-        data = download_pickle_from_gcs(file_path)
+        data = namespace.store.read_pickle(file_path)
         return data
     except Exception as e:
         error_msg = f"Error loading pickle file {file_path}: {e}"
@@ -55,9 +54,43 @@ def save_pickle(namespace: Namespace, resource_name: str, data: Any) -> None:
     file_path = namespace.get_save_path(resource_name)
     
     try:
-        upload_pickle_to_gcs(file_path, data)
+        namespace.store.write_pickle(file_path, data)
         logger.debug(f"Saved pickle data to '{file_path}'")
     except Exception as e:
         error_msg = f"Error saving pickle file {file_path}: {e}"
         logger.error(error_msg)
-        raise InvalidStorageError(error_msg) from e 
\ No newline at end of file
+        raise InvalidStorageError(error_msg) from e 
+
+
+async def async_load_pickle(namespace: Namespace, resource_name: str, default: Any = None) -> Any:
+    """Asynchronous version of `load_pickle` which does not block the event loop."""
+    if not namespace:
+        return default
+
+    file_path = await namespace.async_get_load_path(resource_name)
+    if not file_path:
+        return default
+
+    try:
+        return await namespace.store.async_read_pickle(file_path)
+    except Exception as e:
+        error_msg = f"Error loading pickle file {file_path}: {e}"
+        logger.error(error_msg)
+        raise InvalidStorageError(error_msg) from e
+
+
+async def async_save_pickle(namespace: Namespace, resource_name: str, data: Any) -> None:
+    """Asynchronous version of `save_pickle` which does not block the event loop."""
+    if not namespace:
+        logger.warning("Cannot save pickle data: no namespace provided")
+        return
+
+    file_path = namespace.get_save_path(resource_name)
+
+    try:
+        await namespace.store.async_write_pickle(file_path, data)
+        logger.debug(f"Saved pickle data to '{file_path}'")
+    except Exception as e:
+        error_msg = f"Error saving pickle file {file_path}: {e}"
+        logger.error(error_msg)
+        raise InvalidStorageError(error_msg) from e
@@ -1,5 +1,6 @@
 from cortex_ingestion import CortexIngestion
 from cortex_ingestion._graphrag import QueryParam
+from cortex_ingestion._utils import logger
 from typing import Union, List
 from interactor.models import Entity, Relationship
 
@@ -50,21 +51,27 @@ async def query_file(user_name: str, query: Union[str, List[str]]):
     await graph_rag.state_manager.query_start()
     try:
         for q in queries:
-            print("---------------Q-----------------")
-            print(q)
-            print("--------------------------------")
+            logger.debug(f"Query: {q}")
             # Yield processing status
             yield {
                 "type": "processing",
                 "query": q
             }
-            
-            response = await graph_rag.async_query(q, params=QueryParam(only_context=False))
+
+        # Answer all the queries together, the graph is scored once for the whole batch and each answer is
+        # streamed as soon as it is ready
+        async for i, response in graph_rag.async_query_stream(queries, params=QueryParam(only_context=False)):
+            q = queries[i]
+            if isinstance(response, Exception):
+                yield {
+                    "type": "error",
+                    "query": q,
+                    "message": str(response)
+                }
+                continue
             entities = serialize_entities(response.context.entities)
             relationships = serialize_relationships(response.context.relations, response.context.chunks)
-            print("---------------R-----------------")
-            print(response.response)
-            print("--------------------------------")
+            logger.debug(f"Response to '{q}': {response.response}")
             # Yield response
             yield {
                 "type": "response",